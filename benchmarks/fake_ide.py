@@ -0,0 +1,61 @@
+"""Stand-in for the `code` and IDE executables used by the benchmarks.
+
+The list of extensions installed in VS Code is read from the file named by
+FAKE_IDE_EXTENSIONS, and every installed package costs FAKE_IDE_INSTALL_DELAY
+seconds plus FAKE_IDE_LAUNCH_DELAY seconds per process.
+"""
+
+import os
+import stat
+import sys
+import time
+from typing import List
+
+EXTENSIONS_ENV = "FAKE_IDE_EXTENSIONS"
+INSTALL_DELAY_ENV = "FAKE_IDE_INSTALL_DELAY"
+LAUNCH_DELAY_ENV = "FAKE_IDE_LAUNCH_DELAY"
+# VS Code version reported by `--version`
+ENGINE_VERSION = "1.85.2"
+
+
+def write_executables(bin_dir: str, names: List[str]) -> None:
+    """
+    Write executables that run this script under the given names.
+
+    Args:
+        bin_dir: Directory to write the executables to, to be put on PATH
+        names: Executable names, e.g. ['code', 'codium']
+    """
+    os.makedirs(bin_dir, exist_ok=True)
+    script = os.path.abspath(__file__)
+    for name in names:
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$0" "$@"\n')
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def main(argv: List[str]) -> int:
+    name = os.path.basename(argv[0])
+    args = argv[1:]
+    time.sleep(float(os.environ.get(LAUNCH_DELAY_ENV, "0")))
+    if "--version" in args:
+        print(f"{ENGINE_VERSION}\n0000000000000000000000000000000000000000\nx64")
+        return 0
+    if "--list-extensions" in args:
+        if name == "code":
+            with open(os.environ[EXTENSIONS_ENV]) as f:
+                for line in f:
+                    ext_id = line.strip()
+                    if ext_id and "--show-versions" in args:
+                        print(f"{ext_id}@1.0.0")
+                    elif ext_id:
+                        print(ext_id)
+        return 0
+    installs = args.count("--install-extension")
+    time.sleep(installs * float(os.environ.get(INSTALL_DELAY_ENV, "0")))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,230 @@
+"""Local stand-in for the Marketplace extensionquery and package download endpoints."""
+
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+import zipfile
+
+QUERY_PATH = "/_apis/public/gallery/extensionquery"
+DOWNLOAD_PREFIX = "/packages/"
+WRITE_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class MarketplaceSettings:
+    """Behaviour of the fake Marketplace."""
+
+    # Seconds added before every response
+    latency: float = 0.0
+    # Bytes per second of each download, 0 for unlimited
+    bandwidth: int = 0
+    # Share of requests answered with 503 Service Unavailable
+    error_rate: float = 0.0
+    # Size of each .vsix package in bytes
+    vsix_size: int = 64 * 1024
+    # Version reported for every extension
+    version: str = "1.0.0"
+
+
+@dataclass
+class MarketplaceStats:
+    """Traffic served by the fake Marketplace."""
+
+    requests: int = 0
+    queries: int = 0
+    downloads: int = 0
+    errors: int = 0
+    bytes_received: int = 0
+    bytes_sent: int = 0
+
+
+def build_vsix(publisher: str, name: str, version: str, size: int) -> bytes:
+    """
+    Build a valid .vsix package of roughly the given size.
+
+    The padding is random so that it does not compress, like the bundled
+    binaries of real platform-specific packages.
+
+    Args:
+        publisher: The extension publisher
+        name: The extension name
+        version: The extension version
+        size: Approximate size of the package in bytes
+
+    Returns:
+        bytes: The package
+    """
+    package_json = {"publisher": publisher, "name": name, "version": version}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "extension.vsixmanifest",
+            f'<PackageManifest><Metadata><Identity Id="{name}" Version="{version}" '
+            f'Publisher="{publisher}"/></Metadata></PackageManifest>',
+        )
+        archive.writestr("extension/package.json", json.dumps(package_json))
+        archive.writestr("extension/dist/payload.bin", os.urandom(max(size - 512, 0)))
+    return buffer.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeMarketplace"
+
+    def _count(self, **counts: int) -> None:
+        with self.server.lock:
+            for name, value in counts.items():
+                setattr(self.server.stats, name, getattr(self.server.stats, name) + value)
+
+    def _delay_or_fail(self) -> bool:
+        settings = self.server.settings
+        if settings.latency:
+            time.sleep(settings.latency)
+        if settings.error_rate and self.server.random.random() < settings.error_rate:
+            self._count(errors=1)
+            self._send(503, b"", {"Retry-After": "0"})
+            return True
+        return False
+
+    def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        bandwidth = self.server.settings.bandwidth
+        for start in range(0, len(body), WRITE_CHUNK_SIZE):
+            chunk = body[start : start + WRITE_CHUNK_SIZE]
+            self.wfile.write(chunk)
+            self._count(bytes_sent=len(chunk))
+            if bandwidth:
+                time.sleep(len(chunk) / bandwidth)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = self.rfile.read(length)
+        self._count(requests=1, queries=1, bytes_received=length)
+        if self.path != QUERY_PATH:
+            self._send(404, b"")
+            return
+        if self._delay_or_fail():
+            return
+        query = json.loads(payload)
+        criteria = query["filters"][0]["criteria"]
+        extensions = []
+        for criterion in criteria:
+            publisher, _, name = criterion["value"].partition(".")
+            extensions.append(
+                {
+                    "publisher": {"publisherName": publisher},
+                    "extensionName": name,
+                    "versions": [{"version": self.server.settings.version}],
+                }
+            )
+        body = json.dumps(
+            {
+                "results": [
+                    {
+                        "extensions": extensions,
+                        "resultMetadata": [
+                            {
+                                "metadataType": "ResultCount",
+                                "metadataItems": [
+                                    {"name": "TotalCount", "count": len(extensions)}
+                                ],
+                            }
+                        ],
+                    }
+                ]
+            }
+        ).encode("utf-8")
+        self._send(200, body, {"Content-Type": "application/json"})
+
+    def do_GET(self):
+        self._count(requests=1, downloads=1)
+        if not self.path.startswith(DOWNLOAD_PREFIX):
+            self._send(404, b"")
+            return
+        if self._delay_or_fail():
+            return
+        publisher, name, version = self.path[len(DOWNLOAD_PREFIX) :].split("/")[:3]
+        body = self.server.package(publisher, name, version)
+        self._send(200, body, {"Content-Type": "application/vsix"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeMarketplace(ThreadingHTTPServer):
+    """
+    HTTP server that answers extensionquery requests and serves packages.
+
+    Every requested extension exists, at the configured version. Packages are
+    built once per extension and kept in memory.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, settings: Optional[MarketplaceSettings] = None, seed: int = 0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.settings = settings or MarketplaceSettings()
+        self.stats = MarketplaceStats()
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self._packages: Dict[str, bytes] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """URL of the server's root."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def query_url(self) -> str:
+        """URL to use for VSIX_TO_VSCODIUM_QUERY_URL."""
+        return self.base_url + QUERY_PATH
+
+    @property
+    def download_url(self) -> str:
+        """URL template to use for VSIX_TO_VSCODIUM_DOWNLOAD_URL."""
+        return self.base_url + DOWNLOAD_PREFIX + "{publisher}/{name}/{version}"
+
+    def package(self, publisher: str, name: str, version: str) -> bytes:
+        """Get the package of an extension, building it on first use."""
+        key = f"{publisher}.{name}@{version}"
+        with self.lock:
+            if key not in self._packages:
+                self._packages[key] = build_vsix(
+                    publisher, name, version, self.settings.vsix_size
+                )
+            return self._packages[key]
+
+    def reset_stats(self) -> None:
+        """Start counting traffic from zero."""
+        with self.lock:
+            self.stats = MarketplaceStats()
+
+    def start(self) -> "FakeMarketplace":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(
+            target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving requests and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeMarketplace":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,241 @@
+"""Measure transfers against a local stand-in Marketplace.
+
+Each scenario runs `vsix-to-vscodium --transfer-all` in a fresh process with
+an empty cache, against a fake Marketplace and fake `code`/IDE executables,
+and reports its wall time, peak RSS, requests issued and bytes moved.
+
+    python -m benchmarks.run --extensions 10 100 1000 --latency 0.05
+"""
+
+import argparse
+from dataclasses import asdict, dataclass
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+from benchmarks.fake_ide import (
+    EXTENSIONS_ENV,
+    INSTALL_DELAY_ENV,
+    LAUNCH_DELAY_ENV,
+    write_executables,
+)
+from benchmarks.fake_marketplace import FakeMarketplace, MarketplaceSettings
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IDE_NAME = "codium"
+# Number of extensions per fake publisher
+EXTENSIONS_PER_PUBLISHER = 50
+_CHILD = "import sys; from vsix_to_vscodium.cli import main; main(sys.argv[1:])"
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements of a single transfer."""
+
+    extensions: int
+    run: str
+    exit_code: int
+    wall_time: float
+    peak_rss: int
+    requests: int
+    queries: int
+    downloads: int
+    errors: int
+    bytes_sent: int
+    bytes_received: int
+
+    @property
+    def extensions_per_second(self) -> float:
+        return self.extensions / self.wall_time if self.wall_time else 0.0
+
+
+def _peak_rss(rusage) -> int:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+
+
+def run_transfer(
+    marketplace: FakeMarketplace,
+    extension_count: int,
+    work_dir: str,
+    run: str,
+    cli_args: List[str],
+    install_delay: float,
+    launch_delay: float,
+    verbose: bool = False,
+) -> BenchmarkResult:
+    """
+    Transfer extensions in a child process and measure it.
+
+    Args:
+        marketplace: The running fake Marketplace
+        extension_count: Number of extensions installed in the fake VS Code
+        work_dir: Directory holding the cache and the fake executables
+        run: Label of the run, e.g. 'cold' or 'warm'
+        cli_args: Extra command line arguments for vsix-to-vscodium
+        install_delay: Seconds the fake IDE takes per installed package
+        launch_delay: Seconds the fake IDE takes to start
+        verbose: Show the output of the transfer
+
+    Returns:
+        BenchmarkResult: The measurements
+    """
+    bin_dir = os.path.join(work_dir, "bin")
+    write_executables(bin_dir, ["code", IDE_NAME])
+    extensions_file = os.path.join(work_dir, "extensions.txt")
+    with open(extensions_file, "w") as f:
+        for i in range(extension_count):
+            f.write(f"bench{i // EXTENSIONS_PER_PUBLISHER}.ext{i}\n")
+
+    env = dict(os.environ)
+    env.update(
+        {
+            "PATH": bin_dir + os.pathsep + env.get("PATH", ""),
+            "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+            "VSIX_TO_VSCODIUM_CACHE_DIR": os.path.join(work_dir, "cache"),
+            "VSIX_TO_VSCODIUM_QUERY_URL": marketplace.query_url,
+            "VSIX_TO_VSCODIUM_DOWNLOAD_URL": marketplace.download_url,
+            EXTENSIONS_ENV: extensions_file,
+            INSTALL_DELAY_ENV: str(install_delay),
+            LAUNCH_DELAY_ENV: str(launch_delay),
+        }
+    )
+    command = [sys.executable, "-c", _CHILD, "--transfer-all", "--ide", IDE_NAME, *cli_args]
+    output = None if verbose else subprocess.DEVNULL
+
+    marketplace.reset_stats()
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=output, stderr=output)
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall_time = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    stats = marketplace.stats
+    return BenchmarkResult(
+        extensions=extension_count,
+        run=run,
+        exit_code=process.returncode,
+        wall_time=wall_time,
+        peak_rss=_peak_rss(rusage),
+        requests=stats.requests,
+        queries=stats.queries,
+        downloads=stats.downloads,
+        errors=stats.errors,
+        bytes_sent=stats.bytes_sent,
+        bytes_received=stats.bytes_received,
+    )
+
+
+def _print_results(results: List[BenchmarkResult]) -> None:
+    header = (
+        f"{'extensions':>10} {'run':>5} {'wall s':>8} {'ext/s':>8} {'peak RSS':>10} "
+        f"{'requests':>8} {'queries':>7} {'errors':>6} {'MiB sent':>9} {'exit':>4}"
+    )
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result.extensions:>10} {result.run:>5} {result.wall_time:>8.2f} "
+            f"{result.extensions_per_second:>8.1f} {result.peak_rss / 1024**2:>6.1f} MiB "
+            f"{result.requests:>8} {result.queries:>7} {result.errors:>6} "
+            f"{result.bytes_sent / 1024**2:>9.1f} {result.exit_code:>4}"
+        )
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark transfers against a local stand-in Marketplace"
+    )
+    parser.add_argument(
+        "--extensions",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="Numbers of extensions to transfer (default: 10 100 1000)",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added to every response"
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=int,
+        default=0,
+        help="Bytes per second of each download, 0 for unlimited",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="Share of requests answered with 503 (default: 0)",
+    )
+    parser.add_argument(
+        "--vsix-size",
+        type=int,
+        default=64 * 1024,
+        help="Size of each package in bytes (default: 65536)",
+    )
+    parser.add_argument(
+        "--install-delay",
+        type=float,
+        default=0.0,
+        help="Seconds the fake IDE takes per installed package",
+    )
+    parser.add_argument(
+        "--launch-delay",
+        type=float,
+        default=0.0,
+        help="Seconds the fake IDE takes to start",
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Repeat every transfer with the cache filled by the first one",
+    )
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument(
+        "--verbose", action="store_true", help="Show the output of the transfers"
+    )
+    parser.add_argument(
+        "cli_args",
+        nargs=argparse.REMAINDER,
+        help="Extra arguments for vsix-to-vscodium after '--', e.g. -- --jobs 8",
+    )
+    args = parser.parse_args(args)
+    cli_args = [arg for arg in args.cli_args if arg != "--"]
+
+    settings = MarketplaceSettings(
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+        error_rate=args.error_rate,
+        vsix_size=args.vsix_size,
+    )
+    results = []
+    with FakeMarketplace(settings) as marketplace:
+        for extension_count in args.extensions:
+            with tempfile.TemporaryDirectory(prefix="vsix-bench-") as work_dir:
+                runs = ["cold", "warm"] if args.warm else ["cold"]
+                for run in runs:
+                    results.append(
+                        run_transfer(
+                            marketplace,
+                            extension_count,
+                            work_dir,
+                            run,
+                            cli_args,
+                            args.install_delay,
+                            args.launch_delay,
+                            args.verbose,
+                        )
+                    )
+    _print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Shared helpers for the tests."""
+
+import io
+import json
+from typing import Dict, Optional
+import zipfile
+
+VSIX_MANIFEST_TEMPLATE = """<?xml version="1.0" encoding="utf-8"?>
+<PackageManifest Version="2.0.0" xmlns="http://schemas.microsoft.com/developer/vsx-schema/2011">
+  <Metadata>
+    <Identity Language="en-US" Id="{name}" Version="{version}" Publisher="{publisher}"{platform}/>
+    <DisplayName>{name}</DisplayName>
+  </Metadata>
+</PackageManifest>
+"""
+
+
+def make_vsix(
+    path: str,
+    publisher: str,
+    name: str,
+    version: str,
+    files: Optional[Dict[str, bytes]] = None,
+    target_platform: Optional[str] = None,
+    **manifest,
+) -> str:
+    """Write a minimal .vsix package and return its path."""
+    package_json = {"publisher": publisher, "name": name, "version": version, **manifest}
+    platform = f' TargetPlatform="{target_platform}"' if target_platform else ""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "extension.vsixmanifest",
+            VSIX_MANIFEST_TEMPLATE.format(
+                publisher=publisher, name=name, version=version, platform=platform
+            ),
+        )
+        archive.writestr("extension/package.json", json.dumps(package_json))
+        for member, content in (files or {}).items():
+            archive.writestr(f"extension/{member}", content)
+    return path
+
+
+def vsix_bytes(
+    publisher: str = "publisher", name: str = "extension", version: str = "1.0.0"
+) -> bytes:
+    """Build a minimal .vsix package in memory, e.g. as a download body."""
+    buffer = io.BytesIO()
+    make_vsix(buffer, publisher, name, version)
+    return buffer.getvalue()
@@ -0,0 +1,103 @@
+"""Tests for offline extension bundles."""
+
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+
+from tests.helpers import make_vsix
+from vsix_to_vscodium.bundle import (
+    BundleEntry,
+    BundleError,
+    BundleReader,
+    dependency_order,
+    write_bundle,
+)
+
+
+def entry(ext_id, *dependencies):
+    return BundleEntry(ext_id, "1.0.0", f"{ext_id}.vsix", "", 0, dependencies=list(dependencies))
+
+
+class TestDependencyOrder(unittest.TestCase):
+    def test_dependencies_come_first(self):
+        entries = [
+            entry("pub.app", "pub.lib", "other.missing"),
+            entry("pub.pack", "pub.app", "pub.lib"),
+            entry("pub.lib", "pub.base"),
+            entry("pub.base"),
+        ]
+
+        ordered = [e.extension_id for e in dependency_order(entries)]
+
+        self.assertEqual(ordered, ["pub.base", "pub.lib", "pub.app", "pub.pack"])
+
+    def test_cycles_are_kept(self):
+        entries = [entry("pub.a", "Pub.B"), entry("pub.b", "pub.a"), entry("pub.c")]
+
+        ordered = [e.extension_id for e in dependency_order(entries)]
+
+        self.assertEqual(ordered, ["pub.c", "pub.a", "pub.b"])
+
+
+class TestBundle(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.bundle_path = os.path.join(self.tmp_dir.name, "extensions.bundle")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def vsix(self, name, **manifest):
+        path = os.path.join(self.tmp_dir.name, f"{name}.vsix")
+        return make_vsix(path, "pub", name, "1.0.0", files={"main.js": name.encode()}, **manifest)
+
+    def test_round_trip(self):
+        vsix_paths = [
+            self.vsix("app", extensionDependencies=["pub.lib"]),
+            self.vsix("lib", target_platform="linux-x64"),
+        ]
+
+        entries = write_bundle(self.bundle_path, vsix_paths)
+
+        self.assertEqual([e.extension_id for e in entries], ["pub.lib", "pub.app"])
+        self.assertEqual(entries[0].file, "extensions/pub.lib-1.0.0@linux-x64.vsix")
+        self.assertEqual(entries[1].dependencies, ["pub.lib"])
+        with zipfile.ZipFile(self.bundle_path) as archive:
+            # Packages are stored as they are so they can be read by offset
+            self.assertTrue(
+                all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+            )
+
+        output_dir = os.path.join(self.tmp_dir.name, "out")
+        os.makedirs(output_dir)
+        with BundleReader(self.bundle_path) as reader:
+            self.assertEqual(reader.entries, entries)
+            for bundled, original in zip(reader.entries, reversed(vsix_paths)):
+                copied = reader.copy_to(bundled, output_dir)
+                with open(copied, "rb") as f, open(original, "rb") as g:
+                    self.assertEqual(f.read(), g.read())
+
+    def test_corrupt_package_is_detected(self):
+        write_bundle(self.bundle_path, [self.vsix("ext")])
+        with BundleReader(self.bundle_path) as reader:
+            [bundled] = reader.entries
+            offset = reader._offsets[bundled.file]
+        with open(self.bundle_path, "r+b") as f:
+            f.seek(offset + 10)
+            f.write(b"corrupted")
+
+        with BundleReader(self.bundle_path) as reader:
+            with self.assertRaises(BundleError):
+                reader.copy_to(reader.entries[0], self.tmp_dir.name)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, "pub.ext-1.0.0.vsix")))
+
+    def test_not_a_bundle(self):
+        with zipfile.ZipFile(self.bundle_path, "w") as archive:
+            archive.writestr("index.json", json.dumps({"format": 99, "extensions": []}))
+
+        with self.assertRaises(BundleError):
+            BundleReader(self.bundle_path)
+        with self.assertRaises(BundleError):
+            BundleReader(self.vsix("ext"))
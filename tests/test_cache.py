@@ -0,0 +1,195 @@
+"""Tests for the extension package cache."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from tests.helpers import vsix_bytes
+from vsix_to_vscodium.cache import (
+    CACHE_DIR_ENV,
+    MetadataCache,
+    VsixCache,
+    cache_key,
+    format_size,
+    get_cache_dir,
+    parse_size,
+)
+
+
+class TestVsixCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = VsixCache(self.tmp_dir.name, max_size=1000)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def add(self, key, content):
+        partial_path = self.cache.partial_path(key)
+        with open(partial_path, "wb") as f:
+            f.write(content)
+        return self.cache.put(key, partial_path)
+
+    def test_get_miss(self):
+        self.assertIsNone(self.cache.get("pub.ext-1.0.0"))
+
+    def test_put_and_get(self):
+        path = self.add("pub.ext-1.0.0", b"content")
+
+        self.assertEqual(self.cache.get("pub.ext-1.0.0"), path)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"content")
+        # The downloaded file is moved into the cache
+        self.assertEqual(os.listdir(self.cache.partial_dir), [])
+
+    def test_index_is_persistent(self):
+        path = self.add("pub.ext-1.0.0", b"content")
+
+        reopened = VsixCache(self.tmp_dir.name)
+
+        self.assertEqual(reopened.get("pub.ext-1.0.0"), path)
+
+    def test_identical_content_stored_once(self):
+        first = self.add("pub.ext-1.0.0", b"content")
+        second = self.add("pub.ext-1.0.0@linux-x64", b"content")
+
+        self.assertEqual(first, second)
+        stats = self.cache.stats()
+        self.assertEqual(stats.entries, 2)
+        self.assertEqual(stats.total_size, len(b"content"))
+
+    def test_corrupted_entry_is_dropped(self):
+        path = self.add("pub.ext-1.0.0", b"content")
+        with open(path, "wb") as f:
+            f.write(b"truncated")
+
+        with patch("builtins.print"):
+            self.assertIsNone(self.cache.get("pub.ext-1.0.0"))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.cache.stats().entries, 0)
+        # The corrupt file is kept aside until the next prune
+        self.assertEqual(os.listdir(self.cache.quarantine_dir), [os.path.basename(path)])
+        self.cache.prune()
+        self.assertEqual(os.listdir(self.cache.quarantine_dir), [])
+
+    def test_hit_is_validated_without_reading_the_package(self):
+        path = self.add("pub.ext-1.0.0", b"content")
+
+        with patch("vsix_to_vscodium.cache.hash_file") as mock_hash:
+            self.assertEqual(self.cache.get("pub.ext-1.0.0"), path)
+        mock_hash.assert_not_called()
+
+    def test_put_with_known_digest_does_not_hash(self):
+        partial_path = self.cache.partial_path("pub.ext-1.0.0")
+        with open(partial_path, "wb") as f:
+            f.write(b"content")
+
+        with patch("vsix_to_vscodium.cache.hash_file") as mock_hash:
+            path = self.cache.put("pub.ext-1.0.0", partial_path, sha256="ab" * 32)
+        mock_hash.assert_not_called()
+        self.assertEqual(path, self.cache.object_path("ab" * 32))
+
+    def test_touched_package_is_checked_again(self):
+        path = self.add("pub.ext-1.0.0", vsix_bytes())
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self.assertEqual(self.cache.get("pub.ext-1.0.0"), path)
+        # The sidecar now matches again, so the next hit reads nothing
+        with patch("vsix_to_vscodium.cache.hash_file") as mock_hash:
+            self.assertEqual(self.cache.get("pub.ext-1.0.0"), path)
+        mock_hash.assert_not_called()
+
+    def test_evicts_least_recently_used(self):
+        with patch("time.time", side_effect=[1, 2, 3, 4]):
+            self.add("pub.a-1", b"a" * 400)
+            self.add("pub.b-1", b"b" * 400)
+            # Using 'a' makes 'b' the least recently used entry
+            self.cache.get("pub.a-1")
+            self.add("pub.c-1", b"c" * 400)
+
+        self.assertIsNotNone(self.cache.get("pub.a-1"))
+        self.assertIsNone(self.cache.get("pub.b-1"))
+        self.assertIsNotNone(self.cache.get("pub.c-1"))
+
+    def test_prune(self):
+        self.add("pub.a-1", b"a" * 400)
+        self.add("pub.b-1", b"b" * 400)
+
+        evicted = self.cache.prune(max_size=500)
+
+        self.assertEqual(evicted, ["pub.a-1"])
+        self.assertEqual(self.cache.stats().total_size, 400)
+        self.assertEqual(self.cache.prune(max_size=0), ["pub.b-1"])
+        # Sidecars go along with their packages
+        stored = [files for _, _, files in os.walk(self.cache.objects_dir) if files]
+        self.assertEqual(stored, [])
+
+
+class TestMetadataCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.metadata_cache = MetadataCache(self.tmp_dir.name, ttl=60)
+        self.metadata = {"publisher": "pub", "name": "ext", "version": "1.0.0"}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_lookup_respects_ttl(self):
+        with patch("time.time", return_value=1000):
+            self.metadata_cache.store({"Pub.Ext": self.metadata})
+        with patch("time.time", return_value=1059):
+            self.assertEqual(self.metadata_cache.lookup(["pub.ext"]), {"pub.ext": self.metadata})
+        with patch("time.time", return_value=1060):
+            self.assertEqual(self.metadata_cache.lookup(["pub.ext"]), {})
+            self.metadata_cache.offline = True
+            self.assertEqual(self.metadata_cache.lookup(["pub.ext"]), {"pub.ext": self.metadata})
+
+    def test_etag_requires_cached_results(self):
+        self.metadata_cache.store({"pub.ext": self.metadata}, "query", '"etag"')
+        self.assertEqual(self.metadata_cache.get_etag("query"), '"etag"')
+        self.assertIsNone(self.metadata_cache.get_etag("other-query"))
+
+        # An answer without an ETag forgets the previous one
+        self.metadata_cache.store({"pub.ext": self.metadata}, "query")
+        self.assertIsNone(self.metadata_cache.get_etag("query"))
+
+    def test_revalidate_refreshes_entries(self):
+        with patch("time.time", return_value=1000):
+            self.metadata_cache.store({"pub.ext": self.metadata}, "query", '"etag"')
+        with patch("time.time", return_value=2000):
+            self.assertEqual(
+                self.metadata_cache.revalidate("query"), {"pub.ext": self.metadata}
+            )
+            self.assertEqual(self.metadata_cache.lookup(["pub.ext"]), {"pub.ext": self.metadata})
+
+
+class TestCacheHelpers(unittest.TestCase):
+    def test_cache_key(self):
+        self.assertEqual(cache_key("MS-Python", "Python", "1.0.0"), "ms-python.python-1.0.0")
+        self.assertEqual(
+            cache_key("pub", "ext", "1.0.0", "linux-x64"), "pub.ext-1.0.0@linux-x64"
+        )
+
+    def test_get_cache_dir_override(self):
+        with patch.dict(os.environ, {CACHE_DIR_ENV: "/tmp/custom-cache"}):
+            self.assertEqual(get_cache_dir(), "/tmp/custom-cache")
+
+    @patch("sys.platform", "linux")
+    def test_get_cache_dir_xdg(self):
+        with patch.dict(os.environ, {"XDG_CACHE_HOME": "/tmp/xdg"}):
+            os.environ.pop(CACHE_DIR_ENV, None)
+            self.assertEqual(get_cache_dir(), os.path.join("/tmp/xdg", "vsix-to-vscodium"))
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size("1024"), 1024)
+        self.assertEqual(parse_size("500M"), 500 * 1024**2)
+        self.assertEqual(parse_size("1.5GiB"), int(1.5 * 1024**3))
+        with self.assertRaises(ValueError):
+            parse_size("lots")
+
+    def test_format_size(self):
+        self.assertEqual(format_size(512), "512 B")
+        self.assertEqual(format_size(1536), "1.5 KiB")
+        self.assertEqual(format_size(3 * 1024**3), "3.0 GiB")
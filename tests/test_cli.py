@@ -1,57 +1,96 @@
 """Tests for vsix-to-vscodium CLI."""
 
 import unittest
-from unittest.mock import patch, MagicMock, mock_open
+from unittest.mock import patch, ANY, MagicMock
 import subprocess
 import requests
 import json
 import sys
 import os
+import tempfile
+import zipfile
 
+from tests.helpers import make_vsix, vsix_bytes
 from vsix_to_vscodium.cli import (
     download_extension,
     main,
     get_vscode_extensions,
     install_extension,
 )
+from vsix_to_vscodium.cache import (
+    CACHE_DIR_ENV,
+    configure_cache,
+    configure_metadata_cache,
+)
+from vsix_to_vscodium.compatibility import IdeTarget
+from vsix_to_vscodium.marketplace import ExtensionMetadata
+from vsix_to_vscodium.transport import configure_session
+
+PACKAGE = vsix_bytes()
+
+
+def install_all(vsix_paths, ide_name):
+    return {vsix_path: None for vsix_path in vsix_paths}
+
+
+def installed_paths(mock_install, ide_name):
+    paths = []
+    for call in mock_install.call_args_list:
+        if call[0][1] == ide_name:
+            paths.extend(call[0][0])
+    return sorted(paths)
 
 
 class TestExtensionManager(unittest.TestCase):
     def setUp(self):
-        # Create a temporary extensions directory if it doesn't exist
-        os.makedirs("extensions", exist_ok=True)
+        # Keep downloads in a temporary cache directory
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {CACHE_DIR_ENV: self.cache_dir.name})
+        self.env.start()
+        self.cache = configure_cache(root=self.cache_dir.name)
+        self.metadata_cache = configure_metadata_cache(root=self.cache_dir.name)
+        # Resolve versions without asking the IDE for its engine version
+        self.target = patch(
+            "vsix_to_vscodium.api.get_ide_target", return_value=IdeTarget()
+        )
+        self.target.start()
 
     def tearDown(self):
-        # Clean up any test files in extensions directory
-        test_files = [
-            "extensions/publisher.extension-1.0.0.vsix",
-            "extensions/publisher.extension-2.0.0.vsix",
-        ]
-        for file in test_files:
-            if os.path.exists(file):
-                os.remove(file)
-
-    @patch("requests.post")
-    @patch("requests.get")
+        self.target.stop()
+        self.env.stop()
+        self.cache_dir.cleanup()
+        configure_cache()
+        configure_metadata_cache()
+        configure_session()
+
+    @patch("requests.Session.post")
+    @patch("requests.Session.get")
     def test_download_extension_success(self, mock_get, mock_post):
         # Mock the API query response
-        mock_post_response = MagicMock()
+        mock_post_response = MagicMock(status_code=200, headers={})
         mock_post_response.json.return_value = {
-            "results": [{"extensions": [{"versions": [{"version": "1.0.0"}]}]}]
+            "results": [
+                {
+                    "extensions": [
+                        {
+                            "publisher": {"publisherName": "publisher"},
+                            "extensionName": "extension",
+                            "versions": [{"version": "1.0.0"}],
+                        }
+                    ]
+                }
+            ]
         }
         mock_post.return_value = mock_post_response
 
         # Mock the download response
-        mock_get_response = MagicMock()
-        mock_get_response.content = b"mock extension content"
+        mock_get_response = MagicMock(status_code=200, headers={})
+        mock_get_response.iter_content.return_value = [PACKAGE]
         mock_get.return_value = mock_get_response
 
         extension_id = "publisher.extension"
-        expected_path = "./extensions/publisher.extension-1.0.0.vsix"
 
-        # Use mock_open to avoid actually writing to disk
-        with patch('builtins.open', mock_open()) as mock_file:
-            result = download_extension(extension_id)
+        result = download_extension(extension_id)
 
         # Verify API query
         mock_post.assert_called_once()
@@ -64,65 +103,107 @@ class TestExtensionManager(unittest.TestCase):
         mock_get.assert_called_once()
         expected_download_url = "https://publisher.gallery.vsassets.io/_apis/public/gallery/publisher/publisher/extension/extension/1.0.0/assetbyname/Microsoft.VisualStudio.Services.VSIXPackage"
         self.assertEqual(mock_get.call_args[0][0], expected_download_url)
+        self.assertTrue(mock_get.call_args[1]["stream"])
+
+        # Verify the package was stored in the cache
+        self.assertEqual(result, self.cache.get("publisher.extension-1.0.0"))
+        self.assertTrue(result.startswith(self.cache_dir.name))
+        with open(result, "rb") as f:
+            self.assertEqual(f.read(), PACKAGE)
+
+    @patch("requests.Session.get")
+    def test_download_platform_package(self, mock_get):
+        mock_get_response = MagicMock(status_code=200, headers={})
+        mock_get_response.iter_content.return_value = [PACKAGE]
+        mock_get.return_value = mock_get_response
+        metadata = ExtensionMetadata(
+            "publisher.extension", "publisher", "extension", "1.0.0", "linux-x64"
+        )
 
-        # Verify file writing
-        mock_file.assert_called_once_with(expected_path, "wb")
-        mock_file().write.assert_called_once_with(b"mock extension content")
+        result = download_extension("publisher.extension", metadata=metadata)
 
-        self.assertEqual(result, expected_path)
+        self.assertTrue(mock_get.call_args[0][0].endswith("?targetPlatform=linux-x64"))
+        self.assertEqual(result, self.cache.get("publisher.extension-1.0.0@linux-x64"))
+        self.assertIsNone(self.cache.get("publisher.extension-1.0.0"))
 
-    @patch("requests.post")
-    @patch("requests.get")
+    @patch("requests.Session.post")
+    @patch("requests.Session.get")
     def test_download_specific_version(self, mock_get, mock_post):
         mock_post_response = MagicMock()
         mock_post.return_value = mock_post_response
 
-        mock_get_response = MagicMock()
-        mock_get_response.content = b"mock extension content"
+        mock_get_response = MagicMock(status_code=200, headers={})
+        mock_get_response.iter_content.return_value = [PACKAGE]
         mock_get.return_value = mock_get_response
 
         extension_id = "publisher.extension"
         specific_version = "2.0.0"
-        expected_path = f"./extensions/{extension_id}-{specific_version}.vsix"
 
-        with patch("builtins.open", mock_open()) as mock_file:
-            result = download_extension(extension_id, specific_version=specific_version)
+        result = download_extension(extension_id, specific_version=specific_version)
 
-        self.assertEqual(result, expected_path)
+        self.assertEqual(result, self.cache.get(f"{extension_id}-{specific_version}"))
         expected_download_url = f"https://publisher.gallery.vsassets.io/_apis/public/gallery/publisher/publisher/extension/extension/{specific_version}/assetbyname/Microsoft.VisualStudio.Services.VSIXPackage"
         self.assertEqual(mock_get.call_args[0][0], expected_download_url)
 
-    @patch("os.path.exists")
-    @patch("requests.post")
-    def test_download_extension_cached(self, mock_post, mock_exists):
+    @patch("requests.Session.post")
+    def test_download_extension_cached(self, mock_post):
         # Mock the API query response for version check
-        mock_post_response = MagicMock()
+        mock_post_response = MagicMock(status_code=200, headers={})
         mock_post_response.json.return_value = {
-            "results": [{"extensions": [{"versions": [{"version": "1.0.0"}]}]}]
+            "results": [
+                {
+                    "extensions": [
+                        {
+                            "publisher": {"publisherName": "publisher"},
+                            "extensionName": "extension",
+                            "versions": [{"version": "1.0.0"}],
+                        }
+                    ]
+                }
+            ]
         }
         mock_post.return_value = mock_post_response
 
-        # Mock that the file already exists
-        mock_exists.return_value = True
+        # Seed the cache with the package
+        partial_path = self.cache.partial_path("publisher.extension-1.0.0")
+        with open(partial_path, "wb") as f:
+            f.write(b"cached extension content")
+        expected_path = self.cache.put("publisher.extension-1.0.0", partial_path)
 
         extension_id = "publisher.extension"
-        expected_path = "./extensions/publisher.extension-1.0.0.vsix"
 
         # Should return the cached path without making any download requests
-        with patch("requests.get") as mock_get:
+        with patch("requests.Session.get") as mock_get:
             result = download_extension(extension_id)
             mock_get.assert_not_called()
 
         self.assertEqual(result, expected_path)
 
-    @patch("requests.post")
+    @patch("requests.Session.get")
+    def test_download_extension_no_cache(self, mock_get):
+        partial_path = self.cache.partial_path("publisher.extension-1.0.0")
+        with open(partial_path, "wb") as f:
+            f.write(b"stale content")
+        self.cache.put("publisher.extension-1.0.0", partial_path)
+        mock_get.return_value = MagicMock(status_code=200, headers={})
+        mock_get.return_value.iter_content.return_value = [PACKAGE]
+
+        result = download_extension(
+            "publisher.extension", specific_version="1.0.0", no_cache=True
+        )
+
+        mock_get.assert_called_once()
+        with open(result, "rb") as f:
+            self.assertEqual(f.read(), PACKAGE)
+
+    @patch("requests.Session.post")
     def test_download_extension_invalid_id(self, mock_post):
         with self.assertRaises(SystemExit) as cm:
             download_extension("invalid_id")
         self.assertEqual(cm.exception.code, 1)
         mock_post.assert_not_called()
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_download_extension_api_error(self, mock_post):
         mock_post.side_effect = requests.exceptions.RequestException("API Error")
 
@@ -171,20 +252,8 @@ class TestExtensionManager(unittest.TestCase):
             mock_run.assert_called_once_with(
                 ["test-ide", "--install-extension", vsix_path], check=True
             )
-            mock_remove.assert_called_once_with(vsix_path)
-
-    def test_install_extension_cleanup_error(self):
-        """Test when cleanup fails but installation succeeds."""
-        vsix_path = "./extensions/test.vsix"
-        ide_name = "test-ide"
-
-        with patch("subprocess.run") as mock_run, patch(
-            "os.remove", side_effect=OSError("Permission denied")
-        ):
-            install_extension(vsix_path, ide_name)
-
-            mock_run.assert_called_once()  # Installation should still happen
-            # Function should complete without raising an exception
+            # The cached package is kept for later installs
+            mock_remove.assert_not_called()
 
     def test_install_extension_installation_error(self):
         """Test when installation fails."""
@@ -197,17 +266,22 @@ class TestExtensionManager(unittest.TestCase):
             with self.assertRaises(subprocess.CalledProcessError):
                 install_extension(vsix_path, ide_name)
 
-            # Verify cleanup happens even when installation fails
-            mock_remove.assert_called_once_with(vsix_path)
+            mock_remove.assert_not_called()
 
     @patch("vsix_to_vscodium.cli.get_vscode_extensions")
+    @patch("vsix_to_vscodium.cli.resolve_extensions")
     @patch("vsix_to_vscodium.cli.download_extension")
-    @patch("vsix_to_vscodium.cli.install_extension")
+    @patch("vsix_to_vscodium.cli.install_extensions", side_effect=install_all)
     def test_main_transfer_all_success(
-        self, mock_install, mock_download, mock_get_extensions
+        self, mock_install, mock_download, mock_resolve, mock_get_extensions
     ):
         """Test successful transfer of all extensions."""
         mock_get_extensions.return_value = ["pub1.ext1", "pub2.ext2"]
+        metadata = {
+            "pub1.ext1": ExtensionMetadata("pub1.ext1", "pub1", "ext1", "1.0.0"),
+            "pub2.ext2": ExtensionMetadata("pub2.ext2", "pub2", "ext2", "2.0.0"),
+        }
+        mock_resolve.return_value = (metadata, [])
         mock_download.side_effect = [
             "./extensions/pub1.ext1.vsix",
             "./extensions/pub2.ext2.vsix",
@@ -216,37 +290,50 @@ class TestExtensionManager(unittest.TestCase):
         main(["--transfer-all"])
 
         self.assertEqual(mock_get_extensions.call_count, 1)
+        # All metadata is resolved up front in a single call
+        mock_resolve.assert_called_once_with(
+            ["pub1.ext1", "pub2.ext2"], metadata_cache=ANY, target=IdeTarget()
+        )
         self.assertEqual(mock_download.call_count, 2)
-        self.assertEqual(mock_install.call_count, 2)
+        self.assertEqual(
+            installed_paths(mock_install, "codium"),
+            ["./extensions/pub1.ext1.vsix", "./extensions/pub2.ext2.vsix"],
+        )
 
         # Verify calls were made with correct arguments
-        mock_download.assert_any_call("pub1.ext1")
-        mock_download.assert_any_call("pub2.ext2")
-        mock_install.assert_any_call("./extensions/pub1.ext1.vsix", "codium")
-        mock_install.assert_any_call("./extensions/pub2.ext2.vsix", "codium")
+        mock_download.assert_any_call(
+            "pub1.ext1", metadata=metadata["pub1.ext1"], target=IdeTarget()
+        )
+        mock_download.assert_any_call(
+            "pub2.ext2", metadata=metadata["pub2.ext2"], target=IdeTarget()
+        )
 
     @patch("vsix_to_vscodium.cli.get_vscode_extensions")
+    @patch("vsix_to_vscodium.cli.resolve_extensions")
     @patch("vsix_to_vscodium.cli.download_extension")
-    @patch("vsix_to_vscodium.cli.install_extension")
+    @patch("vsix_to_vscodium.cli.install_extensions", side_effect=install_all)
     def test_main_transfer_all_custom_ide(
-        self, mock_install, mock_download, mock_get_extensions
+        self, mock_install, mock_download, mock_resolve, mock_get_extensions
     ):
         """Test transferring all extensions to a custom IDE."""
         mock_get_extensions.return_value = ["pub1.ext1"]
+        mock_resolve.return_value = ({}, [])
         mock_download.return_value = "./extensions/pub1.ext1.vsix"
 
         main(["--transfer-all", "--ide", "windsurf"])
 
-        mock_install.assert_called_once_with("./extensions/pub1.ext1.vsix", "windsurf")
+        mock_install.assert_called_once_with(["./extensions/pub1.ext1.vsix"], "windsurf")
 
     @patch("vsix_to_vscodium.cli.get_vscode_extensions")
+    @patch("vsix_to_vscodium.cli.resolve_extensions")
     @patch("vsix_to_vscodium.cli.download_extension")
-    @patch("vsix_to_vscodium.cli.install_extension")
+    @patch("vsix_to_vscodium.cli.install_extensions", side_effect=install_all)
     def test_main_transfer_all_partial_failure(
-        self, mock_install, mock_download, mock_get_extensions
+        self, mock_install, mock_download, mock_resolve, mock_get_extensions
     ):
         """Test when some extensions fail to transfer."""
         mock_get_extensions.return_value = ["pub1.ext1", "pub2.ext2"]
+        mock_resolve.return_value = ({}, [])
         mock_download.side_effect = [
             "./extensions/pub1.ext1.vsix",
             requests.exceptions.RequestException("API Error"),
@@ -255,18 +342,79 @@ class TestExtensionManager(unittest.TestCase):
         main(["--transfer-all"])
 
         # Should still try to install the successful download
-        mock_install.assert_called_once_with("./extensions/pub1.ext1.vsix", "codium")
+        mock_install.assert_called_once_with(["./extensions/pub1.ext1.vsix"], "codium")
+
+    @patch("vsix_to_vscodium.cli.get_vscode_extensions")
+    @patch("vsix_to_vscodium.cli.resolve_extensions")
+    @patch("vsix_to_vscodium.cli.download_extension")
+    @patch("vsix_to_vscodium.cli.install_extensions", side_effect=install_all)
+    def test_main_transfer_all_skips_unresolved(
+        self, mock_install, mock_download, mock_resolve, mock_get_extensions
+    ):
+        """Test that extensions missing from the Marketplace are skipped."""
+        mock_get_extensions.return_value = ["pub1.ext1", "pub2.ext2"]
+        metadata = ExtensionMetadata("pub1.ext1", "pub1", "ext1", "1.0.0")
+        mock_resolve.return_value = ({"pub1.ext1": metadata}, ["pub2.ext2"])
+        mock_download.return_value = "./extensions/pub1.ext1.vsix"
+
+        main(["--transfer-all"])
+
+        mock_download.assert_called_once_with(
+            "pub1.ext1", metadata=metadata, target=IdeTarget()
+        )
+        mock_install.assert_called_once_with(["./extensions/pub1.ext1.vsix"], "codium")
+
+    @patch("vsix_to_vscodium.cli.get_vscode_extensions")
+    @patch("vsix_to_vscodium.cli.resolve_extensions")
+    @patch("vsix_to_vscodium.cli.download_extension")
+    @patch("vsix_to_vscodium.cli.install_extensions", side_effect=install_all)
+    def test_main_transfer_all_bulk_query_failure(
+        self, mock_install, mock_download, mock_resolve, mock_get_extensions
+    ):
+        """Test falling back to per-extension queries when the bulk query fails."""
+        mock_get_extensions.return_value = ["pub1.ext1"]
+        mock_resolve.side_effect = requests.exceptions.RequestException("API Error")
+        mock_download.return_value = "./extensions/pub1.ext1.vsix"
+
+        main(["--transfer-all"])
+
+        mock_download.assert_called_once_with(
+            "pub1.ext1", metadata=None, target=IdeTarget()
+        )
+        mock_install.assert_called_once_with(["./extensions/pub1.ext1.vsix"], "codium")
+
+    @patch("vsix_to_vscodium.cli.get_vscode_extensions")
+    @patch("vsix_to_vscodium.cli.resolve_extensions")
+    @patch("vsix_to_vscodium.cli.download_extension")
+    @patch("vsix_to_vscodium.api.install_extensions")
+    def test_main_transfer_all_install_failure(
+        self, mock_install, mock_download, mock_resolve, mock_get_extensions
+    ):
+        """Test that a failed install is reported for its own extension."""
+        mock_get_extensions.return_value = ["pub1.ext1", "pub2.ext2"]
+        mock_resolve.return_value = ({}, [])
+        mock_download.side_effect = lambda ext_id, metadata, target: f"./extensions/{ext_id}.vsix"
+        mock_install.side_effect = lambda paths, ide: {
+            path: subprocess.CalledProcessError(1, ide) if "pub2" in path else None
+            for path in paths
+        }
+
+        with patch("builtins.print") as mock_print:
+            main(["--transfer-all"])
+
+        output = "\n".join(str(call[0][0]) for call in mock_print.call_args_list if call[0])
+        self.assertIn("Failed to transfer 1 extensions: pub2.ext2", output)
 
     def test_main_single_extension_custom_ide(self):
         """Test installing single extension with custom IDE."""
-        with patch("vsix_to_vscodium.cli.download_extension") as mock_download, patch(
+        with patch("vsix_to_vscodium.api.download_extension") as mock_download, patch(
             "vsix_to_vscodium.cli.install_extension"
         ) as mock_install:
             mock_download.return_value = "./extensions/test.vsix"
 
             main(["--ide", "windsurf", "publisher.extension"])
 
-            mock_download.assert_called_once_with("publisher.extension")
+            mock_download.assert_called_once_with("publisher.extension", target=IdeTarget())
             mock_install.assert_called_once_with("./extensions/test.vsix", "windsurf")
 
     def test_main_no_args_shows_help(self):
@@ -278,39 +426,14 @@ class TestExtensionManager(unittest.TestCase):
     @patch('vsix_to_vscodium.cli.download_extension')
     @patch('subprocess.run')
     @patch('os.remove')
-    def test_main_success_with_cleanup(self, mock_remove, mock_run, mock_download):
+    def test_main_success_keeps_cached_package(self, mock_remove, mock_run, mock_download):
         vsix_path = "./extensions/publisher.extension-1.0.0.vsix"
         mock_download.return_value = vsix_path
         mock_run.return_value.returncode = 0
 
         main(["publisher.extension"])
 
-        mock_download.assert_called_once_with("publisher.extension")
-        mock_run.assert_called_once_with(
-            [
-                "codium",
-                "--install-extension",
-                vsix_path,
-            ],
-            check=True,
-        )
-        # Verify cleanup
-        mock_remove.assert_called_once_with(vsix_path)
-
-    @patch('vsix_to_vscodium.cli.download_extension')
-    @patch('subprocess.run')
-    @patch('os.remove')
-    def test_main_cleanup_error(self, mock_remove, mock_run, mock_download):
-        vsix_path = "./extensions/publisher.extension-1.0.0.vsix"
-        mock_download.return_value = vsix_path
-        mock_run.return_value.returncode = 0
-        mock_remove.side_effect = OSError("Permission denied")
-
-        # Should complete successfully even if cleanup fails
-        main(["publisher.extension"])
-
-        mock_remove.assert_called_once_with(vsix_path)
-        # Verify that the installation completed
+        mock_download.assert_called_once_with("publisher.extension", target=IdeTarget())
         mock_run.assert_called_once_with(
             [
                 "codium",
@@ -319,6 +442,8 @@ class TestExtensionManager(unittest.TestCase):
             ],
             check=True,
         )
+        # The package stays in the cache
+        mock_remove.assert_not_called()
 
     @patch("vsix_to_vscodium.cli.download_extension")
     @patch("subprocess.run")
@@ -333,5 +458,458 @@ class TestExtensionManager(unittest.TestCase):
             main(["publisher.extension"])
 
         self.assertEqual(cm.exception.code, 1)
-        # Verify cleanup happens even when installation fails
-        mock_remove.assert_called_once_with(vsix_path)
+        mock_remove.assert_not_called()
+
+    @patch("vsix_to_vscodium.cli.get_vscode_extensions")
+    @patch("vsix_to_vscodium.cli.resolve_extensions")
+    @patch("vsix_to_vscodium.api.run_pipeline")
+    def test_main_transfer_all_jobs(
+        self, mock_pipeline, mock_resolve, mock_get_extensions
+    ):
+        """Test that --jobs sets the number of parallel downloads."""
+        mock_get_extensions.return_value = ["pub1.ext1"]
+        mock_resolve.return_value = ({}, [])
+        mock_pipeline.return_value = []
+
+        main(["--transfer-all", "--jobs", "8"])
+
+        self.assertEqual(mock_pipeline.call_args[1]["jobs"], 8)
+
+    def test_main_invalid_jobs(self):
+        with patch("sys.stderr"):
+            with self.assertRaises(SystemExit):
+                main(["--transfer-all", "--jobs", "0"])
+
+    def test_main_cache_stats(self):
+        partial_path = self.cache.partial_path("publisher.extension-1.0.0")
+        with open(partial_path, "wb") as f:
+            f.write(b"x" * 2048)
+        self.cache.put("publisher.extension-1.0.0", partial_path)
+
+        with patch("builtins.print") as mock_print:
+            main(["cache", "stats"])
+
+        output = "\n".join(call[0][0] for call in mock_print.call_args_list)
+        self.assertIn(f"Cache directory: {self.cache_dir.name}", output)
+        self.assertIn("Cached extensions: 1", output)
+        self.assertIn("Size: 2.0 KiB", output)
+
+    def test_main_cache_prune(self):
+        for version in ["1.0.0", "2.0.0"]:
+            key = f"publisher.extension-{version}"
+            partial_path = self.cache.partial_path(key)
+            with open(partial_path, "wb") as f:
+                f.write(version.encode() * 100)
+            self.cache.put(key, partial_path)
+
+        with patch("builtins.print"):
+            main(["cache", "prune", "--max-size", "0"])
+
+        self.assertEqual(configure_cache(root=self.cache_dir.name).stats().entries, 0)
+
+    @patch("requests.Session.post")
+    @patch("requests.Session.get")
+    def test_download_extension_warm_cache_makes_no_requests(self, mock_get, mock_post):
+        mock_post.return_value = MagicMock(status_code=200, headers={})
+        mock_post.return_value.json.return_value = {
+            "results": [
+                {
+                    "extensions": [
+                        {
+                            "publisher": {"publisherName": "publisher"},
+                            "extensionName": "extension",
+                            "versions": [{"version": "1.0.0"}],
+                        }
+                    ]
+                }
+            ]
+        }
+        mock_get.return_value = MagicMock(status_code=200, headers={})
+        mock_get.return_value.iter_content.return_value = [PACKAGE]
+        first = download_extension("publisher.extension")
+        mock_post.reset_mock()
+        mock_get.reset_mock()
+
+        second = download_extension("publisher.extension")
+
+        self.assertEqual(first, second)
+        mock_post.assert_not_called()
+        mock_get.assert_not_called()
+
+    def test_main_offline_uses_cache_only(self):
+        self.metadata_cache.store(
+            {"publisher.extension": {"publisher": "publisher", "name": "extension", "version": "1.0.0"}}
+        )
+        partial_path = self.cache.partial_path("publisher.extension-1.0.0")
+        with open(partial_path, "wb") as f:
+            f.write(b"cached extension content")
+        vsix_path = self.cache.put("publisher.extension-1.0.0", partial_path)
+
+        with patch("subprocess.run") as mock_run, patch(
+            "requests.adapters.HTTPAdapter.send"
+        ) as mock_send:
+            main(["--offline", "--metadata-ttl", "0", "publisher.extension"])
+
+        mock_send.assert_not_called()
+        mock_run.assert_called_once_with(
+            ["codium", "--install-extension", vsix_path], check=True
+        )
+
+    def test_main_offline_without_cached_package(self):
+        self.metadata_cache.store(
+            {"publisher.extension": {"publisher": "publisher", "name": "extension", "version": "1.0.0"}}
+        )
+
+        with patch("builtins.print") as mock_print:
+            with self.assertRaises(SystemExit) as cm:
+                main(["--offline", "publisher.extension"])
+
+        self.assertEqual(cm.exception.code, 1)
+        self.assertTrue(
+            any("Offline mode" in str(call[0][0]) for call in mock_print.call_args_list)
+        )
+
+    @patch("vsix_to_vscodium.cli.list_extension_versions")
+    @patch("vsix_to_vscodium.cli.download_extension")
+    @patch("vsix_to_vscodium.cli.install_extensions", side_effect=install_all)
+    def test_main_sync_transfers_delta(
+        self, mock_install, mock_download, mock_list_versions
+    ):
+        """Test that --sync only transfers missing and outdated extensions."""
+        mock_list_versions.side_effect = lambda ide: {
+            "code": {"pub.new": "1.0.0", "pub.old": "2.0.0", "pub.same": "3.0.0"},
+            "windsurf": {"pub.old": "1.0.0", "pub.same": "3.0.0"},
+        }[ide]
+        mock_download.side_effect = lambda ext_id, specific_version: f"./{ext_id}.vsix"
+
+        main(["--sync", "--ide", "windsurf"])
+
+        self.assertEqual(
+            sorted(call[0][0] for call in mock_download.call_args_list),
+            ["pub.new", "pub.old"],
+        )
+        mock_download.assert_any_call("pub.old", specific_version="2.0.0")
+        self.assertEqual(
+            installed_paths(mock_install, "windsurf"), ["./pub.new.vsix", "./pub.old.vsix"]
+        )
+
+    @patch("vsix_to_vscodium.cli.get_vscode_extensions")
+    @patch("vsix_to_vscodium.cli.resolve_extensions")
+    @patch("vsix_to_vscodium.cli.download_extension")
+    @patch("vsix_to_vscodium.api.install_extensions")
+    def test_main_transfer_all_multiple_ides(
+        self, mock_install, mock_download, mock_resolve, mock_get_extensions
+    ):
+        """Each extension is downloaded once and installed into every IDE."""
+        mock_get_extensions.return_value = ["pub1.ext1", "pub2.ext2"]
+        mock_resolve.return_value = ({}, [])
+        mock_download.side_effect = lambda ext_id, metadata, target: f"./{ext_id}.vsix"
+        mock_install.side_effect = lambda paths, ide: {
+            path: subprocess.CalledProcessError(1, ide)
+            if ide == "windsurf" and "pub2" in path
+            else None
+            for path in paths
+        }
+        report_path = os.path.join(self.cache_dir.name, "report.json")
+
+        with patch("builtins.print") as mock_print:
+            main(
+                [
+                    "--transfer-all",
+                    "--ide",
+                    "codium",
+                    "--ide",
+                    "windsurf",
+                    "--report",
+                    report_path,
+                ]
+            )
+
+        self.assertEqual(mock_download.call_count, 2)
+        for ide_name in ["codium", "windsurf"]:
+            self.assertEqual(
+                installed_paths(mock_install, ide_name),
+                ["./pub1.ext1.vsix", "./pub2.ext2.vsix"],
+            )
+        output = "\n".join(str(call[0][0]) for call in mock_print.call_args_list if call[0])
+        self.assertIn("codium: 2 installed, 0 up to date, 0 failed", output)
+        self.assertIn("windsurf: 1 installed, 0 up to date, 1 failed (pub2.ext2)", output)
+        with open(report_path) as f:
+            report = json.load(f)
+        records = {record["extension_id"]: record for record in report["extension_records"]}
+        self.assertEqual(
+            records["pub2.ext2"]["targets"], {"codium": "installed", "windsurf": "failed"}
+        )
+        self.assertEqual(report["targets"]["windsurf"], {"installed": 1, "failed": 1})
+
+    @patch("vsix_to_vscodium.cli.list_extension_versions")
+    @patch("vsix_to_vscodium.cli.download_extension")
+    @patch("vsix_to_vscodium.cli.install_extensions", side_effect=install_all)
+    def test_main_sync_multiple_ides(self, mock_install, mock_download, mock_list_versions):
+        """Every IDE only gets the extensions it is missing."""
+        mock_list_versions.side_effect = lambda ide: {
+            "code": {"pub.new": "1.0.0", "pub.old": "2.0.0"},
+            "codium": {"pub.old": "2.0.0"},
+            "windsurf": {"pub.old": "1.0.0"},
+        }[ide]
+        mock_download.side_effect = lambda ext_id, specific_version: f"./{ext_id}.vsix"
+
+        with patch("builtins.print"):
+            main(["--sync", "--ide", "codium", "--ide", "windsurf"])
+
+        self.assertEqual(
+            sorted(call[0][0] for call in mock_download.call_args_list),
+            ["pub.new", "pub.old"],
+        )
+        self.assertEqual(installed_paths(mock_install, "codium"), ["./pub.new.vsix"])
+        self.assertEqual(
+            installed_paths(mock_install, "windsurf"), ["./pub.new.vsix", "./pub.old.vsix"]
+        )
+
+    def test_main_single_extension_multiple_ides(self):
+        with patch("vsix_to_vscodium.api.download_extension") as mock_download, patch(
+            "vsix_to_vscodium.cli.install_extension"
+        ) as mock_install:
+            mock_download.return_value = "./extensions/test.vsix"
+
+            main(["--ide", "codium", "--ide", "windsurf", "publisher.extension"])
+
+        mock_download.assert_called_once()
+        self.assertEqual(
+            sorted(call[0][1] for call in mock_install.call_args_list), ["codium", "windsurf"]
+        )
+
+    def test_main_extensions_dir_needs_single_ide(self):
+        with patch("sys.stderr"), self.assertRaises(SystemExit) as cm:
+            main(
+                [
+                    "--installer",
+                    "extract",
+                    "--extensions-dir",
+                    "/tmp/extensions",
+                    "--ide",
+                    "codium",
+                    "--ide",
+                    "windsurf",
+                    "--transfer-all",
+                ]
+            )
+
+        self.assertEqual(cm.exception.code, 2)
+
+    @patch("vsix_to_vscodium.cli.list_extension_versions")
+    @patch("vsix_to_vscodium.api.run_pipeline")
+    def test_main_sync_nothing_to_do(self, mock_pipeline, mock_list_versions):
+        mock_list_versions.return_value = {"pub.same": "1.0.0"}
+
+        main(["--sync"])
+
+        mock_pipeline.assert_not_called()
+
+    @patch("vsix_to_vscodium.cli.list_extension_versions", side_effect=FileNotFoundError())
+    def test_main_sync_missing_ide(self, mock_list_versions):
+        with self.assertRaises(SystemExit) as cm:
+            main(["--sync"])
+
+        self.assertEqual(cm.exception.code, 1)
+
+    @patch("vsix_to_vscodium.cli.download_extension")
+    @patch("subprocess.run")
+    def test_main_extract_installer(self, mock_run, mock_download):
+        """Test that --installer extract installs without launching the IDE."""
+        vsix_path = make_vsix(
+            os.path.join(self.cache_dir.name, "pub.ext-1.0.0.vsix"), "pub", "ext", "1.0.0"
+        )
+        mock_download.return_value = vsix_path
+        extensions_dir = os.path.join(self.cache_dir.name, "extensions")
+
+        with patch("builtins.print"):
+            main(["--installer", "extract", "--extensions-dir", extensions_dir, "pub.ext"])
+
+        mock_run.assert_not_called()
+        self.assertTrue(
+            os.path.exists(os.path.join(extensions_dir, "pub.ext-1.0.0", "package.json"))
+        )
+        with open(os.path.join(extensions_dir, "extensions.json")) as f:
+            self.assertEqual(json.load(f)[0]["identifier"], {"id": "pub.ext"})
+
+    def test_main_extract_installer_unknown_ide(self):
+        with patch("sys.stderr"):
+            with self.assertRaises(SystemExit):
+                main(["--installer", "extract", "--ide", "my-ide", "pub.ext"])
+
+    @patch("vsix_to_vscodium.cli.download_extension")
+    @patch("vsix_to_vscodium.api.install_extensions")
+    def test_main_transfer_all_from_local(self, mock_install, mock_download):
+        """Test that --from-local repackages installed extensions without downloading."""
+        extensions_dir = os.path.join(self.cache_dir.name, "vscode-extensions")
+        for name in ["one", "two"]:
+            folder = os.path.join(extensions_dir, f"pub.{name}-1.0.0")
+            os.makedirs(folder)
+            with open(os.path.join(folder, "package.json"), "w") as f:
+                json.dump({"publisher": "pub", "name": name, "version": "1.0.0"}, f)
+        packaged = {}
+
+        def install(vsix_paths, ide_name):
+            for vsix_path in vsix_paths:
+                with zipfile.ZipFile(vsix_path) as archive:
+                    packaged[os.path.basename(vsix_path)] = json.loads(
+                        archive.read("extension/package.json")
+                    )["name"]
+            return install_all(vsix_paths, ide_name)
+
+        mock_install.side_effect = install
+
+        with patch("builtins.print"):
+            main(
+                [
+                    "--transfer-all",
+                    "--from-local",
+                    "--source-extensions-dir",
+                    extensions_dir,
+                ]
+            )
+
+        mock_download.assert_not_called()
+        self.assertEqual(
+            packaged, {"pub.one-1.0.0.vsix": "one", "pub.two-1.0.0.vsix": "two"}
+        )
+
+    def test_main_from_local_missing_dir(self):
+        with patch("builtins.print"):
+            with self.assertRaises(SystemExit) as cm:
+                main(
+                    [
+                        "--transfer-all",
+                        "--from-local",
+                        "--source-extensions-dir",
+                        os.path.join(self.cache_dir.name, "missing"),
+                    ]
+                )
+
+        self.assertEqual(cm.exception.code, 1)
+
+    @patch("vsix_to_vscodium.cli.resolve_extensions")
+    @patch("vsix_to_vscodium.cli.download_extension")
+    @patch("vsix_to_vscodium.api.install_extensions")
+    def test_main_bundle_export_and_import(
+        self, mock_install, mock_download, mock_resolve
+    ):
+        """Test that a bundle installs the exported extensions without network access."""
+        list_file = os.path.join(self.cache_dir.name, "extensions.txt")
+        with open(list_file, "w") as f:
+            f.write("# Extensions for CI\npub.app\n\npub.lib\npub.missing\n")
+        vsix_paths = {
+            "pub.app": make_vsix(
+                os.path.join(self.cache_dir.name, "app.vsix"),
+                "pub",
+                "app",
+                "1.0.0",
+                extensionDependencies=["pub.lib"],
+            ),
+            "pub.lib": make_vsix(
+                os.path.join(self.cache_dir.name, "lib.vsix"), "pub", "lib", "2.0.0"
+            ),
+        }
+        mock_resolve.return_value = (
+            {
+                ext_id: ExtensionMetadata(ext_id, "pub", ext_id[4:], "1.0.0")
+                for ext_id in vsix_paths
+            },
+            ["pub.missing"],
+        )
+        mock_download.side_effect = lambda ext_id, metadata: vsix_paths[ext_id]
+        bundle_path = os.path.join(self.cache_dir.name, "ci.bundle")
+
+        with patch("builtins.print"):
+            main(["bundle", "export", bundle_path, "--from-file", list_file])
+
+        mock_resolve.assert_called_once_with(
+            ["pub.app", "pub.lib", "pub.missing"], metadata_cache=ANY
+        )
+
+        installed = []
+
+        def install(paths, ide_name):
+            for path in paths:
+                with zipfile.ZipFile(path) as archive:
+                    installed.append(json.loads(archive.read("extension/package.json"))["name"])
+            return install_all(paths, ide_name)
+
+        mock_install.side_effect = install
+        with patch("requests.Session.get") as mock_get, patch(
+            "requests.Session.post"
+        ) as mock_post, patch("builtins.print"):
+            main(["bundle", "import", bundle_path, "--ide", "windsurf"])
+
+        mock_get.assert_not_called()
+        mock_post.assert_not_called()
+        self.assertEqual(installed, ["lib", "app"])
+
+    def test_main_bundle_import_invalid(self):
+        bundle_path = os.path.join(self.cache_dir.name, "broken.bundle")
+        with open(bundle_path, "wb") as f:
+            f.write(b"not a bundle")
+
+        with patch("builtins.print"):
+            with self.assertRaises(SystemExit) as cm:
+                main(["bundle", "import", bundle_path])
+
+        self.assertEqual(cm.exception.code, 1)
+
+    @patch("vsix_to_vscodium.cli.get_vscode_extensions")
+    @patch("vsix_to_vscodium.cli.resolve_extensions")
+    @patch("vsix_to_vscodium.api.install_extensions")
+    @patch("requests.Session.get")
+    def test_main_report(self, mock_get, mock_install, mock_resolve, mock_get_extensions):
+        """Test that --report records the phases and outcome of every extension."""
+        mock_get_extensions.return_value = ["pub.new", "pub.cached", "pub.broken", "pub.gone"]
+        mock_resolve.return_value = (
+            {
+                ext_id: ExtensionMetadata(ext_id, "pub", ext_id[4:], "1.0.0")
+                for ext_id in ["pub.new", "pub.cached", "pub.broken"]
+            },
+            ["pub.gone"],
+        )
+        cached_path = self.cache.partial_path("pub.cached-1.0.0")
+        with open(cached_path, "wb") as f:
+            f.write(b"cached")
+        self.cache.put("pub.cached-1.0.0", cached_path)
+
+        def get(url, **kwargs):
+            if "/broken/" in url:
+                raise requests.exceptions.ConnectionError("Connection refused")
+            response = MagicMock(status_code=200, headers={})
+            response.iter_content.return_value = [PACKAGE]
+            return response
+
+        mock_get.side_effect = get
+        mock_install.side_effect = install_all
+        report_path = os.path.join(self.cache_dir.name, "report.json")
+        profile_path = os.path.join(self.cache_dir.name, "run.prof")
+
+        with patch("builtins.print"):
+            main(["--transfer-all", "--report", report_path, "--profile", profile_path])
+
+        with open(report_path) as f:
+            report = json.load(f)
+        records = {record["extension_id"]: record for record in report["extension_records"]}
+        self.assertEqual(
+            {ext_id: record["outcome"] for ext_id, record in records.items()},
+            {
+                "pub.new": "installed",
+                "pub.cached": "installed",
+                "pub.broken": "failed",
+                "pub.gone": "skipped",
+            },
+        )
+        self.assertEqual(records["pub.new"]["cache"], "miss")
+        self.assertEqual(records["pub.new"]["bytes"], len(PACKAGE))
+        self.assertEqual(records["pub.cached"]["cache"], "hit")
+        self.assertIn("Connection refused", records["pub.broken"]["error"])
+        self.assertEqual(
+            sorted(report["phases"]),
+            ["install", "list_extensions", "query_metadata", "transfer"],
+        )
+        self.assertEqual(report["hosts"]["pub.gallery.vsassets.io"]["limit"], 4)
+        self.assertTrue(os.path.getsize(profile_path) > 0)
@@ -0,0 +1,101 @@
+"""Tests for engine and platform compatibility checks."""
+
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from vsix_to_vscodium.compatibility import (
+    IdeTarget,
+    current_platform,
+    engine_satisfies,
+    get_engine_version,
+    get_ide_target,
+)
+
+
+class TestEngineSatisfies(unittest.TestCase):
+    def test_constraints(self):
+        cases = [
+            ("*", "1.85.2", True),
+            (None, "1.85.2", True),
+            ("^1.80.0", "1.85.2", True),
+            ("^1.86.0", "1.85.2", False),
+            ("^1.80.0", "2.0.0", False),
+            ("1.80.0", "1.85.2", True),
+            (">=1.60.0", "2.0.0", True),
+            (">=1.90.0", "1.85.2", False),
+            ("^0.10.0", "0.10.5", True),
+            ("^0.10.0", "0.11.0", False),
+            ("1.x.x", "1.85.2", True),
+            ("^1.86.0-insider", "1.85.2", False),
+            ("not a constraint", "1.85.2", True),
+        ]
+        for constraint, engine, expected in cases:
+            with self.subTest(constraint=constraint, engine=engine):
+                self.assertEqual(engine_satisfies(constraint, engine), expected)
+
+
+class TestEngineVersion(unittest.TestCase):
+    def test_read_from_installation(self):
+        with tempfile.TemporaryDirectory() as install_dir:
+            bin_dir = os.path.join(install_dir, "bin")
+            app_dir = os.path.join(install_dir, "resources", "app")
+            os.makedirs(bin_dir)
+            os.makedirs(app_dir)
+            with open(os.path.join(app_dir, "package.json"), "w") as f:
+                json.dump({"name": "code-oss-dev", "version": "1.85.2"}, f)
+            launcher = os.path.join(bin_dir, "codium")
+
+            with patch("shutil.which", return_value=launcher), patch(
+                "subprocess.run"
+            ) as mock_run:
+                self.assertEqual(get_engine_version("codium"), "1.85.2")
+
+            mock_run.assert_not_called()
+
+    def test_read_from_version_output(self):
+        result = MagicMock(stdout="1.84.0\nabc123\nx64\n")
+        with patch("shutil.which", return_value=None), patch(
+            "subprocess.run", return_value=result
+        ) as mock_run:
+            self.assertEqual(get_engine_version("codium"), "1.84.0")
+
+        mock_run.assert_called_once_with(
+            ["codium", "--version"], check=True, capture_output=True, text=True
+        )
+
+    def test_unknown(self):
+        with patch("shutil.which", return_value=None), patch(
+            "subprocess.run", side_effect=FileNotFoundError()
+        ):
+            self.assertIsNone(get_engine_version("missing-ide"))
+        with patch("shutil.which", return_value=None), patch(
+            "subprocess.run", side_effect=subprocess.CalledProcessError(1, "ide")
+        ):
+            self.assertIsNone(get_engine_version("broken-ide"))
+
+    def test_overrides(self):
+        with patch("vsix_to_vscodium.compatibility.get_engine_version") as mock_engine:
+            target = get_ide_target("codium", "1.80.0", "linux-arm64")
+
+        mock_engine.assert_not_called()
+        self.assertEqual(target, IdeTarget("1.80.0", "linux-arm64"))
+
+
+class TestCurrentPlatform(unittest.TestCase):
+    def test_platforms(self):
+        cases = [
+            ("linux", "x86_64", "linux-x64"),
+            ("linux", "aarch64", "linux-arm64"),
+            ("darwin", "arm64", "darwin-arm64"),
+            ("win32", "AMD64", "win32-x64"),
+            ("linux", "riscv64", None),
+        ]
+        for system, machine, expected in cases:
+            with self.subTest(system=system, machine=machine), patch(
+                "sys.platform", system
+            ), patch("platform.machine", return_value=machine):
+                self.assertEqual(current_platform(), expected)
@@ -0,0 +1,270 @@
+"""Tests for streaming, resumable downloads."""
+
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+
+import requests
+
+from vsix_to_vscodium import transport
+from vsix_to_vscodium.download import CorruptDownloadError, download_to_file
+
+URL = "https://example.com/ext.vsix"
+IDENTITY = {"Accept-Encoding": "identity"}
+
+
+def make_response(chunks, status_code=200, headers=None):
+    response = MagicMock(status_code=status_code, headers=headers or {})
+    response.iter_content.return_value = chunks
+    return response
+
+
+def broken_chunks(*chunks):
+    yield from chunks
+    raise requests.exceptions.ChunkedEncodingError("Connection broken")
+
+
+class TestDownloadToFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "pub.ext-1.0.0.vsix")
+        self.part_path = f"{self.file_path}.part"
+        self.state_path = f"{self.part_path}.json"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def write_partial(self, content, **state):
+        with open(self.part_path, "wb") as f:
+            f.write(content)
+        with open(self.state_path, "w") as f:
+            json.dump({"url": URL, "received": len(content), **state}, f)
+
+    @patch("requests.Session.get")
+    def test_streams_chunks_to_file(self, mock_get):
+        mock_get.return_value = make_response([b"abc", b"def"])
+
+        written = download_to_file(URL, self.file_path, chunk_size=3)
+
+        self.assertEqual(written.size, 6)
+        mock_get.assert_called_once_with(URL, stream=True, headers=IDENTITY)
+        mock_get.return_value.iter_content.assert_called_once_with(chunk_size=3)
+        self.assertEqual(self.read(self.file_path), b"abcdef")
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["pub.ext-1.0.0.vsix"])
+        mock_get.return_value.close.assert_called_once()
+
+    @patch("requests.Session.get")
+    def test_interrupted_download_is_kept_for_resuming(self, mock_get):
+        mock_get.side_effect = lambda *args, **kwargs: make_response(
+            broken_chunks(b"abc"), headers={"Content-Length": "6", "ETag": '"v1"'}
+        )
+
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            download_to_file(URL, self.file_path, attempts=1)
+
+        self.assertFalse(os.path.exists(self.file_path))
+        self.assertEqual(self.read(self.part_path), b"abc")
+        with open(self.state_path) as f:
+            self.assertEqual(
+                json.load(f),
+                {"url": URL, "size": 6, "etag": '"v1"', "last_modified": None, "received": 3},
+            )
+
+    @patch("requests.Session.get")
+    def test_resumes_with_range_request(self, mock_get):
+        self.write_partial(b"abc", size=6, etag='"v1"')
+        mock_get.return_value = make_response(
+            [b"def"], status_code=206, headers={"Content-Range": "bytes 3-5/6", "ETag": '"v1"'}
+        )
+
+        written = download_to_file(URL, self.file_path)
+
+        self.assertEqual(written.size, 6)
+        # The digest covers the bytes kept from the earlier attempt
+        self.assertEqual(written.sha256, hashlib.sha256(b"abcdef").hexdigest())
+        mock_get.assert_called_once_with(
+            URL, stream=True, headers={**IDENTITY, "Range": "bytes=3-", "If-Range": '"v1"'}
+        )
+        self.assertEqual(self.read(self.file_path), b"abcdef")
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["pub.ext-1.0.0.vsix"])
+
+    @patch("requests.Session.get")
+    def test_resumes_within_the_same_run(self, mock_get):
+        mock_get.side_effect = [
+            make_response(broken_chunks(b"abc"), headers={"Content-Length": "6"}),
+            make_response([b"def"], status_code=206, headers={"Content-Range": "bytes 3-5/6"}),
+        ]
+
+        download_to_file(URL, self.file_path)
+
+        self.assertEqual(mock_get.call_args[1]["headers"]["Range"], "bytes=3-")
+        self.assertEqual(self.read(self.file_path), b"abcdef")
+
+    @patch("requests.Session.get")
+    def test_full_download_when_range_ignored(self, mock_get):
+        self.write_partial(b"old", size=6, etag='"v1"')
+        # A changed package is sent in full in answer to If-Range
+        mock_get.return_value = make_response([b"newer!"], headers={"ETag": '"v2"'})
+
+        download_to_file(URL, self.file_path)
+
+        self.assertEqual(self.read(self.file_path), b"newer!")
+
+    @patch("requests.Session.get")
+    def test_full_download_when_etag_changed(self, mock_get):
+        self.write_partial(b"old", size=6, etag='"v1"')
+        mock_get.side_effect = [
+            make_response(
+                [b"xyz"], status_code=206, headers={"Content-Range": "bytes 3-5/6", "ETag": '"v2"'}
+            ),
+            make_response([b"abcdef"], headers={"ETag": '"v2"'}),
+        ]
+
+        download_to_file(URL, self.file_path)
+
+        self.assertNotIn("Range", mock_get.call_args[1]["headers"])
+        self.assertEqual(self.read(self.file_path), b"abcdef")
+
+    @patch("requests.Session.get")
+    def test_partial_download_of_other_url_is_discarded(self, mock_get):
+        self.write_partial(b"abc")
+        with open(self.state_path, "w") as f:
+            json.dump({"url": "https://example.com/other.vsix", "received": 3}, f)
+        mock_get.return_value = make_response([b"abcdef"])
+
+        download_to_file(URL, self.file_path)
+
+        mock_get.assert_called_once_with(URL, stream=True, headers=IDENTITY)
+        self.assertEqual(self.read(self.file_path), b"abcdef")
+
+    @patch("requests.Session.get")
+    def test_http_error_leaves_no_file(self, mock_get):
+        mock_get.return_value = make_response([])
+        mock_get.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError("404")
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            download_to_file(URL, self.file_path)
+
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    @patch("requests.Session.get")
+    def test_throttled_download_is_tried_again(self, mock_get):
+        throttled = make_response([], status_code=429)
+        throttled.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            "429", response=throttled
+        )
+        mock_get.side_effect = [throttled, make_response([b"abc"])]
+
+        written = download_to_file(URL, self.file_path)
+
+        self.assertEqual(written.size, 3)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(self.read(self.file_path), b"abc")
+
+    @patch("requests.Session.get")
+    def test_corrupt_download_is_fetched_again(self, mock_get):
+        mock_get.side_effect = [make_response([b"bad"]), make_response([b"good"])]
+
+        def verify(path):
+            if self.read(path) == b"bad":
+                raise ValueError("truncated")
+
+        with patch("builtins.print"):
+            written = download_to_file(URL, self.file_path, verify=verify)
+
+        self.assertEqual(written.sha256, hashlib.sha256(b"good").hexdigest())
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(self.read(self.file_path), b"good")
+
+    @patch("requests.Session.get")
+    def test_repeatedly_corrupt_download_fails(self, mock_get):
+        mock_get.side_effect = lambda *args, **kwargs: make_response([b"bad"])
+
+        def verify(path):
+            raise ValueError("truncated")
+
+        with patch("builtins.print"), self.assertRaises(CorruptDownloadError):
+            download_to_file(URL, self.file_path, verify=verify)
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    @patch("requests.Session.get")
+    def test_replaces_existing_file_atomically(self, mock_get):
+        with open(self.file_path, "wb") as f:
+            f.write(b"old")
+        mock_get.return_value = make_response([b"new"])
+
+        download_to_file(URL, self.file_path)
+
+        self.assertEqual(self.read(self.file_path), b"new")
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = self.server.body
+        self.server.ranges.append(self.headers.get("Range"))
+        start = 0
+        if self.headers.get("Range"):
+            start = int(self.headers["Range"][len("bytes=") : -1])
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        if self.server.cut_after:
+            # Drop the connection halfway through the body
+            self.wfile.write(body[start : start + self.server.cut_after])
+            self.server.cut_after = 0
+            self.close_connection = True
+            return
+        self.wfile.write(body[start:])
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestResumeAgainstServer(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeHandler)
+        self.server.body = bytes(range(256)) * 64
+        self.server.ranges = []
+        self.server.cut_after = 5000
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/ext.vsix"
+        threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        transport.configure_session(retries=0)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+        transport.configure_session()
+
+    def test_resumes_after_dropped_connection(self):
+        file_path = os.path.join(self.tmp_dir.name, "ext.vsix")
+
+        with patch("builtins.print"):
+            written = download_to_file(self.url, file_path, chunk_size=1024)
+
+        self.assertEqual(written.size, len(self.server.body))
+        with open(file_path, "rb") as f:
+            self.assertEqual(f.read(), self.server.body)
+        self.assertEqual(self.server.ranges[0], None)
+        self.assertEqual(len(self.server.ranges), 2)
+        self.assertTrue(self.server.ranges[1].startswith("bytes="))
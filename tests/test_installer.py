@@ -0,0 +1,179 @@
+"""Tests for batched extension installs."""
+
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch, call
+
+from tests.helpers import make_vsix
+from vsix_to_vscodium.installer import (
+    extract_extensions,
+    extract_vsix,
+    get_extensions_dir,
+    install_extensions,
+    register_extensions,
+)
+
+
+class TestInstallExtensions(unittest.TestCase):
+    @patch("subprocess.run")
+    def test_installs_batch_in_one_process(self, mock_run):
+        errors = install_extensions(["a.vsix", "b.vsix"], "codium")
+
+        mock_run.assert_called_once_with(
+            ["codium", "--install-extension", "a.vsix", "--install-extension", "b.vsix"],
+            check=True,
+        )
+        self.assertEqual(errors, {"a.vsix": None, "b.vsix": None})
+
+    @patch("subprocess.run")
+    def test_splits_into_batches(self, mock_run):
+        install_extensions(["a.vsix", "b.vsix", "c.vsix"], "codium", batch_size=2)
+
+        self.assertEqual(
+            mock_run.call_args_list,
+            [
+                call(
+                    ["codium", "--install-extension", "a.vsix", "--install-extension", "b.vsix"],
+                    check=True,
+                ),
+                call(["codium", "--install-extension", "c.vsix"], check=True),
+            ],
+        )
+
+    @patch("subprocess.run")
+    def test_failed_batch_falls_back_to_single_installs(self, mock_run):
+        def run(command, check):
+            if "b.vsix" in command:
+                raise subprocess.CalledProcessError(1, command)
+
+        mock_run.side_effect = run
+
+        errors = install_extensions(["a.vsix", "b.vsix", "c.vsix"], "codium")
+
+        self.assertEqual(mock_run.call_count, 4)
+        self.assertIsNone(errors["a.vsix"])
+        self.assertIsInstance(errors["b.vsix"], subprocess.CalledProcessError)
+        self.assertIsNone(errors["c.vsix"])
+
+    @patch("subprocess.run")
+    def test_single_file_failure_is_not_retried(self, mock_run):
+        mock_run.side_effect = subprocess.CalledProcessError(1, "codium")
+
+        errors = install_extensions(["a.vsix"], "codium")
+
+        mock_run.assert_called_once()
+        self.assertIsInstance(errors["a.vsix"], subprocess.CalledProcessError)
+
+    @patch("subprocess.run", side_effect=FileNotFoundError())
+    def test_missing_ide_raises(self, mock_run):
+        with self.assertRaises(FileNotFoundError):
+            install_extensions(["a.vsix"], "missing-ide")
+
+
+class TestExtractExtensions(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.extensions_dir = os.path.join(self.tmp_dir.name, "extensions")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def vsix(self, name, version="1.0.0", **kwargs):
+        path = os.path.join(self.tmp_dir.name, f"pub.{name}-{version}.vsix")
+        return make_vsix(path, "Pub", name, version, **kwargs)
+
+    def registry(self):
+        with open(os.path.join(self.extensions_dir, "extensions.json")) as f:
+            return json.load(f)
+
+    def test_get_extensions_dir(self):
+        self.assertEqual(
+            get_extensions_dir("/usr/bin/codium"),
+            os.path.expanduser("~/.vscode-oss/extensions"),
+        )
+        self.assertEqual(
+            get_extensions_dir("windsurf.cmd"), os.path.expanduser("~/.windsurf/extensions")
+        )
+        with self.assertRaises(ValueError):
+            get_extensions_dir("unknown-ide")
+
+    def test_extract_vsix(self):
+        vsix_path = self.vsix("ext", files={"out/main.js": b"code"}, target_platform="linux-x64")
+
+        entry = extract_vsix(vsix_path, self.extensions_dir)
+
+        folder = os.path.join(self.extensions_dir, "pub.ext-1.0.0-linux-x64")
+        with open(os.path.join(folder, "out", "main.js"), "rb") as f:
+            self.assertEqual(f.read(), b"code")
+        self.assertTrue(os.path.exists(os.path.join(folder, "package.json")))
+        self.assertTrue(os.path.exists(os.path.join(folder, ".vsixmanifest")))
+        self.assertEqual(entry["identifier"], {"id": "pub.ext"})
+        self.assertEqual(entry["version"], "1.0.0")
+        self.assertEqual(entry["relativeLocation"], "pub.ext-1.0.0-linux-x64")
+        self.assertEqual(entry["metadata"]["targetPlatform"], "linux-x64")
+        # Only the finished folder is left behind
+        self.assertEqual(os.listdir(self.extensions_dir), ["pub.ext-1.0.0-linux-x64"])
+
+    def test_extract_vsix_rejects_path_traversal(self):
+        vsix_path = self.vsix("ext", files={"../../evil.js": b"evil"})
+
+        with self.assertRaises(ValueError):
+            extract_vsix(vsix_path, self.extensions_dir)
+
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, "evil.js")))
+        self.assertEqual(os.listdir(self.extensions_dir), [])
+
+    def test_register_replaces_older_versions(self):
+        register_extensions(
+            self.extensions_dir,
+            [extract_vsix(self.vsix("ext", "1.0.0"), self.extensions_dir)],
+        )
+        register_extensions(
+            self.extensions_dir,
+            [extract_vsix(self.vsix("ext", "2.0.0"), self.extensions_dir)],
+        )
+
+        self.assertEqual(
+            [entry["relativeLocation"] for entry in self.registry()], ["pub.ext-2.0.0"]
+        )
+        with open(os.path.join(self.extensions_dir, ".obsolete")) as f:
+            self.assertEqual(json.load(f), {"pub.ext-1.0.0": True})
+
+    @patch("subprocess.run")
+    def test_extract_extensions_in_parallel(self, mock_run):
+        vsix_paths = [self.vsix(f"ext{i}") for i in range(3)]
+
+        errors = extract_extensions(vsix_paths, "codium", self.extensions_dir, workers=2)
+
+        self.assertEqual(errors, {vsix_path: None for vsix_path in vsix_paths})
+        self.assertEqual(
+            sorted(entry["identifier"]["id"] for entry in self.registry()),
+            ["pub.ext0", "pub.ext1", "pub.ext2"],
+        )
+        mock_run.assert_not_called()
+
+    @patch("subprocess.run")
+    def test_falls_back_to_cli(self, mock_run):
+        good = self.vsix("good")
+        broken = os.path.join(self.tmp_dir.name, "broken.vsix")
+        with open(broken, "wb") as f:
+            f.write(b"not a zip")
+
+        errors = extract_extensions([good, broken], "codium", self.extensions_dir, workers=1)
+
+        mock_run.assert_called_once_with(["codium", "--install-extension", broken], check=True)
+        self.assertEqual(errors, {good: None, broken: None})
+        self.assertEqual([entry["identifier"]["id"] for entry in self.registry()], ["pub.good"])
+
+    @patch("subprocess.run", side_effect=FileNotFoundError())
+    def test_fallback_without_ide_reports_extract_error(self, mock_run):
+        broken = os.path.join(self.tmp_dir.name, "broken.vsix")
+        with open(broken, "wb") as f:
+            f.write(b"not a zip")
+
+        errors = extract_extensions([broken], "codium", self.extensions_dir)
+
+        self.assertIsNotNone(errors[broken])
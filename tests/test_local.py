@@ -0,0 +1,168 @@
+"""Tests for reading and repackaging locally installed extensions."""
+
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+import zipfile
+
+from vsix_to_vscodium.local import (
+    DISABLED_STATE_KEY,
+    LocalExtension,
+    package_extension,
+    read_disabled_extensions,
+    read_installed_extensions,
+)
+from vsix_to_vscodium.vsix import read_manifest, read_target_platform
+
+
+def make_state_db(path, disabled):
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+    connection.execute(
+        "INSERT INTO ItemTable VALUES (?, ?)",
+        (DISABLED_STATE_KEY, json.dumps([{"id": ext_id} for ext_id in disabled])),
+    )
+    connection.commit()
+    connection.close()
+    return path
+
+
+class TestLocalExtensions(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.extensions_dir = os.path.join(self.tmp_dir.name, "extensions")
+        os.makedirs(self.extensions_dir)
+        self.state_db = os.path.join(self.tmp_dir.name, "state.vscdb")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def install(self, publisher, name, version, files=None, target_platform=None):
+        folder = f"{publisher}.{name}-{version}".lower()
+        if target_platform:
+            folder = f"{folder}-{target_platform}"
+        path = os.path.join(self.extensions_dir, folder)
+        os.makedirs(path)
+        with open(os.path.join(path, "package.json"), "w") as f:
+            json.dump({"publisher": publisher, "name": name, "version": version}, f)
+        for member, content in (files or {}).items():
+            os.makedirs(os.path.dirname(os.path.join(path, member)), exist_ok=True)
+            with open(os.path.join(path, member), "wb") as f:
+                f.write(content)
+        metadata = {"targetPlatform": target_platform} if target_platform else {}
+        return {
+            "identifier": {"id": f"{publisher}.{name}".lower()},
+            "version": version,
+            "relativeLocation": folder,
+            "metadata": metadata,
+        }
+
+    def write_registry(self, entries):
+        with open(os.path.join(self.extensions_dir, "extensions.json"), "w") as f:
+            json.dump(entries, f)
+
+    def test_read_from_registry(self):
+        self.write_registry(
+            [
+                self.install("Pub", "native", "1.0.0", target_platform="linux-x64"),
+                self.install("pub", "plain", "2.0.0"),
+                # Listed in the registry but removed from disk
+                {"identifier": {"id": "pub.gone"}, "relativeLocation": "pub.gone-1.0.0"},
+            ]
+        )
+        # Not listed in the registry
+        self.install("pub", "stray", "1.0.0")
+
+        extensions = read_installed_extensions(self.extensions_dir, self.state_db)
+
+        self.assertEqual(
+            extensions,
+            [
+                LocalExtension(
+                    "Pub.native",
+                    "1.0.0",
+                    os.path.join(self.extensions_dir, "pub.native-1.0.0-linux-x64"),
+                    "linux-x64",
+                ),
+                LocalExtension(
+                    "pub.plain", "2.0.0", os.path.join(self.extensions_dir, "pub.plain-2.0.0")
+                ),
+            ],
+        )
+
+    def test_read_without_registry_skips_obsolete_folders(self):
+        self.install("pub", "ext", "1.0.0")
+        self.install("pub", "ext", "1.1.0")
+        self.install("pub", "removed", "1.0.0")
+        with open(os.path.join(self.extensions_dir, ".obsolete"), "w") as f:
+            json.dump({"pub.removed-1.0.0": True}, f)
+
+        extensions = read_installed_extensions(self.extensions_dir, self.state_db)
+
+        self.assertEqual(
+            [(extension.extension_id, extension.version) for extension in extensions],
+            [("pub.ext", "1.1.0")],
+        )
+
+    def test_disabled_state(self):
+        self.write_registry(
+            [self.install("pub", "on", "1.0.0"), self.install("pub", "off", "1.0.0")]
+        )
+        make_state_db(self.state_db, ["Pub.Off"])
+
+        self.assertEqual(read_disabled_extensions(self.state_db), {"pub.off"})
+        extensions = read_installed_extensions(self.extensions_dir, self.state_db)
+        self.assertEqual(
+            {extension.extension_id: extension.enabled for extension in extensions},
+            {"pub.on": True, "pub.off": False},
+        )
+
+    def test_unreadable_state_db(self):
+        with open(self.state_db, "w") as f:
+            f.write("not a database")
+
+        self.assertEqual(read_disabled_extensions(self.state_db), set())
+        self.assertEqual(read_disabled_extensions(self.state_db + ".missing"), set())
+
+    def test_missing_extensions_dir(self):
+        with self.assertRaises(FileNotFoundError):
+            read_installed_extensions(os.path.join(self.tmp_dir.name, "missing"))
+
+    def test_package_extension(self):
+        self.write_registry(
+            [
+                self.install(
+                    "pub",
+                    "ext",
+                    "1.0.0",
+                    files={"out/main.js": b"code", "media/icon.png": b"png"},
+                    target_platform="darwin-arm64",
+                )
+            ]
+        )
+        [extension] = read_installed_extensions(self.extensions_dir, self.state_db)
+        output_dir = os.path.join(self.tmp_dir.name, "packages")
+
+        vsix_path = package_extension(extension, output_dir)
+
+        self.assertEqual(
+            vsix_path, os.path.join(output_dir, "pub.ext-1.0.0@darwin-arm64.vsix")
+        )
+        self.assertEqual(os.listdir(output_dir), ["pub.ext-1.0.0@darwin-arm64.vsix"])
+        self.assertEqual(read_manifest(vsix_path)["version"], "1.0.0")
+        with zipfile.ZipFile(vsix_path) as archive:
+            self.assertEqual(archive.read("extension/out/main.js"), b"code")
+            self.assertIn("extension/media/icon.png", archive.namelist())
+            self.assertEqual(read_target_platform(archive), "darwin-arm64")
+
+    def test_package_keeps_installed_manifest(self):
+        self.install("pub", "ext", "1.0.0", files={".vsixmanifest": b"<manifest/>"})
+        [extension] = read_installed_extensions(self.extensions_dir, self.state_db)
+
+        vsix_path = package_extension(extension, self.tmp_dir.name)
+
+        with zipfile.ZipFile(vsix_path) as archive:
+            self.assertEqual(archive.read("extension.vsixmanifest"), b"<manifest/>")
+            self.assertNotIn("extension/.vsixmanifest", archive.namelist())
@@ -0,0 +1,332 @@
+"""Tests for the Marketplace API helpers."""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+import requests
+
+from vsix_to_vscodium.cache import MetadataCache
+from vsix_to_vscodium.compatibility import IdeTarget
+from vsix_to_vscodium.marketplace import (
+    DOWNLOAD_URL_ENV,
+    QUERY_URL_ENV,
+    ExtensionMetadata,
+    build_download_url,
+    parse_extension_id,
+    query_extensions,
+    resolve_extensions,
+)
+
+ENGINE = "Microsoft.VisualStudio.Code.Engine"
+PRE_RELEASE = "Microsoft.VisualStudio.Code.PreRelease"
+
+
+def make_entry(publisher, name, version):
+    return {
+        "publisher": {"publisherName": publisher},
+        "extensionName": name,
+        "versions": [{"version": version}],
+    }
+
+
+def make_version(version, engine="*", target_platform=None, pre_release=False):
+    entry = {"version": version, "properties": [{"key": ENGINE, "value": engine}]}
+    if target_platform:
+        entry["targetPlatform"] = target_platform
+    if pre_release:
+        entry["properties"].append({"key": PRE_RELEASE, "value": "true"})
+    return entry
+
+
+def make_response(entries, total=None, etag=None, status_code=200):
+    response = MagicMock(status_code=status_code, headers={})
+    if etag:
+        response.headers["ETag"] = etag
+    result = {"extensions": entries}
+    if total is not None:
+        result["resultMetadata"] = [
+            {
+                "metadataType": "ResultCount",
+                "metadataItems": [{"name": "TotalCount", "count": total}],
+            }
+        ]
+    response.json.return_value = {"results": [result]}
+    return response
+
+
+class TestMarketplace(unittest.TestCase):
+    def test_parse_extension_id(self):
+        self.assertEqual(
+            parse_extension_id("publisher.extension.name"),
+            ("publisher", "extension.name"),
+        )
+        for invalid in ["invalid_id", ".extension", "publisher."]:
+            with self.assertRaises(ValueError):
+                parse_extension_id(invalid)
+
+    def test_download_url(self):
+        metadata = ExtensionMetadata("pub.ext", "pub", "ext", "1.2.3")
+        self.assertEqual(metadata.download_url, build_download_url("pub", "ext", "1.2.3"))
+        self.assertEqual(
+            metadata.download_url,
+            "https://pub.gallery.vsassets.io/_apis/public/gallery/publisher/pub/extension/ext/1.2.3/assetbyname/Microsoft.VisualStudio.Services.VSIXPackage",
+        )
+
+    @patch("requests.Session.post")
+    def test_mirror_urls(self, mock_post):
+        mock_post.return_value = make_response([make_entry("pub", "ext", "1.0.0")])
+        mirror = {
+            QUERY_URL_ENV: "http://mirror.local/extensionquery",
+            DOWNLOAD_URL_ENV: "http://mirror.local/{publisher}/{name}/{version}.vsix",
+        }
+
+        with patch.dict(os.environ, mirror):
+            resolved, _ = resolve_extensions(["pub.ext"])
+
+            self.assertEqual(
+                resolved["pub.ext"].download_url, "http://mirror.local/pub/ext/1.0.0.vsix"
+            )
+        self.assertEqual(mock_post.call_args[0][0], "http://mirror.local/extensionquery")
+
+    @patch("requests.Session.post")
+    def test_resolve_extensions_single_query(self, mock_post):
+        """All IDs should be sent as criteria of a single query."""
+        mock_post.return_value = make_response(
+            [make_entry("pub2", "ext2", "2.0.0"), make_entry("pub1", "ext1", "1.0.0")]
+        )
+
+        resolved, unresolved = resolve_extensions(["pub1.ext1", "pub2.ext2"])
+
+        mock_post.assert_called_once()
+        criteria = mock_post.call_args[1]["json"]["filters"][0]["criteria"]
+        self.assertEqual(
+            [criterion["value"] for criterion in criteria], ["pub1.ext1", "pub2.ext2"]
+        )
+        self.assertEqual(
+            resolved,
+            {
+                "pub1.ext1": ExtensionMetadata("pub1.ext1", "pub1", "ext1", "1.0.0"),
+                "pub2.ext2": ExtensionMetadata("pub2.ext2", "pub2", "ext2", "2.0.0"),
+            },
+        )
+        self.assertEqual(unresolved, [])
+
+    @patch("requests.Session.post")
+    def test_resolve_extensions_maps_case_insensitively(self, mock_post):
+        mock_post.return_value = make_response([make_entry("MS-Python", "python", "1.0.0")])
+
+        resolved, _ = resolve_extensions(["ms-python.Python"])
+
+        self.assertEqual(resolved["ms-python.Python"].publisher, "MS-Python")
+
+    @patch("requests.Session.post")
+    def test_resolve_extensions_reports_unresolved(self, mock_post):
+        mock_post.return_value = make_response([make_entry("pub1", "ext1", "1.0.0")])
+
+        resolved, unresolved = resolve_extensions(["invalid", "pub1.ext1", "pub2.ext2"])
+
+        self.assertEqual(list(resolved), ["pub1.ext1"])
+        self.assertEqual(unresolved, ["invalid", "pub2.ext2"])
+        # Invalid IDs are never sent to the Marketplace
+        criteria = mock_post.call_args[1]["json"]["filters"][0]["criteria"]
+        self.assertNotIn("invalid", [criterion["value"] for criterion in criteria])
+
+    @patch("requests.Session.post")
+    def test_resolve_extensions_batches(self, mock_post):
+        mock_post.side_effect = [
+            make_response([make_entry("p", "a", "1"), make_entry("p", "b", "1")]),
+            make_response([make_entry("p", "c", "1")]),
+        ]
+
+        resolved, unresolved = resolve_extensions(["p.a", "p.b", "p.c"], batch_size=2)
+
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(sorted(resolved), ["p.a", "p.b", "p.c"])
+        self.assertEqual(unresolved, [])
+
+    @patch("requests.Session.post")
+    def test_query_extensions_follows_pages(self, mock_post):
+        mock_post.side_effect = [
+            make_response([make_entry("p", "a", "1")], total=2),
+            make_response([make_entry("p", "b", "1")], total=2),
+        ]
+
+        entries = query_extensions(["p.a", "p.b"])
+
+        self.assertEqual(len(entries), 2)
+        pages = [call[1]["json"]["filters"][0]["pageNumber"] for call in mock_post.call_args_list]
+        self.assertEqual(pages, [1, 2])
+
+    @patch("requests.Session.post")
+    def test_resolve_extensions_api_error(self, mock_post):
+        mock_post.side_effect = requests.exceptions.RequestException("API Error")
+
+        with self.assertRaises(requests.exceptions.RequestException):
+            resolve_extensions(["pub1.ext1"])
+
+
+class TestResolveForTarget(unittest.TestCase):
+    TARGET = IdeTarget("1.85.2", "linux-x64")
+
+    def resolve(self, mock_post, versions, target=TARGET):
+        entry = make_entry("pub", "ext", "unused")
+        entry["versions"] = versions
+        mock_post.return_value = make_response([entry])
+        resolved, unresolved = resolve_extensions(["pub.ext"], target=target)
+        return resolved.get("pub.ext"), unresolved
+
+    @patch("requests.Session.post")
+    def test_newest_compatible_version(self, mock_post):
+        metadata, _ = self.resolve(
+            mock_post,
+            [
+                make_version("3.0.0", "^1.90.0"),
+                make_version("2.1.0-beta", "^1.80.0", pre_release=True),
+                make_version("2.0.0", "^1.80.0"),
+                make_version("1.0.0", "^1.60.0"),
+            ],
+        )
+
+        self.assertEqual(metadata.version, "2.0.0")
+        self.assertIsNone(metadata.target_platform)
+
+    @patch("requests.Session.post")
+    def test_platform_package_preferred(self, mock_post):
+        metadata, _ = self.resolve(
+            mock_post,
+            [
+                make_version("2.0.0", target_platform="darwin-arm64"),
+                make_version("2.0.0", target_platform="linux-x64"),
+                make_version("2.0.0", target_platform="universal"),
+            ],
+        )
+
+        self.assertEqual(metadata.target_platform, "linux-x64")
+        self.assertTrue(metadata.download_url.endswith("?targetPlatform=linux-x64"))
+
+    @patch("requests.Session.post")
+    def test_no_compatible_version(self, mock_post):
+        metadata, unresolved = self.resolve(
+            mock_post,
+            [
+                make_version("2.0.0", "^1.90.0"),
+                make_version("1.0.0", target_platform="win32-x64"),
+            ],
+        )
+
+        self.assertIsNone(metadata)
+        self.assertEqual(unresolved, ["pub.ext"])
+
+    @patch("requests.Session.post")
+    def test_without_target_latest_is_used(self, mock_post):
+        metadata, _ = self.resolve(
+            mock_post, [make_version("3.0.0", "^1.90.0"), make_version("2.0.0")], None
+        )
+
+        self.assertEqual(metadata.version, "3.0.0")
+
+    @patch("requests.Session.post")
+    def test_pre_releases_only(self, mock_post):
+        metadata, _ = self.resolve(
+            mock_post,
+            [
+                make_version("0.2.0", "^1.90.0", pre_release=True),
+                make_version("0.1.0", pre_release=True),
+            ],
+        )
+
+        self.assertEqual(metadata.version, "0.1.0")
+
+
+class TestResolveWithMetadataCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.metadata_cache = MetadataCache(self.tmp_dir.name, ttl=3600)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @patch("requests.Session.post")
+    def test_fresh_entries_are_not_queried(self, mock_post):
+        mock_post.return_value = make_response([make_entry("pub1", "ext1", "1.0.0")])
+        resolve_extensions(["pub1.ext1"], metadata_cache=self.metadata_cache)
+        mock_post.reset_mock()
+
+        resolved, unresolved = resolve_extensions(
+            ["PUB1.ext1"], metadata_cache=self.metadata_cache
+        )
+
+        mock_post.assert_not_called()
+        self.assertEqual(
+            resolved["PUB1.ext1"], ExtensionMetadata("PUB1.ext1", "pub1", "ext1", "1.0.0")
+        )
+        self.assertEqual(unresolved, [])
+
+    @patch("requests.Session.post")
+    def test_only_missing_entries_are_queried(self, mock_post):
+        mock_post.return_value = make_response([make_entry("pub1", "ext1", "1.0.0")])
+        resolve_extensions(["pub1.ext1"], metadata_cache=self.metadata_cache)
+        mock_post.return_value = make_response([make_entry("pub2", "ext2", "2.0.0")])
+
+        resolved, _ = resolve_extensions(
+            ["pub1.ext1", "pub2.ext2"], metadata_cache=self.metadata_cache
+        )
+
+        criteria = mock_post.call_args[1]["json"]["filters"][0]["criteria"]
+        self.assertEqual([criterion["value"] for criterion in criteria], ["pub2.ext2"])
+        self.assertEqual(sorted(resolved), ["pub1.ext1", "pub2.ext2"])
+
+    @patch("requests.Session.post")
+    def test_stale_entries_are_revalidated(self, mock_post):
+        self.metadata_cache.ttl = 0
+        mock_post.return_value = make_response(
+            [make_entry("pub1", "ext1", "1.0.0")], etag='"v1"'
+        )
+        resolve_extensions(["pub1.ext1"], metadata_cache=self.metadata_cache)
+        mock_post.return_value = make_response([], status_code=304)
+
+        resolved, unresolved = resolve_extensions(
+            ["pub1.ext1"], metadata_cache=self.metadata_cache
+        )
+
+        self.assertEqual(mock_post.call_args[1]["headers"]["If-None-Match"], '"v1"')
+        self.assertEqual(resolved["pub1.ext1"].version, "1.0.0")
+        self.assertEqual(unresolved, [])
+
+    @patch("requests.Session.post")
+    def test_changed_answer_replaces_cached_entry(self, mock_post):
+        self.metadata_cache.ttl = 0
+        mock_post.return_value = make_response(
+            [make_entry("pub1", "ext1", "1.0.0")], etag='"v1"'
+        )
+        resolve_extensions(["pub1.ext1"], metadata_cache=self.metadata_cache)
+        mock_post.return_value = make_response(
+            [make_entry("pub1", "ext1", "1.1.0")], etag='"v2"'
+        )
+
+        resolved, _ = resolve_extensions(["pub1.ext1"], metadata_cache=self.metadata_cache)
+
+        self.assertEqual(resolved["pub1.ext1"].version, "1.1.0")
+        self.assertEqual(self.metadata_cache.lookup(["pub1.ext1"]), {})
+        self.metadata_cache.ttl = 3600
+        self.assertEqual(
+            self.metadata_cache.lookup(["pub1.ext1"])["pub1.ext1"]["version"], "1.1.0"
+        )
+
+    @patch("requests.Session.post")
+    def test_offline_resolves_from_cache_only(self, mock_post):
+        self.metadata_cache.store(
+            {"pub1.ext1": {"publisher": "pub1", "name": "ext1", "version": "1.0.0"}}
+        )
+        self.metadata_cache.ttl = 0
+        self.metadata_cache.offline = True
+
+        resolved, unresolved = resolve_extensions(
+            ["pub1.ext1", "pub2.ext2"], metadata_cache=self.metadata_cache
+        )
+
+        mock_post.assert_not_called()
+        self.assertEqual(list(resolved), ["pub1.ext1"])
+        self.assertEqual(unresolved, ["pub2.ext2"])
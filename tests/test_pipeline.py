@@ -0,0 +1,297 @@
+"""Tests for the download/install pipeline."""
+
+import subprocess
+import threading
+import time
+import unittest
+
+import requests
+
+from vsix_to_vscodium.pipeline import FanOutInstall, run_pipeline
+
+
+def install_all(vsix_paths):
+    return {vsix_path: None for vsix_path in vsix_paths}
+
+
+class TestPipeline(unittest.TestCase):
+    def test_all_extensions_transferred(self):
+        installed = []
+
+        def install(vsix_paths):
+            installed.extend(vsix_paths)
+            return install_all(vsix_paths)
+
+        results = run_pipeline(
+            ["pub1.ext1", "pub2.ext2", "pub3.ext3"],
+            lambda ext_id: f"./extensions/{ext_id}.vsix",
+            install,
+            jobs=2,
+        )
+
+        self.assertEqual(
+            sorted(installed),
+            [
+                "./extensions/pub1.ext1.vsix",
+                "./extensions/pub2.ext2.vsix",
+                "./extensions/pub3.ext3.vsix",
+            ],
+        )
+        self.assertTrue(all(result.ok for result in results))
+
+    def test_install_overlaps_slow_downloads(self):
+        """A finished download is installed while others are still running."""
+        release_slow = threading.Event()
+
+        def download(ext_id):
+            if ext_id == "pub.slow":
+                self.assertTrue(release_slow.wait(timeout=5))
+            return ext_id
+
+        def install(vsix_paths):
+            if vsix_paths == ["pub.fast"]:
+                release_slow.set()
+            return install_all(vsix_paths)
+
+        results = run_pipeline(["pub.slow", "pub.fast"], download, install, jobs=2)
+
+        self.assertEqual([result.extension_id for result in results], ["pub.fast", "pub.slow"])
+
+    def test_finished_downloads_installed_together(self):
+        """Downloads that finish while the IDE is busy are installed as one batch."""
+        first_installing = threading.Event()
+        rest_downloaded = threading.Event()
+        batches = []
+
+        def download(ext_id):
+            if ext_id != "pub.a":
+                self.assertTrue(first_installing.wait(timeout=5))
+            if ext_id == "pub.c":
+                rest_downloaded.set()
+            return ext_id
+
+        def install(vsix_paths):
+            batches.append(sorted(vsix_paths))
+            if vsix_paths == ["pub.a"]:
+                first_installing.set()
+                # Keep the IDE busy until the other downloads have finished
+                self.assertTrue(rest_downloaded.wait(timeout=5))
+                time.sleep(0.1)
+            return install_all(vsix_paths)
+
+        run_pipeline(["pub.a", "pub.b", "pub.c"], download, install, jobs=1)
+
+        self.assertEqual(batches, [["pub.a"], ["pub.b", "pub.c"]])
+
+    def test_batches_are_capped(self):
+        batches = []
+
+        def install(vsix_paths):
+            batches.append(len(vsix_paths))
+            return install_all(vsix_paths)
+
+        barrier = threading.Barrier(5)
+
+        def download(ext_id):
+            barrier.wait(timeout=5)
+            return ext_id
+
+        run_pipeline([f"pub.ext{i}" for i in range(5)], download, install, jobs=5, batch_size=2)
+
+        self.assertEqual(sum(batches), 5)
+        self.assertLessEqual(max(batches), 2)
+
+    def test_downloads_bounded_by_jobs(self):
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def download(ext_id):
+            with lock:
+                active.append(ext_id)
+                peak.append(len(active))
+            threading.Event().wait(0.01)
+            with lock:
+                active.remove(ext_id)
+            return ext_id
+
+        run_pipeline([f"pub.ext{i}" for i in range(8)], download, install_all, jobs=3)
+
+        self.assertLessEqual(max(peak), 3)
+
+    def test_failures_are_isolated(self):
+        def download(ext_id):
+            if ext_id == "pub.broken":
+                raise requests.exceptions.RequestException("API Error")
+            return ext_id
+
+        def install(vsix_paths):
+            return {
+                vsix_path: subprocess.CalledProcessError(1, "codium")
+                if vsix_path == "pub.rejected"
+                else None
+                for vsix_path in vsix_paths
+            }
+
+        results = run_pipeline(
+            ["pub.broken", "pub.rejected", "pub.good"], download, install, jobs=2
+        )
+
+        outcomes = {result.extension_id: result.ok for result in results}
+        self.assertEqual(
+            outcomes, {"pub.broken": False, "pub.rejected": False, "pub.good": True}
+        )
+
+    def test_unexpected_errors_propagate(self):
+        def download(ext_id):
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            run_pipeline(["pub.ext"], download, install_all)
+
+
+class TestDependencyOrder(unittest.TestCase):
+    DEPENDENCIES = {
+        "pub.pack": ["pub.lib", "pub.tool"],
+        "pub.tool": ["pub.lib"],
+        "pub.lib": [],
+    }
+
+    def test_dependencies_installed_first(self):
+        """A dependent downloaded first still waits for its dependencies."""
+        lib_wait = threading.Event()
+        batches = []
+
+        def download(ext_id):
+            if ext_id == "pub.lib":
+                # Finish after everything that depends on it
+                self.assertTrue(lib_wait.wait(timeout=5))
+            return ext_id
+
+        def dependencies(vsix_path):
+            if vsix_path == "pub.tool":
+                lib_wait.set()
+            return self.DEPENDENCIES[vsix_path]
+
+        def install(vsix_paths):
+            batches.append(sorted(vsix_paths))
+            return install_all(vsix_paths)
+
+        results = run_pipeline(
+            ["pub.pack", "pub.tool", "pub.lib"],
+            download,
+            install,
+            jobs=3,
+            dependencies=dependencies,
+        )
+
+        self.assertEqual(batches, [["pub.lib"], ["pub.tool"], ["pub.pack"]])
+        self.assertTrue(all(result.ok for result in results))
+
+    def test_failed_dependency_releases_dependents(self):
+        def download(ext_id):
+            if ext_id == "pub.lib":
+                raise requests.exceptions.RequestException("API Error")
+            return ext_id
+
+        results = run_pipeline(
+            ["pub.tool", "pub.lib"],
+            download,
+            install_all,
+            dependencies=lambda vsix_path: self.DEPENDENCIES[vsix_path],
+        )
+
+        outcomes = {result.extension_id: result.ok for result in results}
+        self.assertEqual(outcomes, {"pub.tool": True, "pub.lib": False})
+
+    def test_cycles_are_installed(self):
+        installed = []
+
+        def install(vsix_paths):
+            installed.extend(vsix_paths)
+            return install_all(vsix_paths)
+
+        run_pipeline(
+            ["pub.a", "pub.b"],
+            lambda ext_id: ext_id,
+            install,
+            dependencies=lambda vsix_path: ["pub.b"] if vsix_path == "pub.a" else ["pub.a"],
+        )
+
+        self.assertEqual(sorted(installed), ["pub.a", "pub.b"])
+
+    def test_each_extension_transferred_once(self):
+        downloads = []
+
+        def download(ext_id):
+            downloads.append(ext_id)
+            return ext_id
+
+        results = run_pipeline(
+            ["pub.lib", "pub.tool", "pub.lib"],
+            download,
+            install_all,
+            dependencies=lambda vsix_path: self.DEPENDENCIES[vsix_path],
+        )
+
+        self.assertEqual(sorted(downloads), ["pub.lib", "pub.tool"])
+        self.assertEqual(len(results), 2)
+
+
+class TestFanOutInstall(unittest.TestCase):
+    def test_targets_install_concurrently(self):
+        both_installing = threading.Barrier(2)
+        installed = {"codium": [], "windsurf": []}
+
+        def installer(ide_name):
+            def install(vsix_paths):
+                both_installing.wait(timeout=5)
+                installed[ide_name].extend(vsix_paths)
+                return install_all(vsix_paths)
+
+            return install
+
+        with FanOutInstall({ide: installer(ide) for ide in installed}) as install:
+            errors = install(["pub.a", "pub.b"])
+
+        self.assertEqual(errors, {"pub.a": None, "pub.b": None})
+        self.assertEqual(
+            installed, {"codium": ["pub.a", "pub.b"], "windsurf": ["pub.a", "pub.b"]}
+        )
+
+    def test_errors_and_wanted_files(self):
+        error = subprocess.CalledProcessError(1, "windsurf")
+        installs = {
+            "codium": install_all,
+            "windsurf": lambda paths: {path: error for path in paths},
+        }
+
+        wants = lambda ide, path: ide == "codium" or path == "pub.b"
+
+        with FanOutInstall(installs, wants) as install:
+            errors = install(["pub.a", "pub.b"])
+
+        self.assertEqual(errors, {"pub.a": None, "pub.b": error})
+        self.assertEqual(
+            install.results,
+            {"pub.a": {"codium": None}, "pub.b": {"codium": None, "windsurf": error}},
+        )
+
+    def test_downloaded_once_for_all_targets(self):
+        downloads = []
+        installed = {"codium": [], "windsurf": []}
+
+        def download(ext_id):
+            downloads.append(ext_id)
+            return ext_id
+
+        def installer(ide_name):
+            return lambda paths: installed[ide_name].extend(paths) or install_all(paths)
+
+        with FanOutInstall({ide: installer(ide) for ide in installed}) as install:
+            results = run_pipeline(["pub.a", "pub.b"], download, install, jobs=2)
+
+        self.assertEqual(sorted(downloads), ["pub.a", "pub.b"])
+        self.assertEqual(sorted(installed["codium"]), ["pub.a", "pub.b"])
+        self.assertEqual(sorted(installed["windsurf"]), ["pub.a", "pub.b"])
+        self.assertTrue(all(result.ok for result in results))
@@ -0,0 +1,83 @@
+"""Tests for the run report."""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from vsix_to_vscodium.report import CACHE_HIT, CACHE_MISS, RunReport
+
+
+def make_response(retries=0):
+    response = MagicMock()
+    response.raw.retries.history = tuple(MagicMock() for _ in range(retries))
+    return response
+
+
+class TestRunReport(unittest.TestCase):
+    def test_phases_accumulate(self):
+        report = RunReport()
+
+        with report.phase("install"):
+            pass
+        with report.phase("install"):
+            pass
+        with self.assertRaises(RuntimeError):
+            with report.phase("download"):
+                raise RuntimeError("boom")
+
+        self.assertEqual(sorted(report.phases), ["download", "install"])
+        self.assertGreaterEqual(report.phases["install"], 0.0)
+
+    def test_retries_are_attributed_to_tracked_extension(self):
+        report = RunReport()
+
+        report.on_response(make_response(retries=1))
+        with report.track("pub.ext") as record:
+            report.on_response(make_response(retries=2))
+
+            # Requests of other threads are not attributed to this extension
+            thread = threading.Thread(target=report.on_response, args=(make_response(3),))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(record.retries, 2)
+        self.assertEqual(report.retries, 6)
+        self.assertEqual(report.requests, 9)
+
+    def test_summary(self):
+        report = RunReport(command=["--transfer-all"])
+        report.record("pub.a", outcome="installed", cache=CACHE_MISS, bytes=100, download_time=1.5)
+        report.record("pub.b", outcome="installed", cache=CACHE_HIT, download_time=0.5)
+        report.record("pub.c", outcome="failed", error="boom")
+
+        summary = report.summary()
+
+        self.assertEqual(summary["command"], ["--transfer-all"])
+        self.assertEqual(summary["extensions"], 3)
+        self.assertEqual(summary["outcomes"], {"installed": 2, "failed": 1})
+        self.assertEqual(summary["bytes_downloaded"], 100)
+        self.assertEqual((summary["cache_hits"], summary["cache_misses"]), (1, 1))
+        self.assertEqual(summary["download_time"], 2.0)
+
+    def test_write(self):
+        report = RunReport()
+        report.record("pub.ext", version="1.0.0", outcome="installed")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "report.json")
+            jsonl_path = os.path.join(tmp_dir, "report.jsonl")
+            report.write(json_path)
+            report.write(jsonl_path)
+
+            with open(json_path) as f:
+                document = json.load(f)
+            with open(jsonl_path) as f:
+                lines = [json.loads(line) for line in f]
+
+        self.assertEqual(document["extension_records"][0]["version"], "1.0.0")
+        self.assertEqual([line["type"] for line in lines], ["extension", "summary"])
+        self.assertEqual(lines[0]["extension_id"], "pub.ext")
+        self.assertEqual(lines[1]["outcomes"], {"installed": 1})
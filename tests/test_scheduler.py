@@ -0,0 +1,49 @@
+"""Tests for dependency-aware install ordering."""
+
+import unittest
+
+from vsix_to_vscodium.scheduler import DependencyScheduler, install_waves
+
+
+class TestInstallWaves(unittest.TestCase):
+    def test_dependencies_come_first(self):
+        waves = install_waves(
+            {
+                "pub.pack": ["pub.tool", "pub.lib"],
+                "pub.tool": ["Pub.Lib"],
+                "pub.lib": [],
+                "pub.other": ["missing.ext"],
+            }
+        )
+
+        self.assertEqual(waves, [["pub.lib", "pub.other"], ["pub.tool"], ["pub.pack"]])
+
+    def test_cycles_share_the_last_wave(self):
+        waves = install_waves(
+            {"pub.a": ["pub.b"], "pub.b": ["pub.a"], "pub.c": ["pub.c"]}
+        )
+
+        self.assertEqual(waves, [["pub.c"], ["pub.a", "pub.b"]])
+
+
+class TestDependencyScheduler(unittest.TestCase):
+    def test_released_once_dependencies_settle(self):
+        scheduler = DependencyScheduler(["pub.lib", "pub.tool"])
+        scheduler.add("pub.tool", ["pub.lib", "other.ext"])
+
+        self.assertEqual(scheduler.ready(), [])
+        self.assertEqual(scheduler.waiting, 1)
+
+        scheduler.add("pub.lib", [])
+        self.assertEqual(scheduler.ready(), ["pub.lib"])
+        scheduler.settle("Pub.Lib")
+        self.assertEqual(scheduler.ready(), ["pub.tool"])
+        self.assertEqual(scheduler.waiting, 0)
+
+    def test_force_releases_everything(self):
+        scheduler = DependencyScheduler(["pub.a", "pub.b"])
+        scheduler.add("pub.a", ["pub.b"])
+        scheduler.add("pub.b", ["pub.a"])
+
+        self.assertEqual(scheduler.ready(), [])
+        self.assertEqual(scheduler.ready(force=True), ["pub.a", "pub.b"])
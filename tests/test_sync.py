@@ -0,0 +1,61 @@
+"""Tests for incremental synchronization."""
+
+import subprocess
+import unittest
+from unittest.mock import patch
+
+from vsix_to_vscodium.marketplace import version_key
+from vsix_to_vscodium.sync import list_extension_versions, plan_sync
+
+
+class TestSync(unittest.TestCase):
+    def test_list_extension_versions(self):
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value.stdout = "pub1.ext1@1.0.0\npub2.ext2@2.1.3\n"
+            versions = list_extension_versions("codium")
+
+        self.assertEqual(versions, {"pub1.ext1": "1.0.0", "pub2.ext2": "2.1.3"})
+        mock_run.assert_called_once_with(
+            ["codium", "--list-extensions", "--show-versions"],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+
+    def test_list_extension_versions_empty(self):
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value.stdout = ""
+            self.assertEqual(list_extension_versions("codium"), {})
+
+    def test_list_extension_versions_not_found(self):
+        with patch("subprocess.run", side_effect=FileNotFoundError()):
+            with self.assertRaises(FileNotFoundError):
+                list_extension_versions("codium")
+
+    def test_list_extension_versions_command_error(self):
+        with patch(
+            "subprocess.run", side_effect=subprocess.CalledProcessError(1, "codium")
+        ):
+            with self.assertRaises(subprocess.CalledProcessError):
+                list_extension_versions("codium")
+
+    def test_plan_sync(self):
+        plan = plan_sync(
+            {
+                "pub.missing": "1.0.0",
+                "pub.outdated": "1.10.0",
+                "Pub.Same": "2.0.0",
+                "pub.newer": "1.0.0",
+            },
+            {"pub.outdated": "1.9.0", "pub.same": "2.0.0", "pub.newer": "1.1.0"},
+        )
+
+        self.assertEqual(plan.missing, ["pub.missing"])
+        self.assertEqual(plan.outdated, ["pub.outdated"])
+        self.assertEqual(plan.up_to_date, ["Pub.Same", "pub.newer"])
+        self.assertEqual(plan.to_transfer, ["pub.missing", "pub.outdated"])
+
+    def test_version_key(self):
+        self.assertLess(version_key("1.9.0"), version_key("1.10.0"))
+        self.assertLess(version_key("2.0.0-beta.1"), version_key("2.0.0"))
+        self.assertEqual(version_key("1.0"), version_key("1.0.0"))
@@ -0,0 +1,133 @@
+"""Tests for the adaptive per-host request limits."""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+import unittest
+
+from vsix_to_vscodium import throttle, transport
+from vsix_to_vscodium.throttle import HostLimiter, Throttle
+
+
+class TestHostLimiter(unittest.TestCase):
+    def test_grows_while_latency_is_flat(self):
+        limiter = HostLimiter("gallery", initial_limit=2, max_limit=4)
+
+        for _ in range(20):
+            limiter.on_response(0.1)
+
+        self.assertEqual(limiter.snapshot()["limit"], 4)
+
+    def test_stops_growing_when_latency_rises(self):
+        limiter = HostLimiter("gallery", initial_limit=2, max_limit=10)
+        limiter.on_response(0.1)
+        grown = limiter.limit
+
+        for _ in range(10):
+            limiter.on_response(1.0)
+
+        self.assertEqual(limiter.limit, grown)
+
+    def test_backs_off_when_throttled(self):
+        limiter = HostLimiter("gallery", initial_limit=8, max_limit=8)
+
+        limiter.on_response(0.1, throttled=1)
+        # Throttled responses to requests sent before the first one came back
+        limiter.on_response(0.1, throttled=1)
+
+        snapshot = limiter.snapshot()
+        self.assertEqual(snapshot["limit"], 4)
+        self.assertEqual(snapshot["throttled"], 2)
+
+        limiter._backed_off_at -= throttle.BACKOFF_COOLDOWN
+        limiter.on_response(0.1, throttled=1)
+        self.assertEqual(limiter.snapshot()["limit"], 2)
+
+    def test_limits_requests_in_flight(self):
+        limiter = HostLimiter("gallery", initial_limit=2, max_limit=2)
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def request():
+            limiter.acquire()
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.pop()
+            limiter.release()
+
+        threads = [threading.Thread(target=request) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(limiter.snapshot()["peak_in_flight"], 2)
+
+    def test_retry_after_pauses_new_requests(self):
+        limiter = HostLimiter("gallery")
+        limiter.on_response(0.1, throttled=1, retry_after=0.2)
+
+        start = time.monotonic()
+        limiter.acquire()
+        limiter.release()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        status = 429 if self.server.throttled else 200
+        self.server.throttled = max(self.server.throttled - 1, 0)
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestThrottleAgainstServer(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.throttled = 0
+        self.host = f"127.0.0.1:{self.server.server_address[1]}"
+        self.url = f"http://{self.host}/package"
+        threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+        self.throttle = throttle.configure_throttle(initial_limit=4, max_limit=4)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        throttle.configure_throttle()
+        transport.configure_session()
+
+    def test_session_responses_adjust_the_host_limit(self):
+        self.server.throttled = 1
+        session = transport.create_session(retries=2, backoff_factor=0)
+
+        with self.throttle.slot(self.url):
+            self.assertEqual(session.get(self.url).status_code, 200)
+
+        hosts = self.throttle.snapshot()
+        self.assertEqual(list(hosts), [self.host])
+        self.assertEqual(hosts[self.host]["throttled"], 1)
+        self.assertEqual(hosts[self.host]["limit"], 2)
+
+    def test_hosts_are_limited_separately(self):
+        first = self.throttle.limiter("https://pub1.gallery.vsassets.io/a")
+        second = self.throttle.limiter("https://pub2.gallery.vsassets.io/b")
+
+        self.assertIsNot(first, second)
+        self.assertIs(first, self.throttle.limiter("https://PUB1.gallery.vsassets.io/c"))
+        self.assertIsInstance(Throttle().limiter(self.url), HostLimiter)
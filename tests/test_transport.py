@@ -0,0 +1,109 @@
+"""Tests for the shared HTTP session."""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+import unittest
+
+from vsix_to_vscodium import transport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.server.throttled:
+            self.server.throttled -= 1
+            self.send_response(429)
+            self.send_header("Retry-After", str(self.server.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestTransport(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.connections = 0
+        self.server.requests = 0
+        self.server.throttled = 0
+        self.server.retry_after = 0
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        transport.configure_session()
+
+    def test_get_session_is_shared(self):
+        self.assertIs(transport.get_session(), transport.get_session())
+
+    def test_configure_session_replaces_shared_session(self):
+        previous = transport.get_session()
+        session = transport.configure_session(pool_size=2, retries=1)
+        self.assertIsNot(session, previous)
+        self.assertIs(transport.get_session(), session)
+        adapter = session.get_adapter("https://marketplace.visualstudio.com")
+        self.assertEqual(adapter._pool_maxsize, 2)
+        self.assertEqual(adapter.max_retries.total, 1)
+
+    def test_connections_are_kept_alive(self):
+        session = transport.create_session()
+        for _ in range(3):
+            session.get(self.url).raise_for_status()
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_retries_throttled_requests(self):
+        self.server.throttled = 2
+        session = transport.create_session(retries=3, backoff_factor=0)
+
+        response = session.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_honors_retry_after(self):
+        self.server.throttled = 1
+        self.server.retry_after = 1
+        session = transport.create_session(retries=1, backoff_factor=0)
+
+        start = time.monotonic()
+        response = session.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(time.monotonic() - start, 0.9)
+
+    def test_returns_last_response_when_retries_exhausted(self):
+        self.server.throttled = 5
+        session = transport.create_session(retries=1, backoff_factor=0)
+
+        response = session.get(self.url)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_offline_session_refuses_requests(self):
+        session = transport.create_session(offline=True)
+
+        with self.assertRaises(transport.OfflineError):
+            session.get(self.url)
+
+        self.assertEqual(self.server.requests, 0)
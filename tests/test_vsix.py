@@ -0,0 +1,53 @@
+"""Tests for reading .vsix packages."""
+
+import os
+import tempfile
+import unittest
+import zipfile
+
+from tests.helpers import make_vsix
+from vsix_to_vscodium.vsix import verify_package
+
+
+class TestVerifyPackage(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.vsix_path = make_vsix(
+            os.path.join(self.tmp_dir.name, "pub.ext-1.0.0.vsix"),
+            "pub",
+            "ext",
+            "1.0.0",
+            files={"out/main.js": os.urandom(4096)},
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_complete_package(self):
+        verify_package(self.vsix_path)
+
+    def test_truncated_package(self):
+        size = os.path.getsize(self.vsix_path)
+        with open(self.vsix_path, "r+b") as f:
+            f.truncate(size // 2)
+
+        with self.assertRaises(ValueError):
+            verify_package(self.vsix_path)
+
+    def test_not_a_zip(self):
+        with open(self.vsix_path, "wb") as f:
+            f.write(b"<html>Service Unavailable</html>")
+
+        with self.assertRaises(ValueError):
+            verify_package(self.vsix_path)
+
+    def test_zip_without_manifest(self):
+        with zipfile.ZipFile(self.vsix_path, "w") as archive:
+            archive.writestr("readme.txt", "not an extension")
+
+        with self.assertRaisesRegex(ValueError, "manifest"):
+            verify_package(self.vsix_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,500 @@
+"""Library interface for transferring extensions.
+
+The command line is a thin wrapper around these functions, which can also be
+used from a long-lived program that transfers extensions many times, without
+paying for a new interpreter per transfer. Failures are raised as exceptions
+or reported in the per-extension results, and never exit the process.
+
+    async for result in transfer(["ms-python.python"], ["codium"]):
+        print(result.extension_id, result.version, result.outcome, result.error)
+"""
+
+import asyncio
+from dataclasses import replace
+import time
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+)
+
+import requests
+
+from vsix_to_vscodium.cache import cache_key, get_cache, get_metadata_cache
+from vsix_to_vscodium.compatibility import IdeTarget, get_ide_target
+from vsix_to_vscodium.download import download_to_file
+from vsix_to_vscodium.errors import ExtensionNotFoundError, InvalidExtensionIdError
+from vsix_to_vscodium.installer import (
+    DEFAULT_INSTALL_BATCH_SIZE,
+    extract_extensions,
+    install_extensions,
+)
+from vsix_to_vscodium.marketplace import (
+    ExtensionMetadata,
+    build_download_url,
+    parse_extension_id,
+    resolve_extensions,
+    version_key,
+)
+from vsix_to_vscodium.pipeline import (
+    DEFAULT_JOBS,
+    FanOutInstall,
+    InstallBatch,
+    TransferResult,
+    run_pipeline,
+)
+from vsix_to_vscodium.report import (
+    CACHE_HIT,
+    CACHE_MISS,
+    OUTCOME_FAILED,
+    OUTCOME_INSTALLED,
+    OUTCOME_SKIPPED,
+    ExtensionRecord,
+    RunReport,
+    get_report,
+)
+from vsix_to_vscodium.vsix import package_dependencies, verify_package
+
+# IDE extensions are installed into when no target is given
+DEFAULT_IDE = "codium"
+
+# Receives the result of each extension as soon as it is final
+ResultCallback = Callable[[ExtensionRecord], None]
+
+
+def download_extension(
+    extension_id: str,
+    specific_version: Optional[str] = None,
+    no_cache: bool = False,
+    metadata: Optional[ExtensionMetadata] = None,
+    target: Optional[IdeTarget] = None,
+    report: Optional[RunReport] = None,
+) -> str:
+    """
+    Download a VS Code extension from the marketplace.
+
+    Args:
+        extension_id: The extension ID in format 'publisher.extension'
+        specific_version: Specific version to download. Defaults to None (latest).
+        no_cache: Force re-download even if file exists. Defaults to False.
+        metadata: Metadata already resolved for this extension, e.g. by
+            resolve_extensions. Defaults to None (query the marketplace).
+        target: IDE the version queried from the marketplace must suit.
+            Defaults to None (the latest version).
+        report: Report to record the download in. Defaults to the shared report.
+
+    Returns:
+        str: Path to the downloaded .vsix file
+
+    Raises:
+        InvalidExtensionIdError: If the extension ID is invalid
+        ExtensionNotFoundError: If the marketplace has no suitable version
+        requests.exceptions.RequestException: If there's an error downloading the extension
+    """
+    try:
+        publisher, extension_name = parse_extension_id(extension_id)
+    except ValueError:
+        raise InvalidExtensionIdError(
+            f"Invalid extension ID {extension_id!r}, use 'publisher.extension'"
+        ) from None
+
+    report = report or get_report()
+    with report.track(extension_id):
+        return _download_extension(
+            report,
+            extension_id,
+            publisher,
+            extension_name,
+            specific_version,
+            no_cache,
+            metadata,
+            target,
+        )
+
+
+def _download_extension(
+    report: RunReport,
+    extension_id: str,
+    publisher: str,
+    extension_name: str,
+    specific_version: Optional[str],
+    no_cache: bool,
+    metadata: Optional[ExtensionMetadata],
+    target: Optional[IdeTarget],
+) -> str:
+    target_platform = None
+    if specific_version:
+        version = specific_version
+    else:
+        if metadata is None:
+            # Query the marketplace API for extension metadata
+            print(f"Querying Marketplace API for {extension_id}...")
+            with report.phase("query_metadata"):
+                resolved, _ = resolve_extensions(
+                    [extension_id], metadata_cache=get_metadata_cache(), target=target
+                )
+            metadata = resolved.get(extension_id)
+            if metadata is None:
+                report.record(extension_id, outcome=OUTCOME_FAILED, error="not found")
+                raise ExtensionNotFoundError(
+                    f"No compatible version of {extension_id} found"
+                )
+        version = metadata.version
+        target_platform = metadata.target_platform
+
+    cache = get_cache()
+    key = cache_key(publisher, extension_name, version, target_platform)
+    start = time.perf_counter()
+
+    # Check if the package is already cached
+    if not no_cache:
+        cached_path = cache.get(key)
+        if cached_path is not None:
+            print(f"Using cached {extension_id} {version} from {cached_path}")
+            report.record(
+                extension_id,
+                version=version,
+                cache=CACHE_HIT,
+                download_time=time.perf_counter() - start,
+            )
+            return cached_path
+
+    # Download the extension
+    download_url = build_download_url(publisher, extension_name, version, target_platform)
+
+    if target_platform:
+        print(f"Downloading version {version} for {target_platform}...")
+    else:
+        print(f"Downloading version {version}...")
+    partial_path = cache.partial_path(key)
+    # The package is hashed and checked as it downloads, so storing it does
+    # not read it back
+    result = download_to_file(download_url, partial_path, verify=verify_package)
+    downloaded = time.perf_counter()
+    file_path = cache.put(key, partial_path, sha256=result.sha256)
+    report.record(
+        extension_id,
+        version=version,
+        cache=CACHE_MISS,
+        bytes=result.size,
+        download_time=downloaded - start,
+        store_time=time.perf_counter() - downloaded,
+    )
+
+    print("=" * 50)
+    print(f"Successfully downloaded to: {file_path}")
+    print("=" * 50)
+
+    return file_path
+
+
+def make_installer(
+    ide_name: str, installer: str = "cli", extensions_dir: Optional[str] = None
+) -> InstallBatch:
+    """
+    Build the install stage for a target IDE.
+
+    Args:
+        ide_name: Name of the IDE executable (e.g., 'windsurf')
+        installer: 'cli' to install through the IDE's command line, or
+            'extract' to extract packages into its extensions directory
+        extensions_dir: Extensions directory for 'extract'. Defaults to the
+            known directory of the IDE.
+
+    Returns:
+        InstallBatch: Installs a batch of .vsix files into the IDE
+    """
+    if installer == "extract":
+        return lambda vsix_paths: extract_extensions(vsix_paths, ide_name, extensions_dir)
+    return lambda vsix_paths: install_extensions(vsix_paths, ide_name)
+
+
+def resolve_target(
+    ide_names: List[str],
+    engine_version: Optional[str] = None,
+    target_platform: Optional[str] = None,
+) -> IdeTarget:
+    """
+    Determine the engine version and platform that every target IDE accepts.
+
+    Args:
+        ide_names: Names of the target IDE executables
+        engine_version: Engine version to use instead of detecting it
+        target_platform: Platform to use instead of this machine's
+
+    Returns:
+        IdeTarget: The oldest engine among the targets, and the platform
+    """
+    targets = []
+    for ide_name in ide_names:
+        target = get_ide_target(ide_name, engine_version, target_platform)
+        print(f"Resolving versions for {ide_name} ({target})")
+        targets.append(target)
+    # Every target installs the same version, so the oldest engine decides
+    engines = [target.engine_version for target in targets if target.engine_version]
+    return IdeTarget(
+        min(engines, key=version_key) if engines else None, targets[0].platform
+    )
+
+
+def _target_outcomes(
+    targets: Iterable[str], result: TransferResult, install: FanOutInstall
+) -> Dict[str, str]:
+    # Outcome in each target IDE, skipped where the extension was not needed
+    errors = install.results.get(result.vsix_path, {})
+    outcomes = {}
+    for target in targets:
+        if result.vsix_path is None:
+            outcomes[target] = OUTCOME_FAILED
+        elif target not in errors:
+            outcomes[target] = OUTCOME_SKIPPED
+        elif errors[target] is None:
+            outcomes[target] = OUTCOME_INSTALLED
+        else:
+            outcomes[target] = OUTCOME_FAILED
+    return outcomes
+
+
+def transfer_packages(
+    extension_ids: List[str],
+    download: Callable[[str], str],
+    installs: Dict[str, InstallBatch],
+    jobs: int = DEFAULT_JOBS,
+    batch_size: int = DEFAULT_INSTALL_BATCH_SIZE,
+    needed: Optional[Dict[str, Set[str]]] = None,
+    report: Optional[RunReport] = None,
+    on_result: Optional[ResultCallback] = None,
+) -> List[ExtensionRecord]:
+    """
+    Fetch extensions with any download function and install them into targets.
+
+    Args:
+        extension_ids: Extension IDs in format 'publisher.extension'
+        download: Fetches an extension and returns the path to its .vsix file
+        installs: Install stage of each target, keyed by the target's name
+        jobs: Maximum number of concurrent downloads
+        batch_size: Maximum number of .vsix files installed at once
+        needed: Extensions each target needs. Defaults to None (every target
+            needs every extension).
+        report: Report to record the transfer in. Defaults to the shared report.
+        on_result: Called with the result of each extension once it is final
+
+    Returns:
+        List[ExtensionRecord]: The result of each extension, in completion order
+    """
+    report = report or get_report()
+    install_times: Dict[str, float] = {}
+    batch_sizes: Dict[str, int] = {}
+    # Extension ID of each downloaded .vsix file
+    downloaded: Dict[str, str] = {}
+    records: List[ExtensionRecord] = []
+
+    def tracked_download(ext_id: str) -> str:
+        vsix_path = download(ext_id)
+        downloaded[vsix_path] = ext_id
+        return vsix_path
+
+    wants = None
+    if needed is not None:
+        wants = lambda target, vsix_path: downloaded[vsix_path] in needed[target]
+
+    with FanOutInstall(installs, wants) as install:
+
+        def timed_install(vsix_paths: List[str]) -> Dict[str, Optional[BaseException]]:
+            start = time.perf_counter()
+            try:
+                with report.phase("install"):
+                    return install(vsix_paths)
+            finally:
+                for vsix_path in vsix_paths:
+                    install_times[vsix_path] = time.perf_counter() - start
+                    batch_sizes[vsix_path] = len(vsix_paths)
+
+        def finish(result: TransferResult) -> None:
+            record = report.record(
+                result.extension_id,
+                outcome=OUTCOME_INSTALLED if result.ok else OUTCOME_FAILED,
+                error=None if result.ok else str(result.error),
+                install_time=install_times.get(result.vsix_path, 0.0),
+                install_batch_size=batch_sizes.get(result.vsix_path, 0),
+                targets=_target_outcomes(installs, result, install),
+            )
+            # A copy, so that later updates to the report do not show through
+            records.append(replace(record, targets=dict(record.targets)))
+            if on_result is not None:
+                on_result(records[-1])
+
+        with report.phase("transfer"):
+            run_pipeline(
+                extension_ids,
+                tracked_download,
+                timed_install,
+                jobs=jobs,
+                batch_size=batch_size,
+                dependencies=package_dependencies,
+                on_result=finish,
+            )
+    return records
+
+
+def transfer_extensions(
+    extension_ids: Iterable[str],
+    targets: Optional[List[str]] = None,
+    jobs: int = DEFAULT_JOBS,
+    install_batch_size: int = DEFAULT_INSTALL_BATCH_SIZE,
+    installer: str = "cli",
+    extensions_dir: Optional[str] = None,
+    versions: Optional[Dict[str, str]] = None,
+    needed: Optional[Dict[str, Set[str]]] = None,
+    engine_version: Optional[str] = None,
+    target_platform: Optional[str] = None,
+    report: Optional[RunReport] = None,
+    on_result: Optional[ResultCallback] = None,
+) -> List[ExtensionRecord]:
+    """
+    Download extensions from the Marketplace and install them into target IDEs.
+
+    Without `versions`, the newest version every target accepts is resolved
+    for each extension first. Extensions without such a version are skipped.
+
+    Args:
+        extension_ids: Extension IDs in format 'publisher.extension'
+        targets: Names of the target IDE executables. Defaults to [DEFAULT_IDE].
+        jobs: Maximum number of concurrent downloads
+        install_batch_size: Maximum number of extensions installed by a
+            single IDE process
+        installer: 'cli' or 'extract', see make_installer
+        extensions_dir: Extensions directory for 'extract' with a single target
+        versions: Version to download of each extension, e.g. the versions
+            installed in VS Code. Defaults to None (resolve the versions).
+        needed: Extensions each target needs. Defaults to None (every target
+            needs every extension).
+        engine_version: Engine version of the targets instead of detecting it
+        target_platform: Platform to download packages for instead of this
+            machine's
+        report: Report to record the transfer in. Defaults to the shared report.
+        on_result: Called with the result of each extension once it is final
+
+    Returns:
+        List[ExtensionRecord]: The result of each extension, in completion order
+
+    Raises:
+        FileNotFoundError: If a target IDE is not installed
+    """
+    extension_ids = list(dict.fromkeys(extension_ids))
+    targets = targets or [DEFAULT_IDE]
+    report = report or get_report()
+    records: List[ExtensionRecord] = []
+
+    if versions is not None:
+        download = lambda ext_id: download_extension(
+            ext_id, specific_version=versions[ext_id], report=report
+        )
+    else:
+        target = resolve_target(targets, engine_version, target_platform)
+        try:
+            print(f"Querying Marketplace API for {len(extension_ids)} extensions...")
+            with report.phase("query_metadata"):
+                resolved, unresolved = resolve_extensions(
+                    extension_ids, metadata_cache=get_metadata_cache(), target=target
+                )
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to query extension metadata in bulk: {e}")
+            print("Falling back to querying each extension separately...")
+            resolved, unresolved = {}, []
+        skipped = set(unresolved)
+        for ext_id in unresolved:
+            print(
+                f"Could not find a version of {ext_id} compatible with "
+                f"{', '.join(targets)} in the Marketplace, skipping it"
+            )
+            record = report.record(ext_id, outcome=OUTCOME_SKIPPED, error="not found")
+            records.append(replace(record))
+            if on_result is not None:
+                on_result(records[-1])
+        extension_ids = [ext_id for ext_id in extension_ids if ext_id not in skipped]
+        download = lambda ext_id: download_extension(
+            ext_id, metadata=resolved.get(ext_id), target=target, report=report
+        )
+
+    installs = {
+        ide_name: make_installer(ide_name, installer, extensions_dir)
+        for ide_name in targets
+    }
+    records.extend(
+        transfer_packages(
+            extension_ids,
+            download,
+            installs,
+            jobs=jobs,
+            batch_size=install_batch_size,
+            needed=needed,
+            report=report,
+            on_result=on_result,
+        )
+    )
+    return records
+
+
+async def transfer(
+    extension_ids: Iterable[str],
+    targets: Optional[List[str]] = None,
+    concurrency: int = DEFAULT_JOBS,
+    **options,
+) -> AsyncIterator[ExtensionRecord]:
+    """
+    Transfer extensions from the Marketplace into target IDEs, without blocking
+    the event loop.
+
+    The transfer runs on a worker thread with the shared HTTP session, cache
+    and per-host limits, so concurrent transfers reuse connections and share
+    the Marketplace's rate limits. Each transfer records into a report of its
+    own.
+
+    Args:
+        extension_ids: Extension IDs in format 'publisher.extension'
+        targets: Names of the target IDE executables. Defaults to [DEFAULT_IDE].
+        concurrency: Maximum number of concurrent downloads
+        **options: Further arguments of transfer_extensions, e.g. versions or
+            installer
+
+    Yields:
+        ExtensionRecord: The result of each extension as soon as it is final,
+            with its resolved version, outcome per target, error, bytes
+            downloaded and timings
+
+    Raises:
+        FileNotFoundError: If a target IDE is not installed
+    """
+    loop = asyncio.get_running_loop()
+    results: "asyncio.Queue[Optional[ExtensionRecord]]" = asyncio.Queue()
+    options.setdefault("report", RunReport())
+
+    def on_result(record: ExtensionRecord) -> None:
+        loop.call_soon_threadsafe(results.put_nowait, record)
+
+    def run() -> None:
+        try:
+            transfer_extensions(
+                extension_ids,
+                targets,
+                jobs=concurrency,
+                on_result=on_result,
+                **options,
+            )
+        finally:
+            # Marks the end of the results
+            loop.call_soon_threadsafe(results.put_nowait, None)
+
+    worker = loop.run_in_executor(None, run)
+    while True:
+        record = await results.get()
+        if record is None:
+            break
+        yield record
+    # Raises the error that ended the transfer early, if any
+    await worker
@@ -0,0 +1,220 @@
+"""Single-file bundles of extensions for installing without network access."""
+
+from dataclasses import asdict, dataclass, field
+import hashlib
+import json
+import os
+import struct
+import time
+from typing import BinaryIO, Iterator, List, Optional
+import zipfile
+
+from vsix_to_vscodium.cache import hash_file
+from vsix_to_vscodium.errors import VsixToVscodiumError
+from vsix_to_vscodium.scheduler import install_waves
+from vsix_to_vscodium.vsix import read_dependencies, read_package_json, read_target_platform
+
+BUNDLE_INDEX = "index.json"
+BUNDLE_FORMAT = 1
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Fixed part of a zip local file header, see APPNOTE.TXT section 4.3.7
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+class BundleError(VsixToVscodiumError):
+    """Raised when a bundle is malformed or one of its packages is corrupt."""
+
+
+@dataclass
+class BundleEntry:
+    """A .vsix package stored in a bundle."""
+
+    extension_id: str
+    version: str
+    file: str
+    sha256: str
+    size: int
+    target_platform: Optional[str] = None
+    dependencies: List[str] = field(default_factory=list)
+
+
+def dependency_order(entries: List[BundleEntry]) -> List[BundleEntry]:
+    """
+    Order entries so that every extension comes after the ones it depends on.
+
+    Args:
+        entries: The entries to order
+
+    Returns:
+        List[BundleEntry]: The entries in install order
+    """
+    by_id = {entry.extension_id: entry for entry in entries}
+    waves = install_waves({entry.extension_id: entry.dependencies for entry in entries})
+    return [by_id[ext_id] for wave in waves for ext_id in wave]
+
+
+def _describe(vsix_path: str) -> BundleEntry:
+    with zipfile.ZipFile(vsix_path) as archive:
+        manifest = read_package_json(archive)
+        target_platform = read_target_platform(archive)
+    ext_id = f"{manifest['publisher']}.{manifest['name']}"
+    platform = f"@{target_platform}" if target_platform else ""
+    return BundleEntry(
+        extension_id=ext_id,
+        version=manifest["version"],
+        file=f"extensions/{ext_id.lower()}-{manifest['version']}{platform}.vsix",
+        sha256=hash_file(vsix_path),
+        size=os.path.getsize(vsix_path),
+        target_platform=target_platform,
+        dependencies=read_dependencies(manifest),
+    )
+
+
+def write_bundle(bundle_path: str, vsix_paths: List[str]) -> List[BundleEntry]:
+    """
+    Write .vsix packages into a single bundle file.
+
+    The packages are stored uncompressed, since they are zip files already,
+    so that they can be read straight from the bundle by offset. The index
+    lists them in dependency order with their versions and SHA-256 hashes.
+
+    Args:
+        bundle_path: Path of the bundle to write
+        vsix_paths: Paths to the .vsix files
+
+    Returns:
+        List[BundleEntry]: The bundled packages in install order
+
+    Raises:
+        zipfile.BadZipFile: If a file is not a .vsix package
+        KeyError: If a package has no extension/package.json
+    """
+    described = [(_describe(vsix_path), vsix_path) for vsix_path in vsix_paths]
+    paths = {entry.file: vsix_path for entry, vsix_path in described}
+    entries = dependency_order(
+        list({entry.file: entry for entry, _ in described}.values())
+    )
+    tmp_path = f"{bundle_path}.{os.getpid()}.tmp"
+    try:
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for entry in entries:
+                archive.write(paths[entry.file], entry.file)
+            index = {
+                "format": BUNDLE_FORMAT,
+                "created": int(time.time()),
+                "extensions": [asdict(entry) for entry in entries],
+            }
+            archive.writestr(BUNDLE_INDEX, json.dumps(index, indent=2))
+        os.replace(tmp_path, bundle_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return entries
+
+
+class BundleReader:
+    """Reads the packages of a bundle straight from their offset in the file."""
+
+    def __init__(self, bundle_path: str):
+        """
+        Open a bundle and read its index.
+
+        Args:
+            bundle_path: Path to the bundle
+
+        Raises:
+            BundleError: If the file is not a bundle
+            OSError: If the file cannot be read
+        """
+        self.bundle_path = bundle_path
+        self._file: BinaryIO = open(bundle_path, "rb")
+        try:
+            with zipfile.ZipFile(self._file) as archive:
+                members = {info.filename: info for info in archive.infolist()}
+                index = json.loads(archive.read(BUNDLE_INDEX))
+            if index.get("format") != BUNDLE_FORMAT:
+                raise BundleError(f"Unsupported bundle format {index.get('format')}")
+            self.entries = [BundleEntry(**data) for data in index["extensions"]]
+            self._offsets = {
+                entry.file: self._data_offset(members[entry.file]) for entry in self.entries
+            }
+        except (zipfile.BadZipFile, KeyError, TypeError, ValueError) as e:
+            self._file.close()
+            raise BundleError(f"{bundle_path} is not a valid bundle: {e}") from e
+        except BaseException:
+            self._file.close()
+            raise
+
+    def _data_offset(self, info: zipfile.ZipInfo) -> int:
+        if info.compress_type != zipfile.ZIP_STORED:
+            raise BundleError(f"{info.filename} is compressed")
+        self._file.seek(info.header_offset)
+        header = _LOCAL_HEADER.unpack(self._file.read(_LOCAL_HEADER.size))
+        if header[0] != _LOCAL_HEADER_SIGNATURE:
+            raise BundleError(f"Bad local header for {info.filename}")
+        name_length, extra_length = header[-2:]
+        return info.header_offset + _LOCAL_HEADER.size + name_length + extra_length
+
+    def iter_chunks(self, entry: BundleEntry) -> Iterator[bytes]:
+        """
+        Read a bundled package without extracting it, verifying its hash.
+
+        Args:
+            entry: The package to read
+
+        Yields:
+            bytes: Consecutive chunks of the package
+
+        Raises:
+            BundleError: If the package does not match the hash in the index
+        """
+        digest = hashlib.sha256()
+        self._file.seek(self._offsets[entry.file])
+        remaining = entry.size
+        while remaining:
+            chunk = self._file.read(min(COPY_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise BundleError(f"{entry.file} is truncated")
+            remaining -= len(chunk)
+            digest.update(chunk)
+            yield chunk
+        if digest.hexdigest() != entry.sha256:
+            raise BundleError(f"{entry.file} does not match its SHA-256 hash")
+
+    def copy_to(self, entry: BundleEntry, output_dir: str) -> str:
+        """
+        Copy a bundled package to a .vsix file.
+
+        Args:
+            entry: The package to copy
+            output_dir: Directory the .vsix file is written to
+
+        Returns:
+            str: Path to the .vsix file
+
+        Raises:
+            BundleError: If the package does not match the hash in the index
+        """
+        vsix_path = os.path.join(output_dir, os.path.basename(entry.file))
+        try:
+            with open(vsix_path, "wb") as f:
+                for chunk in self.iter_chunks(entry):
+                    f.write(chunk)
+        except BaseException:
+            if os.path.exists(vsix_path):
+                os.remove(vsix_path)
+            raise
+        return vsix_path
+
+    def close(self) -> None:
+        """Close the bundle file."""
+        self._file.close()
+
+    def __enter__(self) -> "BundleReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
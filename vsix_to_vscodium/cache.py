@@ -0,0 +1,571 @@
+"""Persistent cache of downloaded extension packages."""
+
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from vsix_to_vscodium.vsix import verify_package
+
+CACHE_DIR_ENV = "VSIX_TO_VSCODIUM_CACHE_DIR"
+CACHE_MAX_SIZE_ENV = "VSIX_TO_VSCODIUM_CACHE_MAX_SIZE"
+DEFAULT_MAX_SIZE = 2 * 1024**3
+# Seconds before cached Marketplace metadata is checked again
+DEFAULT_METADATA_TTL = 3600
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+_cache: Optional["VsixCache"] = None
+_metadata_cache: Optional["MetadataCache"] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache_dir() -> str:
+    """
+    Get the directory holding the cache.
+
+    Uses $VSIX_TO_VSCODIUM_CACHE_DIR if set, otherwise the platform's user
+    cache directory.
+
+    Returns:
+        str: Path to the cache directory
+    """
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "vsix-to-vscodium")
+
+
+def parse_size(value: str) -> int:
+    """
+    Parse a size such as '500M' or '2G' into a number of bytes.
+
+    Args:
+        value: Number of bytes, optionally followed by K, M, G or T
+
+    Returns:
+        int: The size in bytes
+
+    Raises:
+        ValueError: If the value is not a valid size
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*", value, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {value!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def format_size(size: int) -> str:
+    """Format a number of bytes for display, e.g. '1.5 MiB'."""
+    value = float(size)
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if value < 1024 or unit == "GiB":
+            break
+        value /= 1024
+    return f"{size} B" if unit == "B" else f"{value:.1f} {unit}"
+
+
+def cache_key(
+    publisher: str, name: str, version: str, target_platform: Optional[str] = None
+) -> str:
+    """
+    Build the cache key of an extension package.
+
+    Args:
+        publisher: The extension publisher
+        name: The extension name
+        version: The extension version
+        target_platform: Platform the package targets, None for universal packages
+
+    Returns:
+        str: Key in the form 'publisher.name-version[@platform]'
+    """
+    key = f"{publisher}.{name}-{version}".lower()
+    if target_platform:
+        key = f"{key}@{target_platform}"
+    return key
+
+
+def hash_file(file_path: str) -> str:
+    """Compute the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Summary of the cache contents."""
+
+    root: str
+    entries: int
+    total_size: int
+    max_size: int
+
+
+class VsixCache:
+    """
+    Content-addressed store of .vsix files with a size cap and LRU eviction.
+
+    Packages are stored once under 'objects/' by their SHA-256 digest. The
+    index maps each cache key to its digest, size and last use time, and is
+    rewritten atomically on every change.
+
+    Next to each package, a '.json' sidecar records its digest along with the
+    size and modification time the file had when the digest was checked. A
+    hit whose file still has that size and modification time is trusted
+    without reading the package again. Otherwise the package is hashed and
+    its central directory checked, and a package that fails is moved to
+    'quarantine/' so that it is downloaded again.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_size: int = DEFAULT_MAX_SIZE):
+        self.root = root or get_cache_dir()
+        self.max_size = max_size
+        self.objects_dir = os.path.join(self.root, "objects")
+        self.partial_dir = os.path.join(self.root, "partial")
+        self.quarantine_dir = os.path.join(self.root, "quarantine")
+        self.index_path = os.path.join(self.root, "index.json")
+        self._lock = threading.Lock()
+
+    def _load_index(self) -> Dict[str, dict]:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: Dict[str, dict]) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def object_path(self, sha256: str) -> str:
+        """Path of the stored package with the given digest."""
+        return os.path.join(self.objects_dir, sha256[:2], f"{sha256}.vsix")
+
+    def _write_sidecar(self, sha256: str) -> None:
+        path = self.object_path(sha256)
+        stat = os.stat(path)
+        tmp_path = f"{path}.json.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"sha256": sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}, f
+            )
+        os.replace(tmp_path, f"{path}.json")
+
+    def _is_intact(self, sha256: str) -> bool:
+        path = self.object_path(sha256)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        try:
+            with open(f"{path}.json", encoding="utf-8") as f:
+                sidecar = json.load(f)
+        except (OSError, ValueError):
+            sidecar = None
+        if (
+            isinstance(sidecar, dict)
+            and sidecar.get("sha256") == sha256
+            and sidecar.get("size") == stat.st_size
+            and sidecar.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            return True
+        # The file changed, or was stored without a sidecar: read it in full
+        try:
+            if hash_file(path) != sha256:
+                return False
+            verify_package(path)
+        except (OSError, ValueError):
+            return False
+        self._write_sidecar(sha256)
+        return True
+
+    def _quarantine(self, sha256: str) -> None:
+        path = self.object_path(sha256)
+        os.makedirs(self.quarantine_dir, exist_ok=True)
+        try:
+            os.replace(path, os.path.join(self.quarantine_dir, os.path.basename(path)))
+        except OSError:
+            pass
+        try:
+            os.remove(f"{path}.json")
+        except OSError:
+            pass
+
+    def partial_path(self, key: str) -> str:
+        """
+        Path to download a package to before it is added with put().
+
+        Args:
+            key: Cache key of the package
+
+        Returns:
+            str: Path inside the cache's 'partial/' directory
+        """
+        os.makedirs(self.partial_dir, exist_ok=True)
+        return os.path.join(self.partial_dir, f"{key}.vsix")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached package and mark it as recently used.
+
+        Entries whose file is missing or corrupt are dropped, and a corrupt
+        file is moved to the quarantine directory.
+
+        Args:
+            key: Cache key of the package
+
+        Returns:
+            Optional[str]: Path to the cached .vsix file, or None on a miss
+        """
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            sha256 = entry["sha256"]
+            if not self._is_intact(sha256):
+                if os.path.exists(self.object_path(sha256)):
+                    print(f"Cached package {key} is corrupted, quarantining it")
+                    self._quarantine(sha256)
+                # Every key sharing the file loses it
+                for other in [k for k, e in index.items() if e["sha256"] == sha256]:
+                    del index[other]
+                self._save_index(index)
+                return None
+            entry["last_used"] = time.time()
+            self._save_index(index)
+            return self.object_path(sha256)
+
+    def put(self, key: str, file_path: str, sha256: Optional[str] = None) -> str:
+        """
+        Move a downloaded package into the cache.
+
+        Args:
+            key: Cache key of the package
+            file_path: Path of the downloaded .vsix file, which is moved
+            sha256: Digest of the file if it is already known, e.g. computed
+                while downloading. Otherwise the file is hashed.
+
+        Returns:
+            str: Path to the cached .vsix file
+        """
+        if sha256 is None:
+            sha256 = hash_file(file_path)
+        path = self.object_path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            index = self._load_index()
+            os.replace(file_path, path)
+            self._write_sidecar(sha256)
+            index[key] = {
+                "sha256": sha256,
+                "size": os.path.getsize(path),
+                "last_used": time.time(),
+            }
+            self._evict(index, self.max_size, keep=key)
+            self._save_index(index)
+        return path
+
+    def stats(self) -> CacheStats:
+        """
+        Summarize the cache contents.
+
+        Returns:
+            CacheStats: Number of entries and the size of the stored packages
+        """
+        with self._lock:
+            index = self._load_index()
+        return CacheStats(self.root, len(index), _total_size(index), self.max_size)
+
+    def prune(self, max_size: Optional[int] = None) -> List[str]:
+        """
+        Evict least recently used entries until the cache fits a size.
+
+        Quarantined packages are deleted as well.
+
+        Args:
+            max_size: Size to shrink the cache to. Defaults to the cache's cap.
+
+        Returns:
+            List[str]: Keys of the evicted entries
+        """
+        with self._lock:
+            index = self._load_index()
+            evicted = self._evict(
+                index, self.max_size if max_size is None else max_size
+            )
+            self._save_index(index)
+            try:
+                quarantined = os.listdir(self.quarantine_dir)
+            except OSError:
+                quarantined = []
+            for name in quarantined:
+                try:
+                    os.remove(os.path.join(self.quarantine_dir, name))
+                except OSError:
+                    pass
+            return evicted
+
+    def _evict(
+        self, index: Dict[str, dict], max_size: int, keep: Optional[str] = None
+    ) -> List[str]:
+        evicted = []
+        by_age = sorted(index, key=lambda key: index[key]["last_used"])
+        for key in by_age:
+            if _total_size(index) <= max_size:
+                break
+            if key == keep:
+                continue
+            entry = index.pop(key)
+            self._remove_unreferenced(index, entry["sha256"])
+            evicted.append(key)
+        return evicted
+
+    def _remove_unreferenced(self, index: Dict[str, dict], sha256: str) -> None:
+        if any(entry["sha256"] == sha256 for entry in index.values()):
+            return
+        path = self.object_path(sha256)
+        for stale in (path, f"{path}.json"):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def _total_size(index: Dict[str, dict]) -> int:
+    # Keys sharing the same content only take up space once
+    return sum({entry["sha256"]: entry["size"] for entry in index.values()}.values())
+
+
+class MetadataCache:
+    """
+    On-disk cache of Marketplace metadata keyed by extension ID.
+
+    Besides the metadata of each extension, the ETag returned for each
+    extensionquery request is kept so that an identical query can later be
+    revalidated with If-None-Match instead of being answered in full.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        ttl: float = DEFAULT_METADATA_TTL,
+        offline: bool = False,
+    ):
+        self.root = root or get_cache_dir()
+        self.ttl = ttl
+        self.offline = offline
+        self.path = os.path.join(self.root, "metadata.json")
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data.setdefault("extensions", {})
+        data.setdefault("queries", {})
+        return data
+
+    def _save(self, data: dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, extension_ids: List[str]) -> Dict[str, dict]:
+        """
+        Get the cached metadata of extensions that is still fresh.
+
+        In offline mode entries are returned regardless of their age.
+
+        Args:
+            extension_ids: Extension IDs in format 'publisher.extension'
+
+        Returns:
+            Dict[str, dict]: Cached metadata keyed by the requested extension ID
+        """
+        with self._lock:
+            extensions = self._load()["extensions"]
+        now = time.time()
+        found = {}
+        for ext_id in extension_ids:
+            entry = extensions.get(ext_id.lower())
+            if entry is None:
+                continue
+            if self.offline or now - entry["fetched_at"] < self.ttl:
+                found[ext_id] = entry["metadata"]
+        return found
+
+    def get_etag(self, query_key: str) -> Optional[str]:
+        """
+        Get the ETag of a previous query whose results are all still cached.
+
+        Args:
+            query_key: Digest identifying the query
+
+        Returns:
+            Optional[str]: The ETag to send in If-None-Match, if any
+        """
+        with self._lock:
+            data = self._load()
+        query = data["queries"].get(query_key)
+        if query is None:
+            return None
+        if any(ext_id not in data["extensions"] for ext_id in query["extensions"]):
+            return None
+        return query["etag"]
+
+    def store(
+        self,
+        metadata: Dict[str, dict],
+        query_key: Optional[str] = None,
+        etag: Optional[str] = None,
+    ) -> None:
+        """
+        Cache the metadata returned by a query.
+
+        Args:
+            metadata: Metadata keyed by extension ID
+            query_key: Digest identifying the query that returned the metadata
+            etag: ETag of the query response
+        """
+        now = time.time()
+        with self._lock:
+            data = self._load()
+            for ext_id, entry in metadata.items():
+                data["extensions"][ext_id.lower()] = {
+                    "fetched_at": now,
+                    "metadata": entry,
+                }
+            if query_key is not None:
+                if etag:
+                    data["queries"][query_key] = {
+                        "etag": etag,
+                        "extensions": sorted(ext_id.lower() for ext_id in metadata),
+                    }
+                else:
+                    data["queries"].pop(query_key, None)
+            self._save(data)
+
+    def revalidate(self, query_key: str) -> Dict[str, dict]:
+        """
+        Mark the results of a query as fresh after the server confirmed them.
+
+        Args:
+            query_key: Digest identifying the query
+
+        Returns:
+            Dict[str, dict]: The cached metadata of the query, keyed by the
+                lowercase extension ID
+        """
+        now = time.time()
+        found = {}
+        with self._lock:
+            data = self._load()
+            query = data["queries"].get(query_key, {"extensions": []})
+            for ext_id in query["extensions"]:
+                entry = data["extensions"].get(ext_id)
+                if entry is not None:
+                    entry["fetched_at"] = now
+                    found[ext_id] = entry["metadata"]
+            self._save(data)
+        return found
+
+
+def _default_max_size() -> int:
+    env_size = os.environ.get(CACHE_MAX_SIZE_ENV)
+    return parse_size(env_size) if env_size else DEFAULT_MAX_SIZE
+
+
+def configure_cache(
+    root: Optional[str] = None, max_size: Optional[int] = None
+) -> VsixCache:
+    """
+    Replace the shared cache with one using the given settings.
+
+    Args:
+        root: Cache directory. Defaults to get_cache_dir().
+        max_size: Size cap in bytes. Defaults to $VSIX_TO_VSCODIUM_CACHE_MAX_SIZE
+            or 2 GiB.
+
+    Returns:
+        VsixCache: The new shared cache
+    """
+    global _cache
+    cache = VsixCache(root, _default_max_size() if max_size is None else max_size)
+    with _cache_lock:
+        _cache = cache
+    return cache
+
+
+def get_cache() -> VsixCache:
+    """
+    Get the shared cache, creating it with default settings if needed.
+
+    Returns:
+        VsixCache: The shared cache
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = VsixCache(max_size=_default_max_size())
+        return _cache
+
+
+def configure_metadata_cache(
+    root: Optional[str] = None,
+    ttl: float = DEFAULT_METADATA_TTL,
+    offline: bool = False,
+) -> MetadataCache:
+    """
+    Replace the shared metadata cache with one using the given settings.
+
+    Args:
+        root: Cache directory. Defaults to get_cache_dir().
+        ttl: Seconds before cached metadata is queried again
+        offline: Resolve metadata from the cache only, whatever its age
+
+    Returns:
+        MetadataCache: The new shared metadata cache
+    """
+    global _metadata_cache
+    metadata_cache = MetadataCache(root, ttl, offline)
+    with _cache_lock:
+        _metadata_cache = metadata_cache
+    return metadata_cache
+
+
+def get_metadata_cache() -> MetadataCache:
+    """
+    Get the shared metadata cache, creating it with default settings if needed.
+
+    Returns:
+        MetadataCache: The shared metadata cache
+    """
+    global _metadata_cache
+    with _cache_lock:
+        if _metadata_cache is None:
+            _metadata_cache = MetadataCache()
+        return _metadata_cache
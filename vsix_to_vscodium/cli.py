@@ -6,7 +6,64 @@ import requests
 import os
 import json
 import argparse
-from typing import Optional, List
+from concurrent.futures import Executor, ProcessPoolExecutor
+import cProfile
+import tempfile
+import time
+from typing import Callable, Dict, Optional, List, Set, Tuple
+
+from vsix_to_vscodium.api import (
+    DEFAULT_IDE,
+    download_extension,
+    make_installer,
+    resolve_target,
+    transfer_extensions,
+    transfer_packages,
+)
+from vsix_to_vscodium.bundle import BundleError, BundleReader, write_bundle
+from vsix_to_vscodium.cache import (
+    DEFAULT_METADATA_TTL,
+    configure_cache,
+    configure_metadata_cache,
+    format_size,
+    get_cache,
+    get_metadata_cache,
+    parse_size,
+)
+from vsix_to_vscodium.errors import VsixToVscodiumError
+from vsix_to_vscodium.installer import (
+    DEFAULT_INSTALL_BATCH_SIZE,
+    EXTRACT_ERRORS,
+    get_extensions_dir,
+)
+from vsix_to_vscodium.local import (
+    LocalExtension,
+    package_extension,
+    read_installed_extensions,
+)
+from vsix_to_vscodium.marketplace import resolve_extensions
+from vsix_to_vscodium.pipeline import (
+    DEFAULT_JOBS,
+    FanOutInstall,
+    InstallBatch,
+    run_pipeline,
+)
+from vsix_to_vscodium.report import (
+    OUTCOME_FAILED,
+    OUTCOME_INSTALLED,
+    OUTCOME_SKIPPED,
+    ExtensionRecord,
+    configure_report,
+    get_report,
+)
+from vsix_to_vscodium.scheduler import install_waves
+from vsix_to_vscodium.sync import SyncPlan, list_extension_versions, plan_sync
+from vsix_to_vscodium.throttle import configure_throttle
+from vsix_to_vscodium.transport import (
+    DEFAULT_POOL_SIZE,
+    DEFAULT_RETRIES,
+    configure_session,
+)
 
 
 def get_vscode_extensions() -> List[str]:
@@ -35,107 +92,414 @@ def get_vscode_extensions() -> List[str]:
         raise
 
 
-def download_extension(
-    extension_id: str, specific_version: Optional[str] = None, no_cache: bool = False
-) -> str:
+def install_extension(vsix_path: str, ide_name: str) -> None:
     """
-    Download a VS Code extension from the marketplace.
+    Install a .vsix extension in the specified IDE.
 
-    Args:
-        extension_id: The extension ID in format 'publisher.extension'
-        specific_version: Specific version to download. Defaults to None (latest).
-        no_cache: Force re-download even if file exists. Defaults to False.
+    The .vsix file is left in place so that it can be reused from the cache.
 
-    Returns:
-        str: Path to the downloaded .vsix file
+    Args:
+        vsix_path: Path to the .vsix file
+        ide_name: Name of the IDE executable (e.g., 'windsurf')
 
     Raises:
-        SystemExit: If the extension ID is invalid
-        requests.exceptions.RequestException: If there's an error downloading the extension
+        subprocess.CalledProcessError: If installation fails
     """
+    print(f"Installing extension using {ide_name}...")
+    subprocess.run([ide_name, "--install-extension", vsix_path], check=True)
+    print("Extension installed successfully!")
+
+
+def _size(value: str) -> int:
     try:
-        publisher, extension_name = extension_id.split(".", 1)
-    except ValueError:
-        print("Invalid extension ID format. Use 'publisher.extension'")
-        sys.exit(1)
+        return parse_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
-    # Query the marketplace API for extension metadata
-    api_url = "https://marketplace.visualstudio.com/_apis/public/gallery/extensionquery"
-    payload = {
-        "filters": [{"criteria": [{"filterType": 7, "value": extension_id}]}],
-        "flags": 914,
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json;api-version=3.0-preview.1",
-        "User-Agent": "VSCodium Extension Manager/1.0",
-    }
 
-    print(f"Querying Marketplace API for {extension_id}...")
-    response = requests.post(api_url, headers=headers, json=payload)
-    response.raise_for_status()
+def _non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative, got {value}")
+    return number
 
-    try:
-        extension_data = response.json()
-        if specific_version:
-            version = specific_version
-        else:
-            version = extension_data["results"][0]["extensions"][0]["versions"][0][
-                "version"
-            ]
-    except (KeyError, IndexError) as e:
-        print(f"Failed to get extension metadata: {e}")
-        sys.exit(1)
 
-    # Create extensions directory if it doesn't exist
-    os.makedirs("extensions", exist_ok=True)
-    file_path = f"./extensions/{extension_id}-{version}.vsix"
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
 
-    # Check if file already exists
-    if not no_cache and os.path.exists(file_path):
-        print(f"File {file_path} already exists.")
-        print("Use no_cache=True to force re-download.")
-        return file_path
+def cache_command(args: List[str]) -> None:
+    """
+    Entry point for the 'cache' subcommand.
 
-    # Download the extension
-    download_url = f"https://{publisher}.gallery.vsassets.io/_apis/public/gallery/publisher/{publisher}/extension/{extension_name}/{version}/assetbyname/Microsoft.VisualStudio.Services.VSIXPackage"
+    Args:
+        args: Command line arguments following 'cache'
+    """
+    parser = argparse.ArgumentParser(
+        prog="vsix-to-vscodium cache",
+        description="Inspect and prune the cache of downloaded extensions",
+    )
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    subparsers.add_parser("stats", help="Show the size of the cache")
+    prune_parser = subparsers.add_parser(
+        "prune", help="Evict least recently used extensions"
+    )
+    prune_parser.add_argument(
+        "--max-size",
+        type=_size,
+        help="Size to shrink the cache to, e.g. 500M (default: the cache size cap)",
+    )
+    args = parser.parse_args(args)
 
-    print(f"Downloading version {version}...")
-    download_response = requests.get(download_url)
-    download_response.raise_for_status()
+    cache = get_cache()
+    if args.action == "stats":
+        stats = cache.stats()
+        print(f"Cache directory: {stats.root}")
+        print(f"Cached extensions: {stats.entries}")
+        print(f"Size: {format_size(stats.total_size)} of {format_size(stats.max_size)}")
+    else:
+        evicted = cache.prune(args.max_size)
+        for key in evicted:
+            print(f"Evicted {key}")
+        print(f"Evicted {len(evicted)} extensions from the cache")
 
-    with open(file_path, "wb") as f:
-        f.write(download_response.content)
 
-    print("=" * 50)
-    print(f"Successfully downloaded to: {file_path}")
-    print("=" * 50)
+def _read_extension_list(file_path: str) -> List[str]:
+    # One extension ID per line, as printed by 'code --list-extensions'
+    with open(file_path, encoding="utf-8") as f:
+        lines = (line.split("#", 1)[0].strip() for line in f)
+        return [line for line in lines if line]
 
-    return file_path
 
+def _add_installer_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--ide",
+        dest="ides",
+        action="append",
+        metavar="IDE",
+        help="Name of the VSCodium-based IDE executable, repeat to install into "
+        f"several IDEs (default: {DEFAULT_IDE})",
+    )
+    parser.add_argument(
+        "--install-batch-size",
+        type=_positive_int,
+        default=DEFAULT_INSTALL_BATCH_SIZE,
+        help=f"Number of extensions installed by a single IDE process (default: {DEFAULT_INSTALL_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--installer",
+        choices=["cli", "extract"],
+        default="cli",
+        help="Install through the IDE's command line (cli), or by extracting packages "
+        "straight into the IDE's extensions directory without launching it (extract) "
+        "(default: cli)",
+    )
+    parser.add_argument(
+        "--extensions-dir",
+        help="Extensions directory of the IDE for --installer extract "
+        "(default: the known directory of --ide, e.g. ~/.vscode-oss/extensions)",
+    )
 
-def install_extension(vsix_path: str, ide_name: str) -> None:
+
+def _check_installer_arguments(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> None:
+    args.ides = list(dict.fromkeys(args.ides or [DEFAULT_IDE]))
+    if args.installer != "extract":
+        return
+    if args.extensions_dir:
+        if len(args.ides) > 1:
+            parser.error("--extensions-dir can only be used with a single --ide")
+        return
+    for ide_name in args.ides:
+        try:
+            get_extensions_dir(ide_name)
+        except ValueError as e:
+            parser.error(str(e))
+
+
+def _export_bundle(args: argparse.Namespace) -> None:
+    if args.extension_ids:
+        extensions = args.extension_ids
+    elif args.from_file:
+        extensions = _read_extension_list(args.from_file)
+    else:
+        extensions = get_vscode_extensions()
+    print(f"Querying Marketplace API for {len(extensions)} extensions...")
+    resolved, unresolved = resolve_extensions(
+        extensions, metadata_cache=get_metadata_cache()
+    )
+    for ext_id in unresolved:
+        print(f"Could not find {ext_id} in the Marketplace, skipping it")
+    results = run_pipeline(
+        list(resolved),
+        lambda ext_id: download_extension(ext_id, metadata=resolved[ext_id]),
+        # Nothing to install, the downloads only need to be collected
+        lambda vsix_paths: {vsix_path: None for vsix_path in vsix_paths},
+        jobs=args.jobs,
+    )
+    vsix_paths = [result.vsix_path for result in results if result.ok]
+    entries = write_bundle(args.bundle, vsix_paths)
+    total_size = sum(entry.size for entry in entries)
+    print(f"\nBundled {len(entries)} extensions ({format_size(total_size)}) into {args.bundle}")
+    if len(vsix_paths) < len(resolved):
+        print(f"Failed to bundle {len(resolved) - len(vsix_paths)} extensions")
+        sys.exit(1)
+
+
+def _import_bundle(args: argparse.Namespace) -> None:
+    failed = []
+    with BundleReader(args.bundle) as reader, tempfile.TemporaryDirectory(
+        prefix="vsix-to-vscodium-"
+    ) as output_dir, _install_targets(args) as install:
+        print(f"Installing {len(reader.entries)} extensions from {args.bundle}")
+        by_id = {entry.extension_id: entry for entry in reader.entries}
+        waves = install_waves(
+            {entry.extension_id: entry.dependencies for entry in reader.entries}
+        )
+        # Batches never mix an extension with the ones it depends on
+        batches = [
+            wave[start : start + args.install_batch_size]
+            for wave in waves
+            for start in range(0, len(wave), args.install_batch_size)
+        ]
+        for batch in batches:
+            paths = {}
+            for entry in (by_id[ext_id] for ext_id in batch):
+                try:
+                    paths[reader.copy_to(entry, output_dir)] = entry.extension_id
+                except BundleError as e:
+                    print(f"Failed to read {entry.extension_id}: {e}")
+                    failed.append(entry.extension_id)
+            if not paths:
+                continue
+            # Every target is done with the copies once the batch returns
+            for vsix_path, error in install(list(paths)).items():
+                if error is not None:
+                    for ide_name, target_error in install.results[vsix_path].items():
+                        if target_error is not None:
+                            print(
+                                f"Failed to install {paths[vsix_path]} "
+                                f"in {ide_name}: {target_error}"
+                            )
+                    failed.append(paths[vsix_path])
+                os.remove(vsix_path)
+    if failed:
+        print(f"\nFailed to import {len(failed)} extensions: {', '.join(failed)}")
+        sys.exit(1)
+    print("\nFinished importing all extensions")
+
+
+def bundle_command(args: List[str]) -> None:
     """
-    Install a .vsix extension in the specified IDE.
+    Entry point for the 'bundle' subcommand.
 
     Args:
-        vsix_path: Path to the .vsix file
-        ide_name: Name of the IDE executable (e.g., 'windsurf')
-
-    Raises:
-        subprocess.CalledProcessError: If installation fails
+        args: Command line arguments following 'bundle'
     """
-    try:
-        print(f"Installing extension using {ide_name}...")
-        subprocess.run([ide_name, "--install-extension", vsix_path], check=True)
-        print("Extension installed successfully!")
-    finally:
-        # Clean up the .vsix file regardless of installation success
+    parser = argparse.ArgumentParser(
+        prog="vsix-to-vscodium bundle",
+        description="Package extensions into a single file that installs without network access",
+    )
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    export_parser = subparsers.add_parser(
+        "export", help="Download extensions into a bundle"
+    )
+    export_parser.add_argument("bundle", help="Path of the bundle to write")
+    export_parser.add_argument(
+        "extension_ids",
+        nargs="*",
+        help="Extension IDs to bundle (default: the extensions installed in VS Code)",
+    )
+    export_parser.add_argument(
+        "--from-file",
+        help="File listing one extension ID per line, e.g. the output of 'code --list-extensions'",
+    )
+    export_parser.add_argument(
+        "--jobs",
+        type=_positive_int,
+        default=DEFAULT_JOBS,
+        help=f"Number of extensions to download in parallel (default: {DEFAULT_JOBS})",
+    )
+    import_parser = subparsers.add_parser(
+        "import", help="Install the extensions of a bundle"
+    )
+    import_parser.add_argument("bundle", help="Path of the bundle to install")
+    _add_installer_arguments(import_parser)
+    parsed = parser.parse_args(args)
+
+    if parsed.action == "export":
+        configure_session()
+        configure_throttle()
+        configure_metadata_cache()
         try:
-            os.remove(vsix_path)
-            print(f"Cleaned up {vsix_path}")
-        except OSError as e:
-            print(f"Warning: Could not remove {vsix_path}: {e}")
+            _export_bundle(parsed)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            sys.exit(1)
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to query extension metadata: {e}")
+            sys.exit(1)
+    else:
+        _check_installer_arguments(import_parser, parsed)
+        try:
+            _import_bundle(parsed)
+        except (BundleError, OSError) as e:
+            print(f"Failed to import bundle: {e}")
+            sys.exit(1)
+
+
+def _install_batch(args: argparse.Namespace, ide_name: str) -> InstallBatch:
+    return make_installer(ide_name, args.installer, args.extensions_dir)
+
+
+def _install_one(args: argparse.Namespace, ide_name: str) -> InstallBatch:
+    # Installs a single extension, with the IDE's own progress messages
+    if args.installer == "extract":
+        return _install_batch(args, ide_name)
+
+    def install(vsix_paths: List[str]) -> Dict[str, Optional[BaseException]]:
+        errors: Dict[str, Optional[BaseException]] = {}
+        for vsix_path in vsix_paths:
+            try:
+                install_extension(vsix_path, ide_name)
+                errors[vsix_path] = None
+            except subprocess.CalledProcessError as e:
+                errors[vsix_path] = e
+        return errors
+
+    return install
+
+
+def _install_targets(args: argparse.Namespace) -> FanOutInstall:
+    return FanOutInstall({ide_name: _install_batch(args, ide_name) for ide_name in args.ides})
+
+
+def _report_plan(plan: SyncPlan, ide_name: str) -> None:
+    print(
+        f"{len(plan.missing)} extensions missing, {len(plan.outdated)} outdated "
+        f"and {len(plan.up_to_date)} up to date in {ide_name}"
+    )
+    if not plan.to_transfer:
+        print("Nothing to do")
+
+
+def _plan_targets(
+    source_versions: Dict[str, str], args: argparse.Namespace
+) -> Tuple[List[str], Optional[Dict[str, Set[str]]]]:
+    # Extensions to transfer into any target, and those each target needs
+    plans = {}
+    for ide_name in args.ides:
+        plans[ide_name] = plan_sync(source_versions, list_extension_versions(ide_name))
+        _report_plan(plans[ide_name], ide_name)
+    to_transfer = list(
+        dict.fromkeys(ext_id for plan in plans.values() for ext_id in plan.to_transfer)
+    )
+    if len(plans) == 1:
+        return to_transfer, None
+    return to_transfer, {
+        ide_name: set(plan.to_transfer) for ide_name, plan in plans.items()
+    }
+
+
+def _report_results(args: argparse.Namespace, records: List[ExtensionRecord]) -> List[str]:
+    # Prints the outcome of a transfer and returns the extensions that failed
+    if len(args.ides) > 1:
+        print()
+        transferred = [record for record in records if record.targets]
+        for ide_name in args.ides:
+            outcomes = [record.targets[ide_name] for record in transferred]
+            failed = [
+                record.extension_id
+                for record in transferred
+                if record.targets[ide_name] == OUTCOME_FAILED
+            ]
+            print(
+                f"{ide_name}: {outcomes.count(OUTCOME_INSTALLED)} installed, "
+                f"{outcomes.count(OUTCOME_SKIPPED)} up to date, {len(failed)} failed"
+                + (f" ({', '.join(failed)})" if failed else "")
+            )
+    failed = [record.extension_id for record in records if record.outcome == OUTCOME_FAILED]
+    if failed:
+        print(f"\nFailed to transfer {len(failed)} extensions: {', '.join(failed)}")
+    print("\nFinished processing all extensions")
+    return failed
+
+
+def _transfer(
+    extension_ids: List[str],
+    download: Callable[[str], str],
+    args: argparse.Namespace,
+    needed: Optional[Dict[str, Set[str]]] = None,
+) -> List[str]:
+    records = transfer_packages(
+        extension_ids,
+        download,
+        {ide_name: _install_batch(args, ide_name) for ide_name in args.ides},
+        jobs=args.jobs,
+        batch_size=args.install_batch_size,
+        needed=needed,
+    )
+    return _report_results(args, records)
+
+
+def _transfer_from_marketplace(
+    extension_ids: List[str],
+    args: argparse.Namespace,
+    versions: Optional[Dict[str, str]] = None,
+    needed: Optional[Dict[str, Set[str]]] = None,
+) -> List[str]:
+    records = transfer_extensions(
+        extension_ids,
+        args.ides,
+        jobs=args.jobs,
+        install_batch_size=args.install_batch_size,
+        installer=args.installer,
+        extensions_dir=args.extensions_dir,
+        versions=versions,
+        needed=needed,
+        engine_version=args.engine_version,
+        target_platform=args.target_platform,
+    )
+    return _report_results(args, records)
+
+
+def _read_local_extensions(args: argparse.Namespace) -> Dict[str, LocalExtension]:
+    extensions = read_installed_extensions(args.source_extensions_dir)
+    print(f"Found {len(extensions)} extensions installed in {args.source_extensions_dir}")
+    local = {}
+    for extension in extensions:
+        if extension.enabled or args.include_disabled:
+            local[extension.extension_id] = extension
+        else:
+            print(f"Skipping disabled extension {extension.extension_id}")
+    return local
+
+
+def _package_local(
+    executor: Executor, extension: LocalExtension, output_dir: str
+) -> str:
+    print(f"Packaging {extension.extension_id} {extension.version} from {extension.path}...")
+    return executor.submit(package_extension, extension, output_dir).result()
+
+
+def _transfer_local(
+    extensions: Dict[str, LocalExtension],
+    extension_ids: List[str],
+    args: argparse.Namespace,
+    needed: Optional[Dict[str, Set[str]]] = None,
+) -> List[str]:
+    # The packages only live until they are installed into every target
+    with tempfile.TemporaryDirectory(prefix="vsix-to-vscodium-") as output_dir:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            return _transfer(
+                extension_ids,
+                lambda ext_id: _package_local(executor, extensions[ext_id], output_dir),
+                args,
+                needed,
+            )
 
 
 def main(args: Optional[list[str]] = None) -> None:
@@ -146,58 +510,259 @@ def main(args: Optional[list[str]] = None) -> None:
         args: Command line arguments (defaults to sys.argv[1:])
     """
     parser = argparse.ArgumentParser(
-        description="Download and install VS Code extensions in VSCodium-based IDEs"
+        description="Download and install VS Code extensions in VSCodium-based IDEs",
+        epilog="Run 'vsix-to-vscodium cache --help' to manage the download cache, "
+        "or 'vsix-to-vscodium bundle --help' to install extensions without network access.",
     )
     parser.add_argument(
         "--ide",
-        default="codium",
-        help="Name of the VSCodium-based IDE executable (default: codium)",
+        dest="ides",
+        action="append",
+        metavar="IDE",
+        help="Name of the VSCodium-based IDE executable, repeat to install into "
+        f"several IDEs (default: {DEFAULT_IDE})",
     )
     parser.add_argument(
         "--transfer-all",
         action="store_true",
         help="Transfer all extensions from VS Code installation",
     )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Transfer only the VS Code extensions that are missing or outdated in the IDE",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=_positive_int,
+        default=DEFAULT_JOBS,
+        help=f"Number of extensions to download in parallel with --transfer-all or --sync (default: {DEFAULT_JOBS})",
+    )
+    parser.add_argument(
+        "--install-batch-size",
+        type=_positive_int,
+        default=DEFAULT_INSTALL_BATCH_SIZE,
+        help=f"Number of extensions installed by a single IDE process with --transfer-all or --sync (default: {DEFAULT_INSTALL_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--from-local",
+        action="store_true",
+        help="Repackage the extensions installed in VS Code instead of downloading them",
+    )
+    parser.add_argument(
+        "--source-extensions-dir",
+        help="Extensions directory of VS Code for --from-local "
+        "(default: ~/.vscode/extensions)",
+    )
+    parser.add_argument(
+        "--include-disabled",
+        action="store_true",
+        help="Also transfer extensions that are disabled in VS Code with --from-local",
+    )
+    parser.add_argument(
+        "--installer",
+        choices=["cli", "extract"],
+        default="cli",
+        help="Install through the IDE's command line (cli), or by extracting packages "
+        "straight into the IDE's extensions directory without launching it (extract) "
+        "(default: cli)",
+    )
+    parser.add_argument(
+        "--extensions-dir",
+        help="Extensions directory of the IDE for --installer extract "
+        "(default: the known directory of --ide, e.g. ~/.vscode-oss/extensions)",
+    )
+    parser.add_argument(
+        "--pool-size",
+        type=_positive_int,
+        default=DEFAULT_POOL_SIZE,
+        help="Number of HTTP connections kept alive per host, and the most requests "
+        "sent to a host at once while adapting to its throttling "
+        f"(default: {DEFAULT_POOL_SIZE})",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f"Number of times a throttled or failed request is retried (default: {DEFAULT_RETRIES})",
+    )
+    parser.add_argument(
+        "--cache-max-size",
+        type=_size,
+        help="Size cap of the extension cache, e.g. 2G (default: 2G)",
+    )
+    parser.add_argument(
+        "--metadata-ttl",
+        type=_non_negative_int,
+        default=DEFAULT_METADATA_TTL,
+        help=f"Seconds before cached Marketplace metadata is checked again (default: {DEFAULT_METADATA_TTL})",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Use only cached metadata and extensions, without any network access",
+    )
+    parser.add_argument(
+        "--engine-version",
+        metavar="VERSION",
+        help="VS Code version the target IDE is built on, e.g. 1.85.2 "
+        "(default: detected from the IDE)",
+    )
+    parser.add_argument(
+        "--target-platform",
+        metavar="PLATFORM",
+        help="Platform to download packages for, e.g. linux-x64 (default: this machine's)",
+    )
+    parser.add_argument(
+        "--report",
+        metavar="PATH",
+        help="Write timings, traffic and the outcome of every extension to PATH, "
+        "as JSON lines if it ends in .jsonl and as a single JSON document otherwise",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="Profile the run with cProfile and write the stats to PATH, "
+        "for use with 'python -m pstats'",
+    )
     parser.add_argument(
         "extension_id",
         nargs="?",
         help="Extension ID in format publisher.extension-name",
     )
 
+    if args is None:
+        args = sys.argv[1:]
+    if args and args[0] == "cache":
+        configure_cache()
+        cache_command(args[1:])
+        return
+    if args and args[0] == "bundle":
+        configure_cache()
+        bundle_command(args[1:])
+        return
+
+    command = list(args)
     args = parser.parse_args(args)
-
-    if args.transfer_all:
+    _check_installer_arguments(parser, args)
+    if args.from_local and not args.source_extensions_dir:
+        args.source_extensions_dir = get_extensions_dir("code")
+    session = configure_session(
+        pool_size=args.pool_size, retries=args.retries, offline=args.offline
+    )
+    throttle = configure_throttle(max_limit=args.pool_size)
+    configure_cache(max_size=args.cache_max_size)
+    configure_metadata_cache(ttl=args.metadata_ttl, offline=args.offline)
+    report = configure_report(command)
+    session.hooks["response"].append(report.on_response)
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        _run(parser, args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Wrote profile to {args.profile}")
+        if args.report:
+            report.hosts = throttle.snapshot()
+            report.write(args.report)
+            print(f"Wrote run report to {args.report}")
+
+
+def _run(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    report = get_report()
+    if args.from_local:
         try:
-            extensions = get_vscode_extensions()
+            with report.phase("list_extensions"):
+                local = _read_local_extensions(args)
+        except FileNotFoundError as e:
+            print(e)
+            sys.exit(1)
+        if args.transfer_all:
+            _transfer_local(local, list(local), args)
+        elif args.sync:
+            try:
+                with report.phase("list_extensions"):
+                    to_transfer, needed = _plan_targets(
+                        {ext_id: extension.version for ext_id, extension in local.items()},
+                        args,
+                    )
+            except (subprocess.CalledProcessError, FileNotFoundError):
+                sys.exit(1)
+            if not to_transfer:
+                return
+            _transfer_local(local, to_transfer, args, needed)
+        elif args.extension_id:
+            matches = [
+                ext_id for ext_id in local if ext_id.lower() == args.extension_id.lower()
+            ]
+            if not matches:
+                print(f"{args.extension_id} is not installed in {args.source_extensions_dir}")
+                sys.exit(1)
+            if _transfer_local(local, matches, args):
+                sys.exit(1)
+        else:
+            parser.print_help()
+            print("\nPlease provide an extension ID or use --transfer-all or --sync")
+            sys.exit(1)
+    elif args.transfer_all:
+        try:
+            with report.phase("list_extensions"):
+                extensions = get_vscode_extensions()
             print(f"Found {len(extensions)} extensions installed in VS Code")
-            for ext_id in extensions:
-                try:
-                    print(f"\nProcessing {ext_id}...")
-                    vsix_path = download_extension(ext_id)
-                    install_extension(vsix_path, args.ide)
-                except (
-                    requests.exceptions.RequestException,
-                    subprocess.CalledProcessError,
-                ) as e:
-                    print(f"Failed to process {ext_id}: {e}")
-                    print("Continuing with next extension...")
-            print("\nFinished processing all extensions")
+            _transfer_from_marketplace(extensions, args)
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            sys.exit(1)
+    elif args.sync:
+        try:
+            with report.phase("list_extensions"):
+                source_versions = list_extension_versions("code")
+                to_transfer, needed = _plan_targets(source_versions, args)
+            if not to_transfer:
+                return
+            _transfer_from_marketplace(to_transfer, args, source_versions, needed)
         except (subprocess.CalledProcessError, FileNotFoundError):
             sys.exit(1)
     else:
         if not args.extension_id:
             parser.print_help()
-            print("\nPlease provide an extension ID or use --transfer-all")
+            print("\nPlease provide an extension ID or use --transfer-all or --sync")
             sys.exit(1)
 
         try:
-            vsix_path = download_extension(args.extension_id)
-            install_extension(vsix_path, args.ide)
-        except requests.exceptions.RequestException as e:
+            target = resolve_target(args.ides, args.engine_version, args.target_platform)
+            vsix_path = download_extension(args.extension_id, target=target)
+            start = time.perf_counter()
+            installs = {ide_name: _install_one(args, ide_name) for ide_name in args.ides}
+            with report.phase("install"), FanOutInstall(installs) as install:
+                error = install([vsix_path])[vsix_path]
+            errors = install.results[vsix_path]
+            report.record(
+                args.extension_id,
+                outcome=OUTCOME_INSTALLED if error is None else OUTCOME_FAILED,
+                error=None if error is None else str(error),
+                install_time=time.perf_counter() - start,
+                install_batch_size=1,
+                targets={
+                    ide_name: OUTCOME_INSTALLED if e is None else OUTCOME_FAILED
+                    for ide_name, e in errors.items()
+                },
+            )
+            if error is not None:
+                for ide_name, e in errors.items():
+                    if e is not None:
+                        print(f"Failed to install extension in {ide_name}: {e}")
+                sys.exit(1)
+        except (VsixToVscodiumError, requests.exceptions.RequestException) as e:
             print(f"Failed to download extension: {e}")
+            report.record(args.extension_id, outcome=OUTCOME_FAILED, error=str(e))
             sys.exit(1)
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, *EXTRACT_ERRORS) as e:
             print(f"Failed to install extension: {e}")
+            report.record(args.extension_id, outcome=OUTCOME_FAILED, error=str(e))
             sys.exit(1)
 
 
@@ -0,0 +1,168 @@
+"""Which extension versions a target IDE can install.
+
+Every published version declares the VS Code engine it needs in its
+`engines.vscode` constraint, and platform-specific versions name the platform
+they were built for. Picking a version the target IDE accepts before
+downloading avoids fetching packages that the IDE would reject.
+"""
+
+from dataclasses import dataclass
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+from typing import Optional, Tuple
+
+# Matches the leading 'major.minor.patch' of an engine constraint such as
+# '^1.80.0', '>=1.60.0' or '1.x.x'
+_CONSTRAINT_PATTERN = re.compile(r"^(\^|>=)?\s*(\d+|x)\.(\d+|x)\.(\d+|x)")
+_VERSION_PATTERN = re.compile(r"^(\d+)\.(\d+)\.(\d+)")
+# Values of os/machine mapped to the platforms packages are published for
+_PLATFORMS = {
+    ("linux", "x86_64"): "linux-x64",
+    ("linux", "aarch64"): "linux-arm64",
+    ("linux", "armv7l"): "linux-armhf",
+    ("darwin", "x86_64"): "darwin-x64",
+    ("darwin", "arm64"): "darwin-arm64",
+    ("win32", "amd64"): "win32-x64",
+    ("win32", "arm64"): "win32-arm64",
+}
+
+
+@dataclass(frozen=True)
+class IdeTarget:
+    """Engine version and platform of the IDE extensions are installed into."""
+
+    # VS Code version the IDE is built on, None if unknown
+    engine_version: Optional[str] = None
+    # Platform such as 'linux-x64', None if unknown
+    platform: Optional[str] = None
+
+    def __str__(self) -> str:
+        engine = f"engine {self.engine_version}" if self.engine_version else "unknown engine"
+        return f"{engine}, {self.platform or 'unknown platform'}"
+
+
+def current_platform() -> Optional[str]:
+    """
+    Get the platform of this machine as named by the Marketplace.
+
+    Returns:
+        Optional[str]: A platform such as 'linux-x64', or None if packages are
+            not published for it
+    """
+    system = "linux" if sys.platform.startswith("linux") else sys.platform
+    return _PLATFORMS.get((system, platform.machine().lower()))
+
+
+def _parse_version(version: str) -> Optional[Tuple[int, int, int]]:
+    match = _VERSION_PATTERN.match(version.strip())
+    if match is None:
+        return None
+    return tuple(int(part) for part in match.groups())
+
+
+def _read_product_version(ide_path: str) -> Optional[str]:
+    # The IDE's own package.json holds the VS Code version it is built on,
+    # one level above the directory of its command line launcher
+    install_dir = os.path.dirname(os.path.dirname(os.path.realpath(ide_path)))
+    for package_json in (
+        os.path.join(install_dir, "package.json"),
+        os.path.join(install_dir, "resources", "app", "package.json"),
+    ):
+        try:
+            with open(package_json, encoding="utf-8") as f:
+                version = json.load(f).get("version")
+        except (OSError, ValueError, AttributeError):
+            continue
+        if isinstance(version, str) and _parse_version(version):
+            return version
+    return None
+
+
+def get_engine_version(ide_name: str) -> Optional[str]:
+    """
+    Get the VS Code version an IDE is built on.
+
+    The version is read from the package.json of the IDE's installation, and
+    otherwise from the first line of `<ide> --version`, which is the VS Code
+    version for VSCodium.
+
+    Args:
+        ide_name: Name of the IDE executable (e.g., 'windsurf')
+
+    Returns:
+        Optional[str]: The engine version, or None if it cannot be determined
+    """
+    ide_path = shutil.which(ide_name)
+    if ide_path is not None:
+        version = _read_product_version(ide_path)
+        if version is not None:
+            return version
+    try:
+        result = subprocess.run(
+            [ide_name, "--version"], check=True, capture_output=True, text=True
+        )
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    first_line = (result.stdout or "").strip().split("\n")[0]
+    return first_line.strip() if _parse_version(first_line) else None
+
+
+def get_ide_target(
+    ide_name: str,
+    engine_version: Optional[str] = None,
+    target_platform: Optional[str] = None,
+) -> IdeTarget:
+    """
+    Determine the engine version and platform of an IDE.
+
+    Args:
+        ide_name: Name of the IDE executable (e.g., 'windsurf')
+        engine_version: Engine version to use instead of detecting it
+        target_platform: Platform to use instead of this machine's
+
+    Returns:
+        IdeTarget: The engine version and platform of the IDE
+    """
+    return IdeTarget(
+        engine_version=engine_version or get_engine_version(ide_name),
+        platform=target_platform or current_platform(),
+    )
+
+
+def engine_satisfies(constraint: Optional[str], engine_version: str) -> bool:
+    """
+    Check whether an engine version meets an `engines.vscode` constraint.
+
+    Follows the rules VS Code applies when installing an extension: '>=1.60.0'
+    accepts any later version, while '^1.80.0' and '1.80.0' also require the
+    same major version (and the same minor version below 1.0). An 'x' matches
+    any number. Constraints that cannot be parsed are accepted and left to
+    the IDE to judge.
+
+    Args:
+        constraint: The constraint, e.g. '^1.80.0'. None or '*' accepts any version.
+        engine_version: The engine version of the IDE, e.g. '1.85.2'
+
+    Returns:
+        bool: Whether the IDE accepts the constraint
+    """
+    engine = _parse_version(engine_version)
+    match = _CONSTRAINT_PATTERN.match((constraint or "*").strip())
+    if engine is None or match is None:
+        return True
+    prefix, *parts = match.groups()
+    required = [None if part == "x" else int(part) for part in parts]
+    minimum = tuple(part or 0 for part in required)
+    if prefix == ">=":
+        return engine >= minimum
+    major, minor, _ = required
+    if major is not None and major != engine[0]:
+        return False
+    if major == 0 and minor is not None and minor != engine[1]:
+        return False
+    return engine >= minimum
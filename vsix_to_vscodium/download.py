@@ -0,0 +1,278 @@
+"""Streaming, resumable downloads of extension packages."""
+
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import re
+from typing import Callable, Optional, Tuple
+
+import requests
+
+from vsix_to_vscodium.throttle import THROTTLE_STATUSES, get_throttle
+from vsix_to_vscodium.transport import get_session
+
+# Size of the chunks read from the response and written to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Number of times a download that breaks off is resumed within the same run
+DEFAULT_DOWNLOAD_ATTEMPTS = 3
+# Bytes written between two updates of the partial download's state file
+PROGRESS_INTERVAL = 8 * 1024 * 1024
+# Errors after which the partial download is kept so that it can be resumed
+RESUMABLE_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+)
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+@dataclass(frozen=True)
+class DownloadResult:
+    """A completed download."""
+
+    size: int
+    # SHA-256 hex digest of the downloaded file
+    sha256: str
+
+
+class CorruptDownloadError(requests.exceptions.RequestException):
+    """The server keeps sending a file that fails verification."""
+
+
+def _read_state(state_path: str) -> dict:
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def _write_state(state_path: str, state: dict) -> None:
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def _remove(*paths: str) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _content_range(response: requests.Response) -> Optional[Tuple[int, Optional[int]]]:
+    # Start offset and total size of a 206 response
+    match = _CONTENT_RANGE.fullmatch(response.headers.get("Content-Range", "").strip())
+    if match is None:
+        return None
+    total = match.group(3)
+    return int(match.group(1)), None if total == "*" else int(total)
+
+
+def _resume_offset(part_path: str, state: dict, url: str) -> int:
+    # Bytes of a previous attempt that can be kept, or 0 to start over
+    if state.get("url") != url or not os.path.exists(part_path):
+        return 0
+    received = state.get("received")
+    if not isinstance(received, int) or received <= 0:
+        return 0
+    # Bytes written after the last state update may not have reached the disk
+    return min(received, os.path.getsize(part_path))
+
+
+def _hash_prefix(part_path: str, length: int) -> "hashlib._Hash":
+    # Digest of the bytes kept from a previous attempt
+    digest = hashlib.sha256()
+    with open(part_path, "rb") as f:
+        while length > 0:
+            chunk = f.read(min(DOWNLOAD_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            digest.update(chunk)
+            length -= len(chunk)
+    return digest
+
+
+def _fetch(
+    url: str, part_path: str, state_path: str, chunk_size: int
+) -> Optional[DownloadResult]:
+    # The host's request slot is held until the whole body has been read
+    with get_throttle().slot(url):
+        return _fetch_body(url, part_path, state_path, chunk_size)
+
+
+def _fetch_body(
+    url: str, part_path: str, state_path: str, chunk_size: int
+) -> Optional[DownloadResult]:
+    # None if the partial download had to be discarded before completing
+    state = _read_state(state_path)
+    offset = _resume_offset(part_path, state, url)
+    # Byte offsets only line up if the body is not re-encoded on the way
+    headers = {"Accept-Encoding": "identity"}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        # Only resume if the package has not changed since the first attempt
+        validator = state.get("etag") or state.get("last_modified")
+        if validator:
+            headers["If-Range"] = validator
+
+    response = get_session().get(url, stream=True, headers=headers)
+    try:
+        if offset and response.status_code == 416:
+            if offset == state.get("size"):
+                print(f"Download of {url} was already complete")
+                return DownloadResult(offset, _hash_prefix(part_path, offset).hexdigest())
+            # The partial download does not fit the package anymore
+            _remove(part_path, state_path)
+            return None
+        response.raise_for_status()
+
+        etag = response.headers.get("ETag")
+        resumed = response.status_code == 206
+        if resumed:
+            content_range = _content_range(response)
+            if (
+                content_range is None
+                or content_range[0] != offset
+                or (etag and state.get("etag") and etag != state["etag"])
+            ):
+                # Unusable range, start over with a plain request
+                _remove(part_path, state_path)
+                return None
+            size = content_range[1] or state.get("size")
+            print(f"Resuming download at {offset} bytes...")
+        else:
+            # The server ignored the range or the package changed
+            offset = 0
+            length = response.headers.get("Content-Length")
+            size = int(length) if length and length.isdigit() else None
+
+        state = {
+            "url": url,
+            "size": size,
+            "etag": etag,
+            "last_modified": response.headers.get("Last-Modified"),
+            "received": offset,
+        }
+        _write_state(state_path, state)
+        received = offset
+        reported = offset
+        # The digest is computed as the bytes arrive, so the file is never read back
+        digest = _hash_prefix(part_path, offset) if resumed else hashlib.sha256()
+        with open(part_path, "r+b" if resumed else "wb") as f:
+            f.seek(offset)
+            f.truncate()
+            try:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    received += len(chunk)
+                    if received - reported >= PROGRESS_INTERVAL:
+                        f.flush()
+                        state["received"] = reported = received
+                        _write_state(state_path, state)
+            finally:
+                f.flush()
+                os.fsync(f.fileno())
+                state["received"] = received
+                _write_state(state_path, state)
+        if size is not None and received != size:
+            raise requests.exceptions.ChunkedEncodingError(
+                f"Download of {url} ended after {received} of {size} bytes"
+            )
+        return DownloadResult(received, digest.hexdigest())
+    finally:
+        response.close()
+
+
+def download_to_file(
+    url: str,
+    file_path: str,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    attempts: int = DEFAULT_DOWNLOAD_ATTEMPTS,
+    verify: Optional[Callable[[str], None]] = None,
+) -> DownloadResult:
+    """
+    Stream a download to disk, resuming it if it was interrupted before.
+
+    The body is written in chunks to '<file_path>.part' next to the target and
+    only renamed to `file_path` once it is complete, so an interrupted download
+    never leaves a truncated file under the final name. The expected size,
+    ETag and number of bytes received are kept in '<file_path>.part.json', so
+    a download that breaks off, in this run or a previous one, continues with
+    a Range request for the remaining bytes. If the server ignores the range
+    or the package changed in the meantime, it is downloaded from the start.
+
+    The SHA-256 digest is computed while the body streams in. A completed
+    download that `verify` rejects is discarded and downloaded once more.
+
+    Args:
+        url: URL to download
+        file_path: Final path of the downloaded file
+        chunk_size: Number of bytes read and written at a time
+        attempts: Number of times the download is resumed after a connection
+            error or the host throttling it before giving up
+        verify: Called with the path of the completed download before it is
+            renamed, raises ValueError if the file is corrupt
+
+    Returns:
+        DownloadResult: Size and digest of the downloaded file
+
+    Raises:
+        CorruptDownloadError: If the file fails verification twice
+        requests.exceptions.RequestException: If the download fails
+    """
+    part_path = f"{file_path}.part"
+    state_path = f"{part_path}.json"
+    attempt = 0
+    # A restart after an unusable partial download does not count as an attempt
+    restarts = 0
+    corrupt = 0
+    while True:
+        try:
+            result = _fetch(url, part_path, state_path, chunk_size)
+        except RESUMABLE_ERRORS:
+            attempt += 1
+            if attempt >= attempts:
+                # Keep the partial download for the next run
+                raise
+            print(f"Download of {url} was interrupted, resuming...")
+            continue
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code in THROTTLE_STATUSES:
+                # Still throttled after the session's retries. The host's
+                # limiter has backed off, so try again within its new limit.
+                attempt += 1
+                if attempt < attempts:
+                    print(f"Download of {url} was throttled, trying again...")
+                    continue
+            # The package cannot be fetched from this URL, nothing to resume
+            _remove(part_path, state_path)
+            raise
+        if result is not None and verify is not None:
+            try:
+                verify(part_path)
+            except ValueError as e:
+                _remove(part_path, state_path)
+                corrupt += 1
+                if corrupt > 1:
+                    raise CorruptDownloadError(
+                        f"Download of {url} is corrupted: {e}"
+                    ) from e
+                print(f"Download of {url} is corrupted ({e}), downloading it again...")
+                continue
+        if result is not None:
+            break
+        restarts += 1
+        if restarts > 1:
+            raise requests.exceptions.RequestException(
+                f"Server keeps rejecting the download of {url}"
+            )
+    os.replace(part_path, file_path)
+    _remove(state_path)
+    return result
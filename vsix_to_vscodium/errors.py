@@ -0,0 +1,18 @@
+"""Errors raised by vsix-to-vscodium.
+
+Library functions raise these instead of exiting the process, so that a
+program transferring extensions can report a failed extension and carry on.
+The command line turns them into messages and exit codes.
+"""
+
+
+class VsixToVscodiumError(Exception):
+    """Base class of the errors raised by vsix-to-vscodium."""
+
+
+class InvalidExtensionIdError(VsixToVscodiumError, ValueError):
+    """An extension ID is not in 'publisher.extension' format."""
+
+
+class ExtensionNotFoundError(VsixToVscodiumError):
+    """The Marketplace has no version of an extension that suits the target IDE."""
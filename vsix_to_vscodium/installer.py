@@ -0,0 +1,311 @@
+"""Installation of extension packages into VSCodium-based IDEs."""
+
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import pathlib
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional
+import zipfile
+
+from vsix_to_vscodium.vsix import (
+    EXTENSION_PREFIX,
+    VSIX_MANIFEST,
+    read_package_json,
+    read_target_platform,
+)
+
+# Number of .vsix files passed to a single IDE process
+DEFAULT_INSTALL_BATCH_SIZE = 10
+# Extensions directory of IDEs whose executable name is known
+EXTENSIONS_DIRS = {
+    "code": "~/.vscode/extensions",
+    "code-insiders": "~/.vscode-insiders/extensions",
+    "codium": "~/.vscode-oss/extensions",
+    "code-oss": "~/.vscode-oss/extensions",
+    "cursor": "~/.cursor/extensions",
+    "windsurf": "~/.windsurf/extensions",
+}
+REGISTRY_FILE = "extensions.json"
+OBSOLETE_FILE = ".obsolete"
+# Errors of a single package that make the installer fall back to the IDE CLI
+EXTRACT_ERRORS = (zipfile.BadZipFile, KeyError, ValueError, OSError)
+
+_registry_lock = threading.Lock()
+
+
+def _run_install(vsix_paths: List[str], ide_name: str) -> None:
+    command = [ide_name]
+    for vsix_path in vsix_paths:
+        command.extend(["--install-extension", vsix_path])
+    subprocess.run(command, check=True)
+
+
+def install_extensions(
+    vsix_paths: List[str],
+    ide_name: str,
+    batch_size: int = DEFAULT_INSTALL_BATCH_SIZE,
+) -> Dict[str, Optional[subprocess.CalledProcessError]]:
+    """
+    Install many .vsix files with as few IDE launches as possible.
+
+    The files are passed to the IDE in batches of repeated --install-extension
+    flags. If a batch fails, its files are installed one at a time so that the
+    failing extension is reported on its own.
+
+    Args:
+        vsix_paths: Paths to the .vsix files
+        ide_name: Name of the IDE executable (e.g., 'windsurf')
+        batch_size: Maximum number of files installed by a single IDE process
+
+    Returns:
+        Dict[str, Optional[subprocess.CalledProcessError]]: The installation
+            error of each file, or None if it was installed
+
+    Raises:
+        FileNotFoundError: If the IDE executable does not exist
+    """
+    errors: Dict[str, Optional[subprocess.CalledProcessError]] = {}
+    for start in range(0, len(vsix_paths), batch_size):
+        batch = vsix_paths[start : start + batch_size]
+        print(f"Installing {len(batch)} extensions using {ide_name}...")
+        try:
+            _run_install(batch, ide_name)
+            print(f"Installed {len(batch)} extensions successfully!")
+            errors.update((vsix_path, None) for vsix_path in batch)
+            continue
+        except subprocess.CalledProcessError as e:
+            if len(batch) == 1:
+                errors[batch[0]] = e
+                continue
+            print("Batch install failed, installing its extensions one at a time...")
+        for vsix_path in batch:
+            try:
+                _run_install([vsix_path], ide_name)
+                errors[vsix_path] = None
+            except subprocess.CalledProcessError as e:
+                errors[vsix_path] = e
+    return errors
+
+
+def get_extensions_dir(ide_name: str) -> str:
+    """
+    Get the directory an IDE installs its extensions into.
+
+    Args:
+        ide_name: Name or path of the IDE executable (e.g., 'windsurf')
+
+    Returns:
+        str: Path to the IDE's extensions directory
+
+    Raises:
+        ValueError: If the extensions directory of the IDE is not known
+    """
+    name = os.path.basename(ide_name).lower()
+    if name.endswith((".cmd", ".exe")):
+        name = name[:-4]
+    try:
+        return os.path.expanduser(EXTENSIONS_DIRS[name])
+    except KeyError:
+        raise ValueError(
+            f"Unknown extensions directory for {ide_name}, use --extensions-dir"
+        ) from None
+
+
+def _safe_target(root: str, member: str) -> str:
+    target = os.path.normpath(os.path.join(root, member))
+    if os.path.commonpath([root, target]) != root:
+        raise ValueError(f"Refusing to extract {member!r} outside of {root}")
+    return target
+
+
+def extract_vsix(vsix_path: str, extensions_dir: str) -> dict:
+    """
+    Extract the extension payload of a .vsix file into an extensions directory.
+
+    The files are written to a temporary folder that is renamed into place
+    once complete, so a partially extracted extension is never visible.
+
+    Args:
+        vsix_path: Path to the .vsix file
+        extensions_dir: The IDE's extensions directory
+
+    Returns:
+        dict: The entry describing the extension in extensions.json
+
+    Raises:
+        zipfile.BadZipFile: If the file is not a zip archive
+        KeyError: If the archive has no extension/package.json
+        ValueError: If the package is malformed
+    """
+    with zipfile.ZipFile(vsix_path) as archive:
+        manifest = read_package_json(archive)
+        ext_id = f"{manifest['publisher']}.{manifest['name']}".lower()
+        version = manifest["version"]
+        target_platform = read_target_platform(archive)
+        folder = f"{ext_id}-{version}"
+        if target_platform:
+            folder = f"{folder}-{target_platform}"
+
+        os.makedirs(extensions_dir, exist_ok=True)
+        destination = os.path.join(extensions_dir, folder)
+        staging = os.path.join(extensions_dir, f".{folder}.{os.getpid()}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        try:
+            staging_root = os.path.abspath(staging)
+            for info in archive.infolist():
+                if not info.filename.startswith(EXTENSION_PREFIX) or info.is_dir():
+                    continue
+                relative = info.filename[len(EXTENSION_PREFIX) :]
+                target = _safe_target(staging_root, relative)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with archive.open(info) as source, open(target, "wb") as f:
+                    shutil.copyfileobj(source, f, 1024 * 1024)
+            if VSIX_MANIFEST in archive.namelist():
+                with open(os.path.join(staging, ".vsixmanifest"), "wb") as f:
+                    f.write(archive.read(VSIX_MANIFEST))
+            shutil.rmtree(destination, ignore_errors=True)
+            os.replace(staging, destination)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    metadata = {"installedTimestamp": int(time.time() * 1000), "source": "vsix"}
+    if target_platform:
+        metadata["targetPlatform"] = target_platform
+    return {
+        "identifier": {"id": ext_id},
+        "version": version,
+        "location": {
+            "$mid": 1,
+            "path": _uri_path(os.path.abspath(destination)),
+            "scheme": "file",
+        },
+        "relativeLocation": folder,
+        "metadata": metadata,
+    }
+
+
+def _uri_path(path: str) -> str:
+    # Path component of a file URI, e.g. '/C:/Users/me' for 'C:\\Users\\me'
+    posix = pathlib.PurePath(path).as_posix()
+    return posix if posix.startswith("/") else f"/{posix}"
+
+
+def register_extensions(extensions_dir: str, entries: List[dict]) -> None:
+    """
+    Add extracted extensions to the extensions.json registry of an IDE.
+
+    Entries for other versions of the same extensions are replaced, and their
+    folders are marked obsolete so the IDE removes them on its next start. The
+    registry is rewritten atomically.
+
+    Args:
+        extensions_dir: The IDE's extensions directory
+        entries: The entries returned by extract_vsix
+    """
+    registry_path = os.path.join(extensions_dir, REGISTRY_FILE)
+    obsolete_path = os.path.join(extensions_dir, OBSOLETE_FILE)
+    with _registry_lock:
+        registry = _read_json(registry_path, [])
+        obsolete = _read_json(obsolete_path, {})
+        new_ids = {entry["identifier"]["id"] for entry in entries}
+        new_folders = {entry["relativeLocation"] for entry in entries}
+        kept = []
+        for entry in registry:
+            if entry.get("identifier", {}).get("id", "").lower() not in new_ids:
+                kept.append(entry)
+            elif entry.get("relativeLocation") not in new_folders:
+                obsolete[entry.get("relativeLocation")] = True
+        for folder in new_folders:
+            obsolete.pop(folder, None)
+        _write_json(registry_path, kept + entries)
+        if obsolete:
+            _write_json(obsolete_path, obsolete)
+
+
+def _read_json(path: str, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path: str, data) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def extract_extensions(
+    vsix_paths: List[str],
+    ide_name: str,
+    extensions_dir: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, Optional[BaseException]]:
+    """
+    Install .vsix files by extracting them directly into the IDE's extensions directory.
+
+    Packages are extracted in parallel on a process pool and registered in a
+    single update of extensions.json. Packages that cannot be extracted are
+    installed through the IDE's CLI instead.
+
+    Args:
+        vsix_paths: Paths to the .vsix files
+        ide_name: Name of the IDE executable (e.g., 'windsurf')
+        extensions_dir: The IDE's extensions directory. Defaults to the known
+            directory of `ide_name`.
+        workers: Number of extraction processes. Defaults to the number of CPUs.
+
+    Returns:
+        Dict[str, Optional[BaseException]]: The installation error of each
+            file, or None if it was installed
+
+    Raises:
+        ValueError: If no extensions directory is given and the IDE's is unknown
+    """
+    extensions_dir = extensions_dir or get_extensions_dir(ide_name)
+    print(f"Extracting {len(vsix_paths)} extensions into {extensions_dir}...")
+    errors: Dict[str, Optional[BaseException]] = {}
+    entries = []
+    if len(vsix_paths) == 1 or workers == 1:
+        outcomes = [_try_extract(vsix_path, extensions_dir) for vsix_path in vsix_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(
+                executor.map(
+                    _try_extract, vsix_paths, [extensions_dir] * len(vsix_paths)
+                )
+            )
+    failed = []
+    for vsix_path, (entry, error) in zip(vsix_paths, outcomes):
+        if error is None:
+            entries.append(entry)
+            errors[vsix_path] = None
+        else:
+            print(f"Could not extract {vsix_path}: {error}")
+            failed.append(vsix_path)
+            errors[vsix_path] = error
+    if entries:
+        register_extensions(extensions_dir, entries)
+        print(f"Installed {len(entries)} extensions successfully!")
+    if failed:
+        print(f"Falling back to {ide_name} for {len(failed)} extensions...")
+        try:
+            errors.update(install_extensions(failed, ide_name))
+        except FileNotFoundError:
+            print(f"Command '{ide_name}' not found, cannot fall back to it")
+    return errors
+
+
+def _try_extract(vsix_path: str, extensions_dir: str):
+    # Runs in a worker process, so errors are returned instead of raised
+    try:
+        return extract_vsix(vsix_path, extensions_dir), None
+    except EXTRACT_ERRORS as e:
+        return None, e
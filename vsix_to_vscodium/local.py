@@ -0,0 +1,280 @@
+"""Extensions read from a local VS Code installation instead of the Marketplace."""
+
+from dataclasses import dataclass
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+from typing import Dict, List, Optional, Set
+from xml.sax.saxutils import quoteattr
+import zipfile
+
+from vsix_to_vscodium.installer import OBSOLETE_FILE, REGISTRY_FILE
+from vsix_to_vscodium.marketplace import version_key
+from vsix_to_vscodium.vsix import EXTENSION_PREFIX, VSIX_MANIFEST
+
+# Key of VS Code's global state that lists the disabled extensions
+DISABLED_STATE_KEY = "extensionsIdentifiers/disabled"
+# Installed extensions are repackaged right before being installed, so favour
+# speed over size
+PACKAGE_COMPRESS_LEVEL = 1
+# The copy of the package manifest VS Code keeps in installed extensions
+INSTALLED_MANIFEST = ".vsixmanifest"
+CONTENT_TYPES = "[Content_Types].xml"
+
+_CONTENT_TYPES_XML = """<?xml version="1.0" encoding="utf-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+  <Default Extension=".json" ContentType="application/json"/>
+  <Default Extension=".vsixmanifest" ContentType="text/xml"/>
+  <Default Extension="" ContentType="application/octet-stream"/>
+</Types>
+"""
+_VSIX_MANIFEST_XML = """<?xml version="1.0" encoding="utf-8"?>
+<PackageManifest Version="2.0.0" xmlns="http://schemas.microsoft.com/developer/vsx-schema/2011">
+  <Metadata>
+    <Identity Language="en-US" Id={name} Version={version} Publisher={publisher}{platform}/>
+    <DisplayName>{display_name}</DisplayName>
+  </Metadata>
+  <Installation>
+    <InstallationTarget Id="Microsoft.VisualStudio.Code"/>
+  </Installation>
+  <Assets>
+    <Asset Type="Microsoft.VisualStudio.Code.Manifest" Path="extension/package.json" Addressable="true"/>
+  </Assets>
+</PackageManifest>
+"""
+
+
+@dataclass(frozen=True)
+class LocalExtension:
+    """An extension installed in a local extensions directory."""
+
+    extension_id: str
+    version: str
+    path: str
+    target_platform: Optional[str] = None
+    enabled: bool = True
+
+    @property
+    def package_name(self) -> str:
+        """File name of the .vsix package built from this extension."""
+        platform = f"@{self.target_platform}" if self.target_platform else ""
+        return f"{self.extension_id}-{self.version}{platform}.vsix"
+
+
+def get_vscode_state_db() -> str:
+    """
+    Get the path of VS Code's global state database.
+
+    Returns:
+        str: Path to state.vscdb
+    """
+    if sys.platform == "win32":
+        config_dir = os.environ.get("APPDATA") or os.path.expanduser("~/AppData/Roaming")
+    elif sys.platform == "darwin":
+        config_dir = os.path.expanduser("~/Library/Application Support")
+    else:
+        config_dir = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    return os.path.join(config_dir, "Code", "User", "globalStorage", "state.vscdb")
+
+
+def read_disabled_extensions(state_db: str) -> Set[str]:
+    """
+    Read the IDs of the extensions disabled in VS Code.
+
+    Args:
+        state_db: Path to VS Code's state.vscdb
+
+    Returns:
+        Set[str]: Lowercase IDs of the disabled extensions, empty if the
+            database cannot be read
+    """
+    if not os.path.exists(state_db):
+        return set()
+    try:
+        # Read-only, so a running VS Code is never disturbed
+        uri = pathlib.Path(os.path.abspath(state_db)).as_uri()
+        connection = sqlite3.connect(f"{uri}?mode=ro", uri=True)
+        try:
+            row = connection.execute(
+                "SELECT value FROM ItemTable WHERE key = ?", (DISABLED_STATE_KEY,)
+            ).fetchone()
+        finally:
+            connection.close()
+        disabled = json.loads(row[0]) if row else []
+    except (sqlite3.Error, ValueError, TypeError):
+        return set()
+    return {
+        item["id"].lower()
+        for item in disabled
+        if isinstance(item, dict) and isinstance(item.get("id"), str)
+    }
+
+
+def _read_package_json(folder: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(folder, "package.json"), encoding="utf-8-sig") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not all(isinstance(manifest.get(key), str) for key in ("publisher", "name", "version")):
+        return None
+    return manifest
+
+
+def _entry_folder(extensions_dir: str, entry: dict) -> Optional[str]:
+    if entry.get("relativeLocation"):
+        return os.path.join(extensions_dir, entry["relativeLocation"])
+    location = entry.get("location")
+    if isinstance(location, dict):
+        return location.get("fsPath") or location.get("path")
+    if isinstance(location, str):
+        return location
+    return None
+
+
+def read_installed_extensions(
+    extensions_dir: str, state_db: Optional[str] = None
+) -> List[LocalExtension]:
+    """
+    Read the extensions installed in a local extensions directory.
+
+    The extensions are taken from the directory's extensions.json registry,
+    or from the package.json of each folder if there is no registry. Folders
+    that the IDE marked obsolete or that no longer exist are skipped.
+
+    Args:
+        extensions_dir: The IDE's extensions directory, e.g. ~/.vscode/extensions
+        state_db: Path to the IDE's state.vscdb used to tell which extensions
+            are disabled. Defaults to VS Code's.
+
+    Returns:
+        List[LocalExtension]: The installed extensions, sorted by ID
+
+    Raises:
+        FileNotFoundError: If the extensions directory does not exist
+    """
+    if not os.path.isdir(extensions_dir):
+        raise FileNotFoundError(f"Extensions directory {extensions_dir} not found")
+    disabled = read_disabled_extensions(state_db or get_vscode_state_db())
+    try:
+        with open(os.path.join(extensions_dir, OBSOLETE_FILE), encoding="utf-8") as f:
+            obsolete = set(json.load(f))
+    except (OSError, ValueError, TypeError):
+        obsolete = set()
+
+    try:
+        with open(os.path.join(extensions_dir, REGISTRY_FILE), encoding="utf-8") as f:
+            registry = json.load(f)
+    except (OSError, ValueError):
+        registry = None
+    if isinstance(registry, list):
+        candidates = [
+            (_entry_folder(extensions_dir, entry), entry)
+            for entry in registry
+            if isinstance(entry, dict)
+        ]
+    else:
+        candidates = [
+            (os.path.join(extensions_dir, name), {})
+            for name in os.listdir(extensions_dir)
+            if not name.startswith(".")
+        ]
+
+    extensions: Dict[str, LocalExtension] = {}
+    for folder, entry in candidates:
+        if not folder or os.path.basename(os.path.normpath(folder)) in obsolete:
+            continue
+        manifest = _read_package_json(folder)
+        if manifest is None:
+            continue
+        ext_id = f"{manifest['publisher']}.{manifest['name']}"
+        metadata = entry.get("metadata") or {}
+        target_platform = metadata.get("targetPlatform")
+        if target_platform in (None, "universal", "undefined"):
+            target_platform = None
+        extension = LocalExtension(
+            extension_id=ext_id,
+            version=manifest["version"],
+            path=folder,
+            target_platform=target_platform,
+            enabled=ext_id.lower() not in disabled,
+        )
+        # Keep the newest folder if an update left an older one behind
+        current = extensions.get(ext_id.lower())
+        if current is None or version_key(extension.version) > version_key(current.version):
+            extensions[ext_id.lower()] = extension
+    return sorted(extensions.values(), key=lambda extension: extension.extension_id.lower())
+
+
+def _vsix_manifest(extension: LocalExtension, manifest: dict) -> str:
+    platform = (
+        f" TargetPlatform={quoteattr(extension.target_platform)}"
+        if extension.target_platform
+        else ""
+    )
+    display_name = manifest.get("displayName")
+    if not isinstance(display_name, str):
+        display_name = manifest["name"]
+    return _VSIX_MANIFEST_XML.format(
+        name=quoteattr(manifest["name"]),
+        version=quoteattr(manifest["version"]),
+        publisher=quoteattr(manifest["publisher"]),
+        platform=platform,
+        display_name=quoteattr(display_name)[1:-1],
+    )
+
+
+def package_extension(extension: LocalExtension, output_dir: str) -> str:
+    """
+    Build a .vsix package from an installed extension folder.
+
+    Files are streamed into the archive one at a time, and the package is
+    written under a temporary name that is renamed once complete.
+
+    Args:
+        extension: The installed extension
+        output_dir: Directory the package is written to
+
+    Returns:
+        str: Path to the .vsix package
+
+    Raises:
+        OSError: If the extension folder cannot be read or the package written
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    vsix_path = os.path.join(output_dir, extension.package_name)
+    tmp_path = f"{vsix_path}.{os.getpid()}.tmp"
+    try:
+        with zipfile.ZipFile(
+            tmp_path,
+            "w",
+            compression=zipfile.ZIP_DEFLATED,
+            compresslevel=PACKAGE_COMPRESS_LEVEL,
+        ) as archive:
+            archive.writestr(CONTENT_TYPES, _CONTENT_TYPES_XML)
+            installed_manifest = os.path.join(extension.path, INSTALLED_MANIFEST)
+            if os.path.isfile(installed_manifest):
+                archive.write(installed_manifest, VSIX_MANIFEST)
+            else:
+                manifest = _read_package_json(extension.path)
+                if manifest is None:
+                    raise OSError(f"Cannot read package.json of {extension.path}")
+                archive.writestr(VSIX_MANIFEST, _vsix_manifest(extension, manifest))
+            for root, dirs, files in os.walk(extension.path):
+                dirs.sort()
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    relative = os.path.relpath(path, extension.path)
+                    if relative == INSTALLED_MANIFEST:
+                        continue
+                    member = EXTENSION_PREFIX + relative.replace(os.sep, "/")
+                    archive.write(path, member)
+        os.replace(tmp_path, vsix_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return vsix_path
+
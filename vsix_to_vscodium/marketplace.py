@@ -0,0 +1,384 @@
+"""Helpers for talking to the VS Code Marketplace gallery API."""
+
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from vsix_to_vscodium.cache import MetadataCache
+from vsix_to_vscodium.compatibility import IdeTarget, engine_satisfies
+from vsix_to_vscodium.throttle import get_throttle
+from vsix_to_vscodium.transport import get_session
+
+EXTENSION_QUERY_URL = (
+    "https://marketplace.visualstudio.com/_apis/public/gallery/extensionquery"
+)
+DOWNLOAD_URL_TEMPLATE = (
+    "https://{publisher}.gallery.vsassets.io/_apis/public/gallery/publisher/"
+    "{publisher}/extension/{name}/{version}/assetbyname/"
+    "Microsoft.VisualStudio.Services.VSIXPackage"
+)
+# Environment variables that point the tool at a mirror of the Marketplace.
+# The download URL is a template with {publisher}, {name} and {version} fields.
+QUERY_URL_ENV = "VSIX_TO_VSCODIUM_QUERY_URL"
+DOWNLOAD_URL_ENV = "VSIX_TO_VSCODIUM_DOWNLOAD_URL"
+QUERY_HEADERS = {
+    "Content-Type": "application/json",
+    "Accept": "application/json;api-version=3.0-preview.1",
+    "User-Agent": "VSCodium Extension Manager/1.0",
+}
+# IncludeVersions | IncludeVersionProperties | ExcludeNonValidated: every
+# version with its engine constraint and target platform
+QUERY_FLAGS = 0x1 | 0x10 | 0x20
+ENGINE_PROPERTY = "Microsoft.VisualStudio.Code.Engine"
+PRE_RELEASE_PROPERTY = "Microsoft.VisualStudio.Code.PreRelease"
+UNIVERSAL_PLATFORM = "universal"
+# filterType 7 matches an extension by its full 'publisher.extension' name
+FILTER_TYPE_EXTENSION_NAME = 7
+# Number of extension IDs packed into a single extensionquery request
+DEFAULT_BATCH_SIZE = 100
+
+
+@dataclass(frozen=True)
+class ExtensionMetadata:
+    """Resolved Marketplace metadata for a single extension version."""
+
+    extension_id: str
+    publisher: str
+    name: str
+    version: str
+    # Platform of the package, None for universal packages
+    target_platform: Optional[str] = None
+
+    @property
+    def download_url(self) -> str:
+        """URL of the .vsix package for this version."""
+        return build_download_url(
+            self.publisher, self.name, self.version, self.target_platform
+        )
+
+
+def parse_extension_id(extension_id: str) -> Tuple[str, str]:
+    """
+    Split an extension ID into its publisher and extension name.
+
+    Args:
+        extension_id: The extension ID in format 'publisher.extension'
+
+    Returns:
+        Tuple[str, str]: The publisher and extension name
+
+    Raises:
+        ValueError: If the extension ID is not in 'publisher.extension' format
+    """
+    publisher, _, extension_name = extension_id.partition(".")
+    if not publisher or not extension_name:
+        raise ValueError(f"Invalid extension ID: {extension_id!r}")
+    return publisher, extension_name
+
+
+def version_key(version: str) -> Tuple[Tuple[int, ...], bool, str]:
+    """
+    Build a sort key that orders extension versions semantically.
+
+    Args:
+        version: A version such as '1.10.0' or '2.0.0-beta.1'
+
+    Returns:
+        Tuple[Tuple[int, ...], bool, str]: Key under which '1.10.0' sorts after
+            '1.9.0' and a release sorts after its pre-releases
+    """
+    release, _, prerelease = version.strip().partition("-")
+    numbers = []
+    for part in release.split("."):
+        digits = re.match(r"\d*", part).group()
+        numbers.append(int(digits) if digits else 0)
+    while len(numbers) > 1 and numbers[-1] == 0:
+        numbers.pop()
+    return tuple(numbers), not prerelease, prerelease
+
+
+def build_download_url(
+    publisher: str, name: str, version: str, target_platform: Optional[str] = None
+) -> str:
+    """
+    Build the download URL of a .vsix package.
+
+    Args:
+        publisher: The extension publisher
+        name: The extension name
+        version: The extension version
+        target_platform: Platform of the package. Defaults to None (universal).
+
+    Returns:
+        str: URL of the .vsix package on the publisher's asset host, or on the
+            mirror set in VSIX_TO_VSCODIUM_DOWNLOAD_URL
+    """
+    template = os.environ.get(DOWNLOAD_URL_ENV) or DOWNLOAD_URL_TEMPLATE
+    url = template.format(publisher=publisher, name=name, version=version)
+    if target_platform:
+        separator = "&" if "?" in url else "?"
+        url = f"{url}{separator}targetPlatform={target_platform}"
+    return url
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _query_payload(extension_ids: List[str], page_number: int) -> dict:
+    return {
+        "filters": [
+            {
+                "criteria": [
+                    {"filterType": FILTER_TYPE_EXTENSION_NAME, "value": ext_id}
+                    for ext_id in extension_ids
+                ],
+                "pageNumber": page_number,
+                "pageSize": len(extension_ids),
+            }
+        ],
+        "flags": QUERY_FLAGS,
+    }
+
+
+def _query_key(extension_ids: List[str]) -> str:
+    # Identifies a query so that its ETag can be reused by an identical query
+    payload = json.dumps(_query_payload(extension_ids, 1), sort_keys=True)
+    return hashlib.sha256(payload.lower().encode("utf-8")).hexdigest()
+
+
+def _total_count(result: dict) -> int:
+    for metadata in result.get("resultMetadata", []):
+        if metadata.get("metadataType") != "ResultCount":
+            continue
+        for item in metadata.get("metadataItems", []):
+            if item.get("name") == "TotalCount":
+                return item.get("count", 0)
+    return 0
+
+
+def _query_chunk(
+    extension_ids: List[str], etag: Optional[str] = None
+) -> Tuple[Optional[List[dict]], Optional[str]]:
+    # Returns the entries and ETag of the answer, or no entries if the
+    # server confirmed that the answer matching `etag` is still current
+    entries: List[dict] = []
+    response_etag = None
+    page_number = 1
+    while True:
+        headers = dict(QUERY_HEADERS)
+        if etag and page_number == 1:
+            headers["If-None-Match"] = etag
+        url = os.environ.get(QUERY_URL_ENV) or EXTENSION_QUERY_URL
+        with get_throttle().slot(url):
+            response = get_session().post(
+                url, headers=headers, json=_query_payload(extension_ids, page_number)
+            )
+        if response.status_code == 304:
+            return None, etag
+        response.raise_for_status()
+        if page_number == 1:
+            response_etag = response.headers.get("ETag")
+        results = response.json().get("results") or [{}]
+        page = results[0].get("extensions", [])
+        entries.extend(page)
+        if not page or len(entries) >= _total_count(results[0]):
+            # A multi-page answer cannot be revalidated as a whole
+            return entries, response_etag if page_number == 1 else None
+        page_number += 1
+
+
+def query_extensions(extension_ids: List[str]) -> List[dict]:
+    """
+    Fetch the raw Marketplace entries for a group of extensions in one query.
+
+    All IDs are sent as criteria of a single filter. Further pages are only
+    requested if the Marketplace reports more matches than the first page held.
+
+    Args:
+        extension_ids: Extension IDs in format 'publisher.extension'
+
+    Returns:
+        List[dict]: The extension entries returned by the Marketplace
+
+    Raises:
+        requests.exceptions.RequestException: If the query fails
+    """
+    entries, _ = _query_chunk(extension_ids)
+    return entries or []
+
+
+def _index_versions(versions: List[dict]) -> List[dict]:
+    # Keep the newest version per target platform and engine constraint, as
+    # an older one with the same requirements is never the better choice.
+    # Pre-releases are only kept for extensions without any release.
+    candidates = []
+    for version in versions:
+        properties = {
+            prop.get("key"): prop.get("value") for prop in version.get("properties") or []
+        }
+        target_platform = version.get("targetPlatform")
+        candidates.append(
+            (
+                properties.get(PRE_RELEASE_PROPERTY) == "true",
+                {
+                    "version": version["version"],
+                    "target_platform": None
+                    if target_platform in (None, UNIVERSAL_PLATFORM)
+                    else target_platform,
+                    "engine": properties.get(ENGINE_PROPERTY, "*"),
+                },
+            )
+        )
+    has_release = any(not pre_release for pre_release, _ in candidates)
+    index: Dict[Tuple[Optional[str], str], dict] = {}
+    for pre_release, candidate in candidates:
+        if pre_release and has_release:
+            continue
+        key = (candidate["target_platform"], candidate["engine"])
+        if key not in index or version_key(candidate["version"]) > version_key(
+            index[key]["version"]
+        ):
+            index[key] = candidate
+    return list(index.values())
+
+
+def _parse_entry(entry: dict) -> Optional[dict]:
+    try:
+        return {
+            "publisher": entry["publisher"]["publisherName"],
+            "name": entry["extensionName"],
+            "version": entry["versions"][0]["version"],
+            "versions": _index_versions(entry["versions"]),
+        }
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def select_version(
+    extension_id: str, data: dict, target: Optional[IdeTarget] = None
+) -> Optional[ExtensionMetadata]:
+    """
+    Pick the version of an extension to install into a target IDE.
+
+    The newest version whose engine constraint the IDE meets is chosen, built
+    for the IDE's platform where such a package exists since it is usually
+    much smaller than the universal one. Packages for other platforms are
+    never chosen.
+
+    Args:
+        extension_id: The extension ID in format 'publisher.extension'
+        data: Parsed Marketplace metadata of the extension
+        target: The IDE to install into. Defaults to None (the latest version).
+
+    Returns:
+        Optional[ExtensionMetadata]: The chosen version, or None if no version
+            is compatible with the target IDE
+    """
+    identity = {"publisher": data["publisher"], "name": data["name"]}
+    versions = data.get("versions")
+    if target is None or versions is None:
+        # Metadata cached before versions were indexed only knows the latest
+        return ExtensionMetadata(extension_id, version=data["version"], **identity)
+    compatible = [
+        candidate
+        for candidate in versions
+        if candidate["target_platform"] in (None, target.platform)
+        and (
+            target.engine_version is None
+            or engine_satisfies(candidate["engine"], target.engine_version)
+        )
+    ]
+    if not compatible:
+        return None
+    best = max(
+        compatible,
+        key=lambda candidate: (
+            version_key(candidate["version"]),
+            candidate["target_platform"] is not None,
+        ),
+    )
+    return ExtensionMetadata(
+        extension_id,
+        version=best["version"],
+        target_platform=best["target_platform"],
+        **identity,
+    )
+
+
+def resolve_extensions(
+    extension_ids: Iterable[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    metadata_cache: Optional[MetadataCache] = None,
+    target: Optional[IdeTarget] = None,
+) -> Tuple[Dict[str, ExtensionMetadata], List[str]]:
+    """
+    Resolve the version to install of many extensions with as few queries as possible.
+
+    With a metadata cache, fresh cached entries are used without querying the
+    Marketplace, and stale ones are revalidated with the ETag of the previous
+    identical query where possible. In offline mode only the cache is used.
+
+    Args:
+        extension_ids: Extension IDs in format 'publisher.extension'
+        batch_size: Maximum number of IDs sent in a single query
+        metadata_cache: Cache of previous query results. Defaults to None (no cache).
+        target: IDE whose engine and platform the versions must suit, see
+            select_version. Defaults to None (the latest versions).
+
+    Returns:
+        Tuple[Dict[str, ExtensionMetadata], List[str]]: Metadata keyed by the
+            requested extension ID, and the IDs that were not found or have
+            no compatible version
+
+    Raises:
+        requests.exceptions.RequestException: If a query fails
+    """
+    requested: Dict[str, str] = {}
+    unresolved: List[str] = []
+    for ext_id in extension_ids:
+        try:
+            parse_extension_id(ext_id)
+        except ValueError:
+            unresolved.append(ext_id)
+            continue
+        requested.setdefault(ext_id.lower(), ext_id)
+
+    found_data: Dict[str, dict] = {}
+    pending = list(requested.values())
+    if metadata_cache is not None:
+        found_data.update(metadata_cache.lookup(pending))
+        pending = [] if metadata_cache.offline else [
+            ext_id for ext_id in pending if ext_id not in found_data
+        ]
+
+    for chunk in _chunks(pending, batch_size):
+        query_key = _query_key(chunk)
+        etag = metadata_cache.get_etag(query_key) if metadata_cache else None
+        entries, etag = _query_chunk(chunk, etag)
+        if entries is None:
+            found = metadata_cache.revalidate(query_key)
+        else:
+            found = {}
+            for entry in entries:
+                data = _parse_entry(entry)
+                if data is not None:
+                    found[f"{data['publisher']}.{data['name']}".lower()] = data
+            if metadata_cache is not None:
+                metadata_cache.store(found, query_key, etag)
+        for key, data in found.items():
+            ext_id = requested.get(key)
+            if ext_id is not None:
+                found_data[ext_id] = data
+
+    resolved: Dict[str, ExtensionMetadata] = {}
+    for ext_id, data in found_data.items():
+        metadata = select_version(ext_id, data, target)
+        if metadata is not None:
+            resolved[ext_id] = metadata
+    unresolved.extend(ext_id for ext_id in requested.values() if ext_id not in resolved)
+    return resolved, unresolved
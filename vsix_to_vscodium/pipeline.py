@@ -0,0 +1,241 @@
+"""Pipelined download and install of many extensions."""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+import queue
+import subprocess
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+import requests
+
+from vsix_to_vscodium.errors import VsixToVscodiumError
+from vsix_to_vscodium.installer import DEFAULT_INSTALL_BATCH_SIZE
+from vsix_to_vscodium.scheduler import DependencyScheduler
+
+# Number of extensions downloaded in parallel by default
+DEFAULT_JOBS = 4
+# Per-extension errors that are reported without aborting the whole transfer.
+# OSError covers local extension folders that cannot be packaged.
+RECOVERABLE_ERRORS: Tuple[Type[BaseException], ...] = (
+    VsixToVscodiumError,
+    requests.exceptions.RequestException,
+    subprocess.CalledProcessError,
+    OSError,
+)
+
+# Installs a batch of .vsix files and returns the error of each file, if any
+InstallBatch = Callable[[List[str]], Dict[str, Optional[BaseException]]]
+
+
+class FanOutInstall:
+    """
+    Installs each batch of .vsix files into several target IDEs at once.
+
+    Every target gets its own installer thread, so a slow IDE does not hold
+    up the others, and a batch only counts as installed once every target
+    that wants it is done. Used as the install stage of run_pipeline, so each
+    package is downloaded once however many targets there are.
+    """
+
+    def __init__(
+        self,
+        installs: Dict[str, InstallBatch],
+        wants: Optional[Callable[[str, str], bool]] = None,
+    ):
+        """
+        Prepare to install into several targets.
+
+        Args:
+            installs: Installer of each target, keyed by the target's name
+            wants: Tells whether a target needs a .vsix file, given the
+                target's name and the file's path. Defaults to None (every
+                target needs every file).
+        """
+        self.installs = installs
+        self.wants = wants
+        # Error of each target that installed a file, or None if it was
+        # installed, keyed by the file's path. Targets that did not want a
+        # file are left out.
+        self.results: Dict[str, Dict[str, Optional[BaseException]]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=len(installs))
+
+    def _install_into(
+        self, target: str, vsix_paths: List[str]
+    ) -> Dict[str, Optional[BaseException]]:
+        wanted = [
+            vsix_path
+            for vsix_path in vsix_paths
+            if self.wants is None or self.wants(target, vsix_path)
+        ]
+        return self.installs[target](wanted) if wanted else {}
+
+    def __call__(self, vsix_paths: List[str]) -> Dict[str, Optional[BaseException]]:
+        """
+        Install a batch into every target that wants it.
+
+        Args:
+            vsix_paths: Paths to the .vsix files
+
+        Returns:
+            Dict[str, Optional[BaseException]]: For each file, the error of the
+                first target that failed to install it, or None
+        """
+        futures = {
+            target: self._executor.submit(self._install_into, target, vsix_paths)
+            for target in self.installs
+        }
+        errors: Dict[str, Optional[BaseException]] = {}
+        for target, future in futures.items():
+            for vsix_path, error in future.result().items():
+                self.results.setdefault(vsix_path, {})[target] = error
+                if errors.get(vsix_path) is None:
+                    errors[vsix_path] = error
+        return {vsix_path: errors.get(vsix_path) for vsix_path in vsix_paths}
+
+    def close(self) -> None:
+        """Stop the installer threads."""
+        self._executor.shutdown()
+
+    def __enter__(self) -> "FanOutInstall":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+@dataclass
+class TransferResult:
+    """Outcome of transferring a single extension."""
+
+    extension_id: str
+    vsix_path: Optional[str] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the extension was downloaded and installed."""
+        return self.error is None
+
+
+def _download(
+    download: Callable[[str], str],
+    dependencies: Optional[Callable[[str], List[str]]],
+    extension_id: str,
+) -> Tuple[str, List[str]]:
+    print(f"\nProcessing {extension_id}...")
+    vsix_path = download(extension_id)
+    return vsix_path, dependencies(vsix_path) if dependencies else []
+
+
+def _report_failure(result: TransferResult) -> None:
+    print(f"Failed to process {result.extension_id}: {result.error}")
+    print("Continuing with next extension...")
+
+
+def _finished_downloads(
+    finished: "queue.Queue[Tuple[str, Future]]", remaining: int, block: bool
+) -> List[Tuple[str, Future]]:
+    # Optionally wait for one download, then take every other one that is done
+    downloads = [finished.get()] if block and remaining else []
+    while len(downloads) < remaining:
+        try:
+            downloads.append(finished.get_nowait())
+        except queue.Empty:
+            break
+    return downloads
+
+
+def run_pipeline(
+    extension_ids: Iterable[str],
+    download: Callable[[str], str],
+    install: InstallBatch,
+    jobs: int = DEFAULT_JOBS,
+    batch_size: int = DEFAULT_INSTALL_BATCH_SIZE,
+    dependencies: Optional[Callable[[str], List[str]]] = None,
+    on_result: Optional[Callable[[TransferResult], None]] = None,
+) -> List[TransferResult]:
+    """
+    Download extensions on a worker pool while installing finished downloads.
+
+    Downloads run on up to `jobs` threads. The install stage on the calling
+    thread takes every download that has finished, up to `batch_size` at a
+    time, and installs them together while the next ones keep downloading.
+
+    With `dependencies`, an extension is only installed once the extensions it
+    depends on that are part of the same transfer have been, so extensions are
+    installed in waves that follow the dependency graph. Each extension is
+    still downloaded and installed exactly once.
+
+    Args:
+        extension_ids: Extension IDs in format 'publisher.extension'
+        download: Downloads an extension and returns the path to its .vsix file
+        install: Installs a batch of .vsix files in the target IDE and returns
+            the error of each file, or None if it was installed
+        jobs: Maximum number of concurrent downloads
+        batch_size: Maximum number of .vsix files installed at once
+        dependencies: Returns the IDs of the extensions a downloaded .vsix file
+            depends on. Defaults to None (install in download order).
+        on_result: Called on the calling thread with each result as soon as
+            the extension is installed or has failed
+
+    Returns:
+        List[TransferResult]: One result per extension, in completion order
+    """
+    extension_ids = list(dict.fromkeys(extension_ids))
+    finished: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+    scheduler = DependencyScheduler(extension_ids)
+    downloaded: Dict[str, TransferResult] = {}
+    results: List[TransferResult] = []
+
+    def finish(result: TransferResult) -> None:
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for ext_id in extension_ids:
+            future = executor.submit(_download, download, dependencies, ext_id)
+            future.add_done_callback(
+                lambda future, ext_id=ext_id: finished.put((ext_id, future))
+            )
+        downloads_left = len(extension_ids)
+
+        def collect(block: bool) -> None:
+            nonlocal downloads_left
+            for ext_id, future in _finished_downloads(finished, downloads_left, block):
+                downloads_left -= 1
+                result = TransferResult(ext_id)
+                try:
+                    result.vsix_path, deps = future.result()
+                    downloaded[ext_id] = result
+                    scheduler.add(ext_id, deps)
+                except RECOVERABLE_ERRORS as e:
+                    result.error = e
+                    _report_failure(result)
+                    scheduler.settle(ext_id)
+                    finish(result)
+
+        try:
+            while len(results) < len(extension_ids):
+                collect(block=False)
+                ready = scheduler.ready()
+                if not ready and not downloads_left:
+                    # Every download is in, so whatever still waits is in a cycle
+                    ready = scheduler.ready(force=True)
+                if not ready:
+                    # Nothing can be installed until another download finishes
+                    collect(block=True)
+                    continue
+                for start in range(0, len(ready), batch_size):
+                    batch = [downloaded.pop(ext_id) for ext_id in ready[start : start + batch_size]]
+                    errors = install([result.vsix_path for result in batch])
+                    for result in batch:
+                        result.error = errors.get(result.vsix_path)
+                        if result.error is not None:
+                            _report_failure(result)
+                        scheduler.settle(result.extension_id)
+                        finish(result)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    return results
@@ -0,0 +1,213 @@
+"""Timing and outcome of a run, for --report."""
+
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+from requests import Response
+
+OUTCOME_INSTALLED = "installed"
+OUTCOME_FAILED = "failed"
+OUTCOME_SKIPPED = "skipped"
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+
+
+@dataclass
+class ExtensionRecord:
+    """What happened to a single extension during a run."""
+
+    extension_id: str
+    version: Optional[str] = None
+    outcome: Optional[str] = None
+    error: Optional[str] = None
+    cache: Optional[str] = None
+    bytes: int = 0
+    retries: int = 0
+    # Seconds spent fetching the package, including reading it from the cache
+    download_time: float = 0.0
+    # Seconds spent adding the package to the cache
+    store_time: float = 0.0
+    # Seconds taken by the install batch the extension was part of
+    install_time: float = 0.0
+    install_batch_size: int = 0
+    # Outcome in each target IDE
+    targets: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class RunReport:
+    """
+    Phase timings, HTTP traffic and per-extension records of a run.
+
+    Phases are timed on the thread that runs them, while extension records
+    are updated from the download threads, so every update holds a lock.
+    """
+
+    command: List[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+    phases: Dict[str, float] = field(default_factory=dict)
+    requests: int = 0
+    retries: int = 0
+    extensions: Dict[str, ExtensionRecord] = field(default_factory=dict)
+    # Request limit and traffic of every host at the end of the run
+    hosts: Dict[str, dict] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._current = threading.local()
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a phase of the run, adding to earlier runs of the same phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def record(self, extension_id: str, **fields) -> ExtensionRecord:
+        """
+        Update the record of an extension, creating it if needed.
+
+        Args:
+            extension_id: The extension ID in format 'publisher.extension'
+            **fields: ExtensionRecord fields to set
+
+        Returns:
+            ExtensionRecord: The updated record
+        """
+        with self._lock:
+            record = self.extensions.get(extension_id)
+            if record is None:
+                record = self.extensions[extension_id] = ExtensionRecord(extension_id)
+            for name, value in fields.items():
+                setattr(record, name, value)
+            return record
+
+    @contextmanager
+    def track(self, extension_id: str) -> Iterator[ExtensionRecord]:
+        """
+        Attribute the HTTP requests made by this thread to an extension.
+
+        Args:
+            extension_id: The extension ID in format 'publisher.extension'
+
+        Yields:
+            ExtensionRecord: The record of the extension
+        """
+        record = self.record(extension_id)
+        previous = getattr(self._current, "record", None)
+        self._current.record = record
+        try:
+            yield record
+        finally:
+            self._current.record = previous
+
+    def on_response(self, response: Response, *args, **kwargs) -> None:
+        """Response hook for requests sessions that counts requests and retries."""
+        history = getattr(getattr(response.raw, "retries", None), "history", None)
+        retries = len(history) if isinstance(history, tuple) else 0
+        record = getattr(self._current, "record", None)
+        with self._lock:
+            self.requests += 1 + retries
+            self.retries += retries
+            if record is not None:
+                record.retries += retries
+
+    def summary(self) -> dict:
+        """
+        Summarize the run.
+
+        Returns:
+            dict: Wall time, phase timings, totals and outcome counts, overall
+                and per target IDE
+        """
+        with self._lock:
+            records = list(self.extensions.values())
+            outcomes: Dict[str, int] = {}
+            targets: Dict[str, Dict[str, int]] = {}
+            for record in records:
+                outcome = record.outcome or "unknown"
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                for target, outcome in record.targets.items():
+                    counts = targets.setdefault(target, {})
+                    counts[outcome] = counts.get(outcome, 0) + 1
+            return {
+                "command": self.command,
+                "started_at": self.started_at,
+                "wall_time": time.perf_counter() - self._start,
+                "phases": dict(self.phases),
+                "requests": self.requests,
+                "retries": self.retries,
+                "hosts": dict(self.hosts),
+                "extensions": len(records),
+                "outcomes": outcomes,
+                "targets": targets,
+                "bytes_downloaded": sum(record.bytes for record in records),
+                "cache_hits": sum(record.cache == CACHE_HIT for record in records),
+                "cache_misses": sum(record.cache == CACHE_MISS for record in records),
+                "download_time": sum(record.download_time for record in records),
+                "store_time": sum(record.store_time for record in records),
+            }
+
+    def write(self, path: str) -> None:
+        """
+        Write the report to a file.
+
+        A '.jsonl' file gets one JSON line per extension followed by a summary
+        line, anything else a single JSON document.
+
+        Args:
+            path: Path of the report file
+        """
+        summary = self.summary()
+        with self._lock:
+            records = [asdict(record) for record in self.extensions.values()]
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                for record in records:
+                    f.write(json.dumps({"type": "extension", **record}) + "\n")
+                f.write(json.dumps({"type": "summary", **summary}) + "\n")
+            else:
+                json.dump({**summary, "extension_records": records}, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+_report = RunReport()
+_report_lock = threading.Lock()
+
+
+def configure_report(command: Optional[List[str]] = None) -> RunReport:
+    """
+    Start a new shared report.
+
+    Args:
+        command: Command line arguments of the run
+
+    Returns:
+        RunReport: The new shared report
+    """
+    global _report
+    with _report_lock:
+        _report = RunReport(command=list(command or []))
+        return _report
+
+
+def get_report() -> RunReport:
+    """
+    Get the shared report of the current run.
+
+    Returns:
+        RunReport: The shared report
+    """
+    with _report_lock:
+        return _report
@@ -0,0 +1,105 @@
+"""Install order of extensions that depend on each other.
+
+Extensions name the extensions they need in `extensionDependencies` and the
+ones they bundle in `extensionPack`. Installing those first means the IDE
+finds them already installed instead of fetching each one itself.
+"""
+
+from typing import Dict, Iterable, List, Set
+
+
+def install_waves(dependencies: Dict[str, List[str]]) -> List[List[str]]:
+    """
+    Group extensions into waves that can each be installed at once.
+
+    Every extension comes in a later wave than the extensions it depends on.
+    Dependencies that are not keys of `dependencies` are ignored, and
+    extensions caught in a dependency cycle share the last wave.
+
+    Args:
+        dependencies: Dependencies keyed by extension ID. IDs are matched
+            case-insensitively.
+
+    Returns:
+        List[List[str]]: The waves, each in the order of `dependencies`
+    """
+    keys = {ext_id.lower(): ext_id for ext_id in dependencies}
+    remaining = {
+        ext_id: {dep.lower() for dep in deps if dep.lower() in keys} - {ext_id.lower()}
+        for ext_id, deps in dependencies.items()
+    }
+    waves: List[List[str]] = []
+    installed: Set[str] = set()
+    while remaining:
+        wave = [ext_id for ext_id, deps in remaining.items() if deps <= installed]
+        if not wave:
+            wave = list(remaining)
+        for ext_id in wave:
+            del remaining[ext_id]
+            installed.add(ext_id.lower())
+        waves.append(wave)
+    return waves
+
+
+class DependencyScheduler:
+    """
+    Releases downloaded extensions for installation once their dependencies are.
+
+    Only dependencies among the extensions being transferred are waited for.
+    An extension whose dependency failed is still released, so that the IDE
+    can try to resolve the dependency itself.
+    """
+
+    def __init__(self, extension_ids: Iterable[str]):
+        """
+        Start scheduling a transfer.
+
+        Args:
+            extension_ids: IDs of all extensions being transferred
+        """
+        self._requested = {ext_id.lower() for ext_id in extension_ids}
+        self._settled: Set[str] = set()
+        # Downloaded extensions and the dependencies they still wait for
+        self._waiting: Dict[str, Set[str]] = {}
+
+    def add(self, extension_id: str, dependencies: Iterable[str]) -> None:
+        """
+        Register a downloaded extension.
+
+        Args:
+            extension_id: The extension ID in format 'publisher.extension'
+            dependencies: IDs of the extensions it depends on or bundles
+        """
+        key = extension_id.lower()
+        self._waiting[extension_id] = {
+            dep.lower() for dep in dependencies if dep.lower() in self._requested
+        } - {key}
+
+    def settle(self, extension_id: str) -> None:
+        """Mark an extension as installed or failed."""
+        self._settled.add(extension_id.lower())
+
+    @property
+    def waiting(self) -> int:
+        """Number of downloaded extensions that have not been released yet."""
+        return len(self._waiting)
+
+    def ready(self, force: bool = False) -> List[str]:
+        """
+        Release the downloaded extensions whose dependencies are all settled.
+
+        Args:
+            force: Release every waiting extension, e.g. because no download
+                that could unblock them is left
+
+        Returns:
+            List[str]: IDs of the released extensions, in download order
+        """
+        released = [
+            ext_id
+            for ext_id, deps in self._waiting.items()
+            if force or deps <= self._settled
+        ]
+        for ext_id in released:
+            del self._waiting[ext_id]
+        return released
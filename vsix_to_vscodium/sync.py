@@ -0,0 +1,86 @@
+"""Incremental synchronization of extensions between two IDEs."""
+
+from dataclasses import dataclass, field
+import subprocess
+from typing import Dict, List
+
+from vsix_to_vscodium.marketplace import version_key
+
+
+@dataclass
+class SyncPlan:
+    """Extensions of the source IDE grouped by their state in the target IDE."""
+
+    source_versions: Dict[str, str]
+    missing: List[str] = field(default_factory=list)
+    outdated: List[str] = field(default_factory=list)
+    up_to_date: List[str] = field(default_factory=list)
+
+    @property
+    def to_transfer(self) -> List[str]:
+        """Extensions that need to be downloaded and installed."""
+        return self.missing + self.outdated
+
+
+def list_extension_versions(ide_name: str) -> Dict[str, str]:
+    """
+    Get the installed extensions of an IDE with their versions.
+
+    Args:
+        ide_name: Name of the IDE executable (e.g., 'code' or 'windsurf')
+
+    Returns:
+        Dict[str, str]: Installed version keyed by extension ID
+
+    Raises:
+        subprocess.CalledProcessError: If the IDE command fails
+        FileNotFoundError: If the IDE is not installed
+    """
+    try:
+        result = subprocess.run(
+            [ide_name, "--list-extensions", "--show-versions"],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"Error getting extensions of {ide_name}: {e}")
+        raise
+    except FileNotFoundError:
+        print(f"Command '{ide_name}' not found. Is it installed and in your PATH?")
+        raise
+
+    versions = {}
+    for line in result.stdout.splitlines():
+        ext_id, _, version = line.strip().partition("@")
+        if ext_id:
+            versions[ext_id] = version
+    return versions
+
+
+def plan_sync(source: Dict[str, str], target: Dict[str, str]) -> SyncPlan:
+    """
+    Compare the extensions of two IDEs.
+
+    Extensions are matched case-insensitively. An extension is outdated when
+    the target has an older version than the source; newer versions in the
+    target are left alone.
+
+    Args:
+        source: Installed versions of the source IDE keyed by extension ID
+        target: Installed versions of the target IDE keyed by extension ID
+
+    Returns:
+        SyncPlan: The extensions that are missing, outdated and up to date
+    """
+    target_versions = {ext_id.lower(): version for ext_id, version in target.items()}
+    plan = SyncPlan(dict(source))
+    for ext_id, version in source.items():
+        installed = target_versions.get(ext_id.lower())
+        if installed is None:
+            plan.missing.append(ext_id)
+        elif version_key(installed) < version_key(version):
+            plan.outdated.append(ext_id)
+        else:
+            plan.up_to_date.append(ext_id)
+    return plan
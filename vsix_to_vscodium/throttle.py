@@ -0,0 +1,229 @@
+"""Per-host concurrency limits that adapt to how fast the gallery answers.
+
+The Marketplace API host and each publisher's '*.gallery.vsassets.io' asset
+host throttle independently, so every host gets its own limit on the number
+of requests in flight. A limit grows by about one request per round trip
+while response times stay flat, and is halved when the host answers with
+429 or 503, whose Retry-After also holds back new requests to that host.
+"""
+
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+import threading
+import time
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+# Statuses with which the gallery asks clients to slow down
+THROTTLE_STATUSES = (429, 503)
+# Requests in flight per host before any response has been seen
+DEFAULT_INITIAL_LIMIT = 4
+# Matches the number of connections the shared session keeps alive per host
+DEFAULT_MAX_LIMIT = 10
+# A response this many times slower than the fastest one seen counts as
+# the host queueing requests, so the limit stops growing
+LATENCY_TOLERANCE = 1.5
+# Factor the limit is multiplied with when the host throttles
+BACKOFF_FACTOR = 0.5
+# Seconds during which further throttled responses do not shrink the limit
+# again, as they were usually sent before the first one came back
+BACKOFF_COOLDOWN = 1.0
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _throttled_attempts(response: requests.Response) -> int:
+    # Throttled attempts that urllib3 retried before this response, and this one
+    history = getattr(getattr(response.raw, "retries", None), "history", None)
+    statuses = [entry.status for entry in history] if isinstance(history, tuple) else []
+    statuses.append(response.status_code)
+    return sum(status in THROTTLE_STATUSES for status in statuses)
+
+
+class HostLimiter:
+    """Additive-increase, multiplicative-decrease limit of requests to one host."""
+
+    def __init__(
+        self,
+        host: str,
+        initial_limit: int = DEFAULT_INITIAL_LIMIT,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+    ):
+        self.host = host
+        self.max_limit = max_limit
+        self.limit = float(min(initial_limit, max_limit))
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.min_latency: Optional[float] = None
+        self._paused_until = 0.0
+        self._backed_off_at = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Wait until a request to the host may be sent."""
+        with self._condition:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._condition.wait(pause if pause > 0 else None)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self) -> None:
+        """Mark a request to the host as finished."""
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def on_response(
+        self, latency: float, throttled: int = 0, retry_after: Optional[float] = None
+    ) -> None:
+        """
+        Adjust the limit to a response from the host.
+
+        Args:
+            latency: Seconds until the response headers arrived
+            throttled: Number of attempts the host answered with 429 or 503
+            retry_after: Seconds the host asked to wait before the next request
+        """
+        now = time.monotonic()
+        with self._condition:
+            self.requests += 1
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            if throttled:
+                self.throttled += throttled
+                if now - self._backed_off_at >= BACKOFF_COOLDOWN:
+                    self.limit = max(1.0, self.limit * BACKOFF_FACTOR)
+                    self._backed_off_at = now
+            else:
+                if self.min_latency is None or latency < self.min_latency:
+                    self.min_latency = latency
+                if latency <= self.min_latency * LATENCY_TOLERANCE:
+                    # About one more request in flight per round trip
+                    self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def snapshot(self) -> dict:
+        """Current limit and traffic of the host."""
+        with self._condition:
+            return {
+                "limit": int(self.limit),
+                "max_limit": self.max_limit,
+                "peak_in_flight": self.peak_in_flight,
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "min_latency": self.min_latency,
+            }
+
+
+class Throttle:
+    """The limiters of all hosts, fed by a response hook of the shared session."""
+
+    def __init__(
+        self,
+        initial_limit: int = DEFAULT_INITIAL_LIMIT,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+    ):
+        self.initial_limit = initial_limit
+        self.max_limit = max_limit
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url: str) -> HostLimiter:
+        """
+        Get the limiter of the host a URL points to.
+
+        Args:
+            url: Any URL on the host
+
+        Returns:
+            HostLimiter: The host's limiter, created on first use
+        """
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = HostLimiter(
+                    host, self.initial_limit, self.max_limit
+                )
+            return limiter
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        """Hold one of the host's request slots, including while reading the body."""
+        limiter = self.limiter(url)
+        limiter.acquire()
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    def on_response(self, response: requests.Response, *args, **kwargs) -> None:
+        """Response hook for requests sessions that adjusts the host's limit."""
+        self.limiter(response.url).on_response(
+            response.elapsed.total_seconds(),
+            _throttled_attempts(response),
+            _retry_after(response) if response.status_code in THROTTLE_STATUSES else None,
+        )
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        Get the current limits of all hosts, for the run report.
+
+        Returns:
+            Dict[str, dict]: Limit and traffic keyed by host
+        """
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.host: limiter.snapshot() for limiter in limiters}
+
+
+_throttle = Throttle()
+_throttle_lock = threading.Lock()
+
+
+def configure_throttle(
+    initial_limit: int = DEFAULT_INITIAL_LIMIT, max_limit: int = DEFAULT_MAX_LIMIT
+) -> Throttle:
+    """
+    Replace the shared throttle with one using the given limits.
+
+    Args:
+        initial_limit: Requests in flight per host before any response
+        max_limit: Most requests in flight per host
+
+    Returns:
+        Throttle: The new shared throttle
+    """
+    global _throttle
+    with _throttle_lock:
+        _throttle = Throttle(min(initial_limit, max_limit), max_limit)
+        return _throttle
+
+
+def get_throttle() -> Throttle:
+    """
+    Get the shared throttle.
+
+    Returns:
+        Throttle: The shared throttle
+    """
+    with _throttle_lock:
+        return _throttle
@@ -0,0 +1,129 @@
+"""Shared HTTP session used for all Marketplace traffic."""
+
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from urllib3.util.retry import Retry
+
+from vsix_to_vscodium.throttle import get_throttle
+
+# Connections kept alive per host
+DEFAULT_POOL_SIZE = 10
+# Number of hosts whose connection pools are kept around. Downloads are served
+# from one '{publisher}.gallery.vsassets.io' host per publisher.
+DEFAULT_HOST_POOLS = 64
+DEFAULT_RETRIES = 5
+# Retries wait backoff_factor * 2 ** (retry - 1) seconds unless the server
+# sends a Retry-After header
+DEFAULT_BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+class OfflineError(requests.exceptions.ConnectionError):
+    """Raised for any request made while offline mode is enabled."""
+
+
+class _OfflineAdapter(BaseAdapter):
+    def send(self, request, **kwargs):
+        raise OfflineError(
+            f"Offline mode is enabled, not requesting {request.url}", request=request
+        )
+
+    def close(self):
+        pass
+
+
+def _adjust_limits(response: requests.Response, *args, **kwargs) -> None:
+    # Looked up per response so that a reconfigured throttle takes effect
+    get_throttle().on_response(response)
+
+
+def create_session(
+    pool_size: int = DEFAULT_POOL_SIZE,
+    retries: int = DEFAULT_RETRIES,
+    backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+    offline: bool = False,
+) -> requests.Session:
+    """
+    Create a pooled session that retries transient Marketplace errors.
+
+    Every response also adjusts the request limit of its host, see
+    vsix_to_vscodium.throttle.
+
+    Args:
+        pool_size: Maximum number of connections kept alive per host
+        retries: Maximum number of retries per request
+        backoff_factor: Base delay of the exponential backoff between retries
+        offline: Fail every request with OfflineError instead of sending it
+
+    Returns:
+        requests.Session: The configured session
+    """
+    session = requests.Session()
+    if offline:
+        adapter = _OfflineAdapter()
+    else:
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            # The extensionquery POST is a read, so every method is safe to retry
+            allowed_methods=None,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=max(pool_size, DEFAULT_HOST_POOLS),
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.hooks["response"].append(_adjust_limits)
+    return session
+
+
+def configure_session(
+    pool_size: int = DEFAULT_POOL_SIZE,
+    retries: int = DEFAULT_RETRIES,
+    backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+    offline: bool = False,
+) -> requests.Session:
+    """
+    Replace the shared session with one using the given settings.
+
+    Args:
+        pool_size: Maximum number of connections kept alive per host
+        retries: Maximum number of retries per request
+        backoff_factor: Base delay of the exponential backoff between retries
+        offline: Fail every request with OfflineError instead of sending it
+
+    Returns:
+        requests.Session: The new shared session
+    """
+    global _session
+    session = create_session(pool_size, retries, backoff_factor, offline)
+    with _session_lock:
+        previous, _session = _session, session
+    if previous is not None:
+        previous.close()
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Get the shared session, creating it with default settings if needed.
+
+    Returns:
+        requests.Session: The shared session
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
@@ -0,0 +1,138 @@
+"""Helpers for reading the contents of .vsix packages."""
+
+import json
+import os
+from typing import List, Optional
+import xml.etree.ElementTree as ElementTree
+import zipfile
+
+PACKAGE_JSON = "extension/package.json"
+VSIX_MANIFEST = "extension.vsixmanifest"
+# Members below this prefix are the files of the installed extension
+EXTENSION_PREFIX = "extension/"
+
+_VSX_NAMESPACE = "{http://schemas.microsoft.com/developer/vsx-schema/2011}"
+
+
+def read_package_json(archive: zipfile.ZipFile) -> dict:
+    """
+    Read the extension's package.json from an open .vsix archive.
+
+    Args:
+        archive: The open .vsix archive
+
+    Returns:
+        dict: The parsed package.json
+
+    Raises:
+        KeyError: If the archive has no extension/package.json
+        ValueError: If package.json is not valid JSON
+    """
+    return json.loads(archive.read(PACKAGE_JSON).decode("utf-8-sig"))
+
+
+def read_target_platform(archive: zipfile.ZipFile) -> Optional[str]:
+    """
+    Read the platform a .vsix package targets from its manifest.
+
+    Args:
+        archive: The open .vsix archive
+
+    Returns:
+        Optional[str]: The target platform, e.g. 'linux-x64', or None for
+            universal packages
+    """
+    try:
+        root = ElementTree.fromstring(archive.read(VSIX_MANIFEST))
+    except (KeyError, ElementTree.ParseError):
+        return None
+    identity = root.find(f"{_VSX_NAMESPACE}Metadata/{_VSX_NAMESPACE}Identity")
+    if identity is None:
+        return None
+    target_platform = identity.get("TargetPlatform")
+    if not target_platform or target_platform == "universal":
+        return None
+    return target_platform
+
+
+def read_manifest(vsix_path: str) -> dict:
+    """
+    Read the package.json of a .vsix file.
+
+    Args:
+        vsix_path: Path to the .vsix file
+
+    Returns:
+        dict: The parsed package.json
+
+    Raises:
+        zipfile.BadZipFile: If the file is not a zip archive
+        KeyError: If the archive has no extension/package.json
+    """
+    with zipfile.ZipFile(vsix_path) as archive:
+        return read_package_json(archive)
+
+
+def read_dependencies(manifest: dict) -> List[str]:
+    """
+    Get the extensions an extension depends on or bundles as an extension pack.
+
+    Args:
+        manifest: The parsed package.json of the extension
+
+    Returns:
+        List[str]: Extension IDs in format 'publisher.extension'
+    """
+    dependencies: List[str] = []
+    for key in ("extensionDependencies", "extensionPack"):
+        for ext_id in manifest.get(key) or []:
+            if isinstance(ext_id, str) and ext_id not in dependencies:
+                dependencies.append(ext_id)
+    return dependencies
+
+
+def package_dependencies(vsix_path: str) -> List[str]:
+    """
+    Get the extensions a .vsix file depends on or bundles as an extension pack.
+
+    Args:
+        vsix_path: Path to the .vsix file
+
+    Returns:
+        List[str]: Extension IDs in format 'publisher.extension', empty if the
+            package cannot be read
+    """
+    try:
+        return read_dependencies(read_manifest(vsix_path))
+    except (zipfile.BadZipFile, KeyError, ValueError, OSError):
+        return []
+
+
+def verify_package(vsix_path: str) -> None:
+    """
+    Check that a .vsix file is a complete package.
+
+    Only the zip's central directory is read, which is at the end of the file
+    and so the first part to go missing when a download is cut short. Every
+    member it lists must lie within the file, and the extension's manifest
+    must be among them.
+
+    Args:
+        vsix_path: Path to the .vsix file
+
+    Raises:
+        ValueError: If the file is not a complete package
+        OSError: If the file cannot be read
+    """
+    try:
+        with zipfile.ZipFile(vsix_path) as archive:
+            members = archive.infolist()
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"not a valid package: {e}") from e
+    names = {member.filename for member in members}
+    if PACKAGE_JSON not in names and VSIX_MANIFEST not in names:
+        raise ValueError("package has no extension manifest")
+    size = os.path.getsize(vsix_path)
+    for member in members:
+        if member.header_offset + member.compress_size > size:
+            raise ValueError(f"{member.filename} extends past the end of the package")